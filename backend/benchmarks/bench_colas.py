@@ -0,0 +1,69 @@
+"""Micro-benchmark: coste por operación de la cola de espera y los índices por id.
+
+Uso (desde backend/):  python -m benchmarks.bench_colas [tamaño_máximo]
+
+Si las estructuras son O(1), el coste por operación debe mantenerse plano
+aunque la cola y la población crezcan hasta 1M.
+"""
+import random
+import sys
+import time
+
+from modulos.sistema import SistemaUnieTaxi
+
+OPERACIONES = 10_000
+
+
+def medir(funcion, repeticiones=OPERACIONES):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e9  # ns/op
+
+
+def preparar(tamano):
+    sistema = SistemaUnieTaxi()
+    # Sin taxis libres todas las solicitudes acaban en la cola
+    for _ in range(tamano):
+        cliente = sistema.registrar_cliente("Bench", "VISA")
+        sistema.procesar_solicitud(cliente.id, 1.0, 1.0, 2.0, 2.0)
+    return sistema
+
+
+def bench(tamano):
+    sistema = preparar(tamano)
+    taxi = sistema.registrar_taxi("Bench", "B-000")  # Nace ocupado: coge al primero de la cola
+
+    # 1. Desencolar (asignar_trabajo_de_cola)
+    ns_cola = medir(lambda: sistema.asignar_trabajo_de_cola(taxi))
+
+    # 2. Finalizar viaje: búsqueda del cliente por id
+    ids = [random.randint(1, tamano) for _ in range(OPERACIONES)]
+    it = iter(ids)
+    def finalizar():
+        taxi.cliente_actual = next(it)
+        sistema.finalizar_viaje(taxi, 10.0)
+    ns_finalizar = medir(finalizar)
+
+    # 3. Eliminar taxis libres por id
+    sistema.cola_espera.clear()
+    for _ in range(OPERACIONES):
+        sistema.registrar_taxi("Bench", "B-001")
+    candidatos = [t.id for t in sistema.taxis.values() if t.estado == "LIBRE"]
+    it_taxis = iter(candidatos)
+    ns_eliminar = medir(lambda: sistema.eliminar_taxi(next(it_taxis)), len(candidatos))
+
+    return ns_cola, ns_finalizar, ns_eliminar
+
+
+def main():
+    maximo = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    tamanos = [t for t in (10_000, 100_000, 1_000_000) if t <= maximo]
+    print(f"{'tamaño':>10} | {'desencolar':>12} | {'finalizar':>12} | {'eliminar':>12}   (ns/op)")
+    for tamano in tamanos:
+        ns_cola, ns_finalizar, ns_eliminar = bench(tamano)
+        print(f"{tamano:>10} | {ns_cola:>12.0f} | {ns_finalizar:>12.0f} | {ns_eliminar:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
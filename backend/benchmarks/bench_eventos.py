@@ -0,0 +1,47 @@
+"""Motor paso a paso frente a motor por eventos con toda la flota en ruta.
+
+Uso (desde backend/):  python -m benchmarks.bench_eventos [taxis] [horas_simuladas]
+
+Cada taxi recibe un viaje al principio y luego solo corre el motor (sin carga
+nueva): el paso a paso cuesta taxis x ticks; por eventos, solo las llegadas.
+Un tick son 20 minutos simulados.
+"""
+import sys
+import time
+
+from modulos.bitacora import SILENCIO
+from modulos.motor import MotorSimulacion
+from modulos.sistema import SistemaUnieTaxi
+
+VELOCIDAD = 0.25  # Lenta: viajes de muchos ticks
+
+
+def ejecutar(taxis, ticks, eventos):
+    sistema = SistemaUnieTaxi(semilla=7, reloj_simulado=True, instrumentar=False, eventos=eventos)
+    sistema.log = SILENCIO
+    sistema.limite_flota = taxis
+    for i in range(taxis): sistema.registrar_taxi("Bench", f"E-{i}")
+    rng = sistema.rng
+    for i in range(taxis):
+        sistema.procesar_solicitud(i + 1, rng.uniform(0, 100), rng.uniform(0, 100), rng.uniform(0, 100), rng.uniform(0, 100))
+
+    motor = MotorSimulacion(sistema)
+    inicio = time.perf_counter()
+    while motor.ticks < ticks:
+        motor.saltar_inactivos(ticks - motor.ticks - 1, VELOCIDAD)
+        motor.paso(VELOCIDAD)
+    return time.perf_counter() - inicio, sistema.viajes_totales
+
+
+def main():
+    taxis = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    horas = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    ticks = horas * 3
+    print(f"{taxis} taxis en ruta, {horas} horas simuladas ({ticks} ticks)")
+    for nombre, eventos in (("paso a paso", False), ("eventos", True)):
+        segundos, viajes = ejecutar(taxis, ticks, eventos)
+        print(f"  {nombre:<12} {segundos:>8.3f} s  {segundos / horas * 1000:>8.2f} ms/hora simulada  viajes: {viajes}")
+
+
+if __name__ == "__main__":
+    main()
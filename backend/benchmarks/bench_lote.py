@@ -0,0 +1,84 @@
+"""Solicitudes una a una frente a lotes (`procesar_solicitudes_lote`).
+
+Uso (desde backend/):  python -m benchmarks.bench_lote [solicitudes] [tamano_lote]
+
+Mide el sistema en proceso y los endpoints HTTP (TestClient, necesita httpx):
+POST /solicitar_viaje por solicitud frente a POST /solicitar_viaje/lote.
+La flota tiene taxis para la mitad de las solicitudes: el resto acaba en cola.
+"""
+import random
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from modulos.bitacora import SILENCIO
+from modulos.sistema import SistemaUnieTaxi
+
+
+def generar(n, primer_id=1):
+    rng = random.Random(11)
+    return [(primer_id + i, rng.uniform(0, 100), rng.uniform(0, 100), rng.uniform(0, 100), rng.uniform(0, 100))
+            for i in range(n)]
+
+
+def nuevo_sistema(taxis):
+    sistema = SistemaUnieTaxi(semilla=3, reloj_simulado=True, instrumentar=False)
+    sistema.log = SILENCIO
+    sistema.limite_flota = taxis
+    for i in range(taxis): sistema.registrar_taxi("Bench", f"L-{i}")
+    return sistema
+
+
+def en_proceso(solicitudes, tamano_lote):
+    n = len(solicitudes)
+    sistema = nuevo_sistema(n // 2)
+    inicio = time.perf_counter()
+    for s in solicitudes: sistema.procesar_solicitud(*s)
+    uno_a_uno = time.perf_counter() - inicio
+    recogida_uno = sistema.resumen_despacho()["directo"]["distancia_recogida_media"]
+
+    sistema = nuevo_sistema(n // 2)
+    inicio = time.perf_counter()
+    for i in range(0, n, tamano_lote): sistema.procesar_solicitudes_lote(solicitudes[i:i + tamano_lote])
+    en_lote = time.perf_counter() - inicio
+    recogida_lote = sistema.resumen_despacho()["directo"]["distancia_recogida_media"]
+    return uno_a_uno, en_lote, recogida_uno, recogida_lote
+
+
+def por_http(cliente, solicitudes, tamano_lote):
+    cuerpos = [{"cliente_id": c, "origen_x": ox, "origen_y": oy, "destino_x": dx, "destino_y": dy}
+               for c, ox, oy, dx, dy in solicitudes]
+    n = len(cuerpos)
+
+    main.servicio.sistema = nuevo_sistema(n // 2)
+    inicio = time.perf_counter()
+    for cuerpo in cuerpos: cliente.post("/solicitar_viaje", json=cuerpo)
+    uno_a_uno = time.perf_counter() - inicio
+
+    main.servicio.sistema = nuevo_sistema(n // 2)
+    inicio = time.perf_counter()
+    for i in range(0, n, tamano_lote): cliente.post("/solicitar_viaje/lote", json=cuerpos[i:i + tamano_lote])
+    en_lote = time.perf_counter() - inicio
+    return uno_a_uno, en_lote
+
+
+def ejecutar():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    tamano_lote = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    solicitudes = generar(n)
+    print(f"{n} solicitudes, lotes de {tamano_lote}, {n // 2} taxis")
+
+    uno, lote, r_uno, r_lote = en_proceso(solicitudes, tamano_lote)
+    print(f"  en proceso  uno a uno {n / uno:>10.0f} sol/s | lote {n / lote:>10.0f} sol/s")
+    print(f"  recogida media        {r_uno:>10} | lote {r_lote:>10}")
+
+    with TestClient(main.app) as cliente:
+        uno, lote = por_http(cliente, solicitudes[:min(n, 5_000)], tamano_lote)
+    m = min(n, 5_000)
+    print(f"  HTTP        uno a uno {m / uno:>10.0f} sol/s | lote {m / lote:>10.0f} sol/s")
+
+
+if __name__ == "__main__":
+    ejecutar()
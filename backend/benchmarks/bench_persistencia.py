@@ -0,0 +1,107 @@
+"""Coste del diario en el camino caliente y tiempo de restaurar.
+
+Uso (desde backend/):  python -m benchmarks.bench_persistencia [viajes_diario]
+
+1. Simulación headless sin diario y con diario (fsync por lote): ticks/s y
+   registros por lote (group commit).
+2. Diario sintético de N viajes (asignación + liquidación): tiempo de
+   repetirlo entero, de guardar una instantánea y de restaurar desde ella.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from modulos import persistencia
+from modulos.bitacora import SILENCIO
+from modulos.motor import MotorSimulacion, GeneradorClientes
+from modulos.persistencia import DiarioEventos, ASIGNACION, LIQUIDACION
+from modulos.sistema import SistemaUnieTaxi
+
+TAXIS = 1_000
+CLIENTES = 50_000
+
+
+def _sistema():
+    sistema = SistemaUnieTaxi(semilla=1, reloj_simulado=True, instrumentar=False)
+    sistema.log = SILENCIO
+    return sistema
+
+
+def camino_caliente(directorio, ticks=500):
+    for con_diario in (False, True):
+        sistema = _sistema()
+        if con_diario: sistema.diario = DiarioEventos(directorio)
+        for i in range(TAXIS): sistema.registrar_taxi("Bench", f"W-{i}")
+        motor, generador = MotorSimulacion(sistema), GeneradorClientes(sistema)
+        inicio = time.perf_counter()
+        for _ in range(ticks):
+            for _ in range(100): generador.generar()
+            motor.paso(8.0)
+        segundos = time.perf_counter() - inicio
+        linea = f"  {'con diario' if con_diario else 'sin diario':<11} {ticks / segundos:>8.1f} ticks/s"
+        if con_diario:
+            sistema.diario.cerrar()
+            diario = sistema.diario
+            linea += f"  {diario.escritos} registros en {diario.lotes} lotes ({diario.escritos / max(1, diario.lotes):.0f}/lote)"
+        print(linea)
+
+
+def diario_sintetico(directorio, viajes):
+    sistema = _sistema()
+    sistema.diario = DiarioEventos(directorio, sincronizar=False)
+    for i in range(TAXIS): sistema.registrar_taxi("Bench", f"W-{i}")
+    for i in range(CLIENTES): sistema.registrar_cliente(f"Bot_{i}", "VISA")
+    anotar = sistema.diario.anotar
+    rng = sistema.rng
+    ganancia, viajes_cliente = 0.0, [0] * (CLIENTES + 1)
+    for n in range(1, viajes + 1):
+        taxi = sistema.taxis[n % TAXIS + 1]
+        cliente = n % CLIENTES + 1
+        dx, dy = rng.uniform(0, 100), rng.uniform(0, 100)
+        anotar(ASIGNACION, (taxi.id, cliente, 1.0, 2.0, dx, dy))
+        taxi.viajes += 1
+        taxi.ganancias += 24.0
+        ganancia += 6.0
+        viajes_cliente[cliente] += 1
+        anotar(LIQUIDACION, (taxi.id, cliente, dx, dy, taxi.viajes, viajes_cliente[cliente], taxi.ganancias, n, ganancia, float(n)))
+    sistema.diario.cerrar()
+    return sistema
+
+
+def main():
+    viajes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    directorio = tempfile.mkdtemp(prefix="unietaxi-")
+    try:
+        print("Camino caliente (500 ticks, 100 solicitudes/tick):")
+        camino_caliente(os.path.join(directorio, "caliente"))
+
+        ruta = os.path.join(directorio, "sintetico")
+        print(f"\nDiario sintético: {viajes} viajes, {TAXIS} taxis, {CLIENTES} clientes")
+        diario_sintetico(ruta, viajes)
+        tamano = sum(os.path.getsize(os.path.join(ruta, f)) for f in os.listdir(ruta))
+        print(f"  tamaño diario          {tamano / 1e6:>8.1f} MB")
+
+        inicio = time.perf_counter()
+        restaurado = _sistema()
+        secuencia = persistencia.restaurar(restaurado, ruta)
+        print(f"  repetir diario entero  {time.perf_counter() - inicio:>8.2f} s  (viajes: {restaurado.viajes_totales})")
+
+        restaurado.diario = DiarioEventos(ruta, secuencia, sincronizar=False)
+        inicio = time.perf_counter()
+        persistencia.guardar_instantanea(restaurado)
+        print(f"  guardar instantánea    {time.perf_counter() - inicio:>8.2f} s")
+        restaurado.diario.cerrar()
+
+        inicio = time.perf_counter()
+        desde_instantanea = _sistema()
+        persistencia.restaurar(desde_instantanea, ruta)
+        print(f"  restaurar instantánea  {time.perf_counter() - inicio:>8.2f} s  "
+              f"(mismo estado: {desde_instantanea.ganancia_empresa == restaurado.ganancia_empresa})")
+    finally:
+        shutil.rmtree(directorio)
+
+
+if __name__ == "__main__":
+    main()
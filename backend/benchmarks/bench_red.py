@@ -0,0 +1,77 @@
+"""Red viaria: latencia de ETA y coste del despacho por calles.
+
+Uso (desde backend/):  python -m benchmarks.bench_red [lado] [consultas]
+
+- ETA exacto sin caché (A* con landmarks) y con caché (acierto LRU).
+- Cota ALT vectorizada para K_CANDIDATOS_RED candidatos de una vez.
+- Despacho: taxi más cercano en línea recta frente a elegido por ETA por la red.
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from modulos.bitacora import SILENCIO
+from modulos.despacho import K_CANDIDATOS_RED
+from modulos.red_viaria import RedViaria
+from modulos.sistema import SistemaUnieTaxi
+
+
+def _micro(segundos, n):
+    return segundos / n * 1e6
+
+
+def medir_eta(red, consultas):
+    rng = random.Random(3)
+    pares = [(rng.randrange(red.n), rng.randrange(red.n)) for _ in range(consultas)]
+
+    inicio = time.perf_counter()
+    for a, b in pares: red._a_estrella(a, b)
+    sin_cache = time.perf_counter() - inicio
+
+    for a, b in pares: red.ruta(a, b)
+    inicio = time.perf_counter()
+    for a, b in pares: red.eta(a, b)
+    con_cache = time.perf_counter() - inicio
+
+    lotes = [(np.array([rng.randrange(red.n) for _ in range(K_CANDIDATOS_RED)]), rng.randrange(red.n))
+             for _ in range(consultas)]
+    inicio = time.perf_counter()
+    for origenes, destino in lotes: red.cota_eta(origenes, destino)
+    cotas = time.perf_counter() - inicio
+
+    print(f"  ETA A* (sin caché)      {_micro(sin_cache, consultas):>9.1f} us/consulta")
+    print(f"  ETA con caché           {_micro(con_cache, consultas):>9.1f} us/consulta")
+    print(f"  cota ALT x{K_CANDIDATOS_RED:<13} {_micro(cotas, consultas):>9.1f} us/lote")
+
+
+def medir_despacho(red, solicitudes):
+    taxis = 2 * solicitudes  # Siempre queda al menos la mitad de la flota libre
+    sistema = SistemaUnieTaxi(semilla=5, reloj_simulado=True, instrumentar=False, red=red)
+    sistema.log = SILENCIO
+    sistema.limite_flota = taxis
+    for i in range(taxis): sistema.registrar_taxi("Bench", f"R-{i}")
+    rng = random.Random(9)
+    inicio = time.perf_counter()
+    for i in range(solicitudes):
+        sistema.procesar_solicitud(i + 1, rng.uniform(0, 100), rng.uniform(0, 100), rng.uniform(0, 100), rng.uniform(0, 100))
+    return time.perf_counter() - inicio
+
+
+def main():
+    lado = int(sys.argv[1]) if len(sys.argv) > 1 else 41
+    consultas = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    inicio = time.perf_counter()
+    red = RedViaria.cuadricula(lado)
+    print(f"Red {lado}x{lado} ({red.n} nodos), preparada en {time.perf_counter() - inicio:.2f} s")
+    medir_eta(red, consultas)
+
+    print(f"Despacho de {consultas} solicitudes")
+    for nombre, con_red in (("línea recta", None), ("red viaria", red)):
+        segundos = medir_despacho(con_red, consultas)
+        print(f"  {nombre:<12} {_micro(segundos, consultas):>9.1f} us/solicitud")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Escalado de la simulación repartida por regiones (un proceso por región).
+
+Uso (desde backend/):  python -m benchmarks.bench_regiones [taxis] [ticks]
+
+La flota y la carga totales son las mismas para cada número de regiones; cada
+región hace `ticks` ticks con su parte. Con N núcleos libres se espera que los
+despachos/s agregados crezcan casi linealmente hasta N regiones.
+"""
+import os
+import sys
+import time
+
+from modulos.regiones import CoordinadorRegiones
+
+REGIONES = (1, 2, 4, 8)
+
+
+def main():
+    taxis = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"CPUs: {os.cpu_count()}  taxis: {taxis}  ticks por región: {ticks}")
+    print(f"{'regiones':>8} | {'segundos':>9} | {'despachos/s':>12} | {'viajes':>8} | {'migraciones':>11}")
+    for n in REGIONES:
+        coordinador = CoordinadorRegiones(n, taxis, semilla=1, solicitudes_por_tick=max(1, taxis // 10 // n), ticks=ticks)
+        inicio = time.perf_counter()
+        coordinador.iniciar()
+        coordinador.esperar()
+        segundos = time.perf_counter() - inicio  # Incluye arrancar los procesos
+        totales = coordinador.estado()["totales"]
+        migraciones = coordinador.migraciones
+        coordinador.detener()
+        print(f"{n:>8} | {segundos:>9.2f} | {totales['despachadas'] / segundos:>12.0f} | "
+              f"{totales['viajes']:>8} | {migraciones:>11}")
+
+
+if __name__ == "__main__":
+    main()
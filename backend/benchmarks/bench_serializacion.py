@@ -0,0 +1,71 @@
+"""Memoria por entidad y coste de serializar /estado.
+
+Uso (desde backend/):  python -m benchmarks.bench_serializacion [taxis] [clientes]
+
+Compara el camino por defecto de FastAPI (jsonable_encoder + json) con el
+serializador propio (json.dumps directo, columnar y binario).
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from fastapi.encoders import jsonable_encoder
+
+from modulos.taxi import Taxi
+from modulos.cliente import Cliente
+from modulos.sistema import SistemaUnieTaxi
+from modulos.serializador import a_json, flota_columnar, flota_binaria, clientes_columnar
+
+
+def bytes_por_entidad(fabrica, n=100_000):
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    objetos = [fabrica(i) for i in range(n)]
+    usado = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    del objetos
+    return usado / n
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return time.perf_counter() - inicio, len(resultado)
+
+
+def main():
+    n_taxis = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    n_clientes = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+
+    print(f"Taxi:    {bytes_por_entidad(lambda i: Taxi(i, 'Toyota', f'ABC-{i}', 1.0, 2.0)):.0f} bytes/entidad")
+    print(f"Cliente: {bytes_por_entidad(lambda i: Cliente(i, f'Bot_{i}', 'VISA')):.0f} bytes/entidad")
+
+    sistema = SistemaUnieTaxi()
+    for i in range(n_taxis): sistema.registrar_taxi("Toyota", f"ABC-{i}")
+    for i in range(n_clientes): sistema.registrar_cliente(f"Bot_{i}", "VISA")
+
+    # Lo que publica el servicio: una fila por entidad y una copia de la flota
+    taxis = {t.id: t.a_fila() for t in sistema.taxis.values()}
+    clientes = [c.a_fila() for c in sistema.clientes.values()]
+    copia = sistema.flota.copia()
+    foto = {"taxis": [t.a_dict() for t in sistema.taxis.values()],
+            "clientes": [c.a_dict() for c in sistema.clientes.values()], **sistema.agregados()}
+    print(f"\n/estado con {n_taxis} taxis y {n_clientes} clientes:")
+    casos = [
+        ("jsonable_encoder + json (FastAPI)", lambda: json.dumps(jsonable_encoder(foto)).encode()),
+        ("json.dumps directo", lambda: a_json(foto)),
+        ("columnar JSON (flota + clientes)", lambda: a_json({
+            "taxis": flota_columnar(copia, taxis),
+            "clientes": clientes_columnar(clientes),
+        })),
+        ("flota columnar JSON", lambda: a_json(flota_columnar(copia, taxis))),
+        ("flota binaria", lambda: flota_binaria(copia, taxis)),
+    ]
+    for nombre, funcion in casos:
+        segundos, tamano = cronometrar(funcion)
+        print(f"  {nombre:<36} {segundos * 1000:>9.1f} ms  {tamano / 1e6:>8.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
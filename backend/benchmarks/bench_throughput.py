@@ -0,0 +1,39 @@
+"""Throughput del motor headless para flotas de 10 a 100k taxis.
+
+Uso (desde backend/):  python -m benchmarks.bench_throughput [ticks]
+
+Cada tamaño corre en un proceso nuevo para que la memoria (pico de RSS) no se
+contamine entre ejecuciones. La carga escala con la flota: una solicitud por
+cada 10 taxis y tick.
+"""
+import multiprocessing
+import resource
+import sys
+
+from modulos.motor import simular
+
+TAMANOS = (10, 100, 1_000, 10_000, 100_000)
+
+
+def _ejecutar(taxis, ticks, cola):
+    resultado = simular(taxis=taxis, ticks=ticks, solicitudes_por_tick=max(1, taxis // 10), semilla=1)
+    resultado["rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB en Linux
+    cola.put(resultado)
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    contexto = multiprocessing.get_context("spawn")
+    print(f"{'taxis':>8} | {'ticks/s':>10} | {'despachos/s':>12} | {'viajes':>8} | {'cola':>8} | {'RSS MB':>8}")
+    for taxis in TAMANOS:
+        cola = contexto.Queue()
+        proceso = contexto.Process(target=_ejecutar, args=(taxis, ticks, cola))
+        proceso.start()
+        r = cola.get()
+        proceso.join()
+        print(f"{taxis:>8} | {r['ticks_por_segundo']:>10.1f} | {r['despachadas_por_segundo']:>12.0f} | "
+              f"{r['viajes']:>8} | {r['cola_espera']:>8} | {r['rss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Prueba de estrés: muchos hilos atacando POST /solicitar_viaje mientras corre la física.
+
+Uso (desde backend/):  python -m benchmarks.estres_concurrencia [hilos] [clientes_por_hilo] [rondas]
+
+Necesita httpx (lo usa fastapi.testclient). Informa del throughput y comprueba:
+- ids de cliente únicos y sin huecos (asignación atómica),
+- ningún taxi asignado a dos clientes a la vez (muestreo durante la carga),
+- ningún cliente perdido: al vaciarse el sistema, cola y clientes_viajando quedan
+  vacíos y cada solicitud aceptada acaba en exactamente un viaje cobrado.
+"""
+import random
+import sys
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+
+TAXIS = 200
+TIEMPO_MAX_DRENAJE = 120.0
+
+
+def trabajador(cliente_http, clientes_por_hilo, rondas, resultados, latencias):
+    mis_clientes = [main.servicio.sistema.registrar_cliente("Estres", "VISA").id for _ in range(clientes_por_hilo)]
+    for _ in range(rondas):
+        for cliente_id in mis_clientes:
+            inicio = time.perf_counter()
+            res = cliente_http.post("/solicitar_viaje", json={
+                "cliente_id": cliente_id,
+                "origen_x": random.uniform(0, 100), "origen_y": random.uniform(0, 100),
+                "destino_x": random.uniform(0, 100), "destino_y": random.uniform(0, 100),
+            }).json()
+            latencias.append(time.perf_counter() - inicio)
+            if res.get("taxi_id"): resultados["asignados"] += 1
+            elif "cola" in res["resultado"]: resultados["en_cola"] += 1
+            else: resultados["ocupados"] += 1
+
+
+def muestrear_dobles_asignaciones(parar, violaciones):
+    while not parar.is_set():
+        vistos = set()
+        for taxi in list(main.servicio.sistema.taxis.values()):
+            cliente_id = taxi.cliente_actual
+            if cliente_id is None: continue
+            if cliente_id in vistos: violaciones.append(cliente_id)
+            vistos.add(cliente_id)
+        time.sleep(0.01)
+
+
+def main_estres():
+    # Un solo cliente para todos los hilos: arranca (y al final apaga) el servicio con su lifespan
+    with TestClient(main.app) as cliente_http:
+        return estres(cliente_http)
+
+
+def estres(cliente_http):
+    hilos = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    clientes_por_hilo = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rondas = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    sistema = main.servicio.sistema
+    for i in range(TAXIS):
+        sistema.registrar_taxi("Estres", f"E-{i}")
+
+    resultados = {"asignados": 0, "en_cola": 0, "ocupados": 0}
+    por_hilo = [dict(resultados) for _ in range(hilos)]
+    latencias = []
+    violaciones = []
+    parar = threading.Event()
+    muestreo = threading.Thread(target=muestrear_dobles_asignaciones, args=(parar, violaciones), daemon=True)
+    muestreo.start()
+
+    inicio = time.perf_counter()
+    trabajadores = [
+        threading.Thread(target=trabajador, args=(cliente_http, clientes_por_hilo, rondas, por_hilo[i], latencias))
+        for i in range(hilos)
+    ]
+    for t in trabajadores: t.start()
+    for t in trabajadores: t.join()
+    duracion = time.perf_counter() - inicio
+
+    for parcial in por_hilo:
+        for clave, valor in parcial.items(): resultados[clave] += valor
+    total = sum(resultados.values())
+    aceptadas = resultados["asignados"] + resultados["en_cola"]
+    latencias.sort()
+    print(f"Solicitudes: {total} en {duracion:.2f}s -> {total / duracion:.0f} req/s")
+    print(f"  p50 {latencias[len(latencias) // 2] * 1000:.2f} ms | p99 {latencias[int(len(latencias) * 0.99)] * 1000:.2f} ms")
+    print(f"  {resultados}")
+
+    # Esperamos a que terminen todos los viajes
+    limite = time.monotonic() + TIEMPO_MAX_DRENAJE
+    while (sistema.cola_espera or sistema.clientes_viajando) and time.monotonic() < limite:
+        time.sleep(0.1)
+    parar.set()
+
+    errores = []
+    ids = set(sistema.clientes)
+    if ids != set(range(1, hilos * clientes_por_hilo + 1)): errores.append("ids de cliente duplicados o con huecos")
+    if violaciones: errores.append(f"{len(violaciones)} clientes vistos en dos taxis a la vez")
+    if sistema.cola_espera or sistema.clientes_viajando: errores.append("quedan clientes en cola o viajando")
+    viajes_clientes = sum(c.viajes for c in sistema.clientes.values())
+    if not (viajes_clientes == sistema.viajes_totales == aceptadas):
+        errores.append(f"viajes descuadrados: clientes={viajes_clientes} total={sistema.viajes_totales} aceptadas={aceptadas}")
+    for taxi in sistema.taxis.values():
+        if (taxi.estado == "LIBRE") != (taxi in sistema.indice_libres):
+            errores.append(f"taxi {taxi.id} con estado {taxi.estado} incoherente con el índice")
+            break
+
+    print("OK: sin dobles asignaciones ni clientes perdidos" if not errores else "FALLOS:\n  " + "\n  ".join(errores))
+    return 0 if not errores else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_estres())
@@ -0,0 +1 @@
+# Los tests importan `modulos` desde backend/ (pytest añade la carpeta de este conftest al path)
@@ -0,0 +1,78 @@
+"""Generador de carga: reproduce trazas de solicitudes y mide latencia y solicitudes/s.
+
+Uso (desde backend/):
+    # Grabar tráfico real: arrancar la API con UNIETAXI_TRAZA=traza.csv
+    python generador_carga.py --traza traza.csv --velocidad 10
+    python generador_carga.py --modelo hora_punta --tasa 200 --duracion 60 [--guardar sintetica.csv]
+    python generador_carga.py --traza traza.csv --http http://localhost:8000 --concurrencia 256
+
+Sin --http va contra un SistemaUnieTaxi en proceso, con el motor en marcha.
+--velocidad 0 lanza la traza sin esperas (máximo sostenible).
+"""
+import argparse
+import asyncio
+import json
+
+from modulos import carga
+from modulos.bitacora import SILENCIO
+from modulos.servicio import ServicioUnieTaxi
+from modulos.sistema import SistemaUnieTaxi
+
+
+async def en_proceso(traza, args):
+    sistema = SistemaUnieTaxi(semilla=args.semilla, eventos=args.eventos, instrumentar=False)
+    sistema.log = SILENCIO
+    sistema.limite_flota = max(sistema.limite_flota, args.taxis)
+    for i in range(args.taxis): sistema.registrar_taxi("Carga", f"C-{i}")
+    servicio = ServicioUnieTaxi(sistema)
+    await servicio.iniciar()
+    try:
+        return await carga.reproducir(traza, carga.destino_local(servicio), args.velocidad, args.concurrencia)
+    finally:
+        await servicio.detener()
+
+
+async def por_http(traza, args):
+    import httpx  # Solo hace falta en este modo
+
+    limites = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+    async with httpx.AsyncClient(base_url=args.http, limits=limites, timeout=30.0) as cliente:
+        for i in range(args.taxis):
+            (await cliente.post("/taxis", json={"modelo": "Carga", "placa": f"C-{i}"})).raise_for_status()
+        return await carga.reproducir(traza, carga.destino_http(cliente), args.velocidad, args.concurrencia)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga de UNIE Taxi")
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--traza", help="CSV grabado con UNIETAXI_TRAZA o --guardar")
+    origen.add_argument("--modelo", choices=carga.MODELOS, help="Traza sintética")
+    parser.add_argument("--tasa", type=float, default=100.0, help="Solicitudes por segundo de media (sintética)")
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos de traza (sintética)")
+    parser.add_argument("--clientes", type=int, default=1000, help="Clientes distintos (sintética)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--guardar", metavar="RUTA", help="Guarda la traza sintética en un CSV")
+    parser.add_argument("--no-enviar", action="store_true", help="Solo genera (con --guardar)")
+    parser.add_argument("--velocidad", type=float, default=1.0, help="Múltiplo del tiempo real (0 = sin esperas)")
+    parser.add_argument("--concurrencia", type=int, default=256, help="Solicitudes en vuelo como máximo")
+    parser.add_argument("--http", metavar="URL", default=None, help="Envía a la API en vez de en proceso")
+    parser.add_argument("--taxis", type=int, default=None, help="Taxis a dar de alta antes (200 en proceso, 0 por HTTP)")
+    parser.add_argument("--eventos", action="store_true", help="En proceso: flota por eventos")
+    args = parser.parse_args()
+    if args.taxis is None: args.taxis = 0 if args.http else 200
+
+    if args.traza:
+        traza = carga.leer_traza(args.traza)
+    else:
+        traza = carga.traza_sintetica(args.duracion, args.tasa, args.modelo, args.clientes, args.semilla)
+        if args.guardar: carga.guardar_traza(traza, args.guardar)
+    if args.no_enviar:
+        print(json.dumps({"solicitudes": len(traza), "duracion_s": round(traza[-1][0], 3) if traza else 0}))
+        return
+
+    informe = asyncio.run(por_http(traza, args) if args.http else en_proceso(traza, args))
+    print(json.dumps(informe.resumen(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
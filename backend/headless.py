@@ -0,0 +1,42 @@
+"""Simulación sin servidor web, con semilla y reloj simulado, a toda velocidad.
+
+Uso (desde backend/):
+    python headless.py --taxis 1000 --ticks 5000 --solicitudes 20 --semilla 42 [--politica OPTIMO]
+
+No importa main.py: no arranca hilos ni uvicorn.
+"""
+import argparse
+import json
+
+from modulos.motor import simular, VELOCIDAD_SIMULACION
+from modulos.despacho import POLITICAS
+from modulos.red_viaria import RedViaria
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulación headless de UNIE Taxi")
+    parser.add_argument("--taxis", type=int, default=50)
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--solicitudes", type=int, default=1, help="Solicitudes generadas por tick")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--velocidad", type=float, default=VELOCIDAD_SIMULACION)
+    parser.add_argument("--politica", choices=POLITICAS, default=None)
+    parser.add_argument("--memoria", action="store_true", help="Mide memoria con tracemalloc (más lento)")
+    parser.add_argument("--eventos", action="store_true", help="Flota por eventos (coste por viaje, no por taxi y tick)")
+    parser.add_argument("--red", type=int, default=None, metavar="LADO", help="Calles en cuadrícula LADO x LADO")
+    parser.add_argument("--metricas", action="store_true", help="Instrumenta y vuelca las métricas (formato /metrics)")
+    args = parser.parse_args()
+
+    resultado = simular(
+        taxis=args.taxis, ticks=args.ticks, solicitudes_por_tick=args.solicitudes,
+        semilla=args.semilla, velocidad=args.velocidad, politica=args.politica,
+        medir_memoria=args.memoria, instrumentar=args.metricas, eventos=args.eventos,
+        red=RedViaria.cuadricula(args.red) if args.red else None,
+    )
+    metricas = resultado.pop("metricas", None)
+    print(json.dumps(resultado, indent=2))
+    if metricas: print(metricas, end="")
+
+
+if __name__ == "__main__":
+    main()
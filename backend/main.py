@@ -1,13 +1,69 @@
-import threading
-import time
-import random
-from fastapi import FastAPI, HTTPException
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from modulos.sistema import SistemaUnieTaxi
-
-app = FastAPI()
+from modulos.despacho import POLITICAS
+from modulos.motor import VELOCIDAD_NORMAL
+from modulos.serializador import a_json
+from modulos.servicio import ServicioUnieTaxi
+from modulos.regiones import CoordinadorRegiones
+from modulos.red_viaria import RedViaria
+from modulos.contabilidad import TAMANO_PODIO
+from modulos import bitacora
+
+# Nada arranca al importar: el estado y las tareas viven en el lifespan de la app
+servicio = None
+ESPERA_REGION = 5.0  # Segundos que /regiones/solicitar_viaje espera la respuesta de la región
+
+def crear_servicio():
+    """Construye el servicio con la configuración del entorno (sin arrancar nada)."""
+    # UNIETAXI_EVENTOS=1: los taxis en ruta no se mueven tick a tick (llegadas programadas)
+    # UNIETAXI_RED=cuadricula | ruta a un JSON de nodos/aristas: despacho y rutas por calles
+    ruta_red = os.environ.get("UNIETAXI_RED")
+    red = None
+    if ruta_red: red = RedViaria.cuadricula() if ruta_red == "cuadricula" else RedViaria.cargar(ruta_red)
+    sistema = SistemaUnieTaxi(eventos=os.environ.get("UNIETAXI_EVENTOS") == "1", red=red)
+
+    # UNIETAXI_REGIONES=4 arranca además una simulación de demostración en 4 procesos, uno por
+    # franja del mapa. Es otro mundo, con su propia flota (UNIETAXI_TAXIS_REGIONES): no sustituye
+    # a `sistema` y solo se ve por /regiones/*. Genera UNIETAXI_SOLICITUDES_REGION solicitudes
+    # por tick y región mientras la simulación está activa (/simulacion/config).
+    coordinador = None
+    n_regiones = int(os.environ.get("UNIETAXI_REGIONES", "1"))
+    if n_regiones > 1:
+        coordinador = CoordinadorRegiones(
+            n_regiones, taxis=int(os.environ.get("UNIETAXI_TAXIS_REGIONES", "200")),
+            solicitudes_por_tick=int(os.environ.get("UNIETAXI_SOLICITUDES_REGION", "1")),
+            velocidad=VELOCIDAD_NORMAL, pausa=0.05, carga_activa=False,
+        )
+
+    # UNIETAXI_DATOS=directorio del diario e instantáneas (cada UNIETAXI_INSTANTANEA_CADA segundos)
+    # UNIETAXI_TRAZA=fichero CSV donde grabar las solicitudes recibidas (ver generador_carga.py)
+    return ServicioUnieTaxi(
+        sistema, coordinador, os.environ.get("UNIETAXI_DATOS"),
+        float(os.environ.get("UNIETAXI_INSTANTANEA_CADA", "60")),
+        os.environ.get("UNIETAXI_TRAZA"),
+    )
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    global servicio
+    # Log asíncrono: UNIETAXI_LOG=DEBUG|INFO|WARNING|OFF, UNIETAXI_LOG_MAX=mensajes por segundo
+    bitacora.configurar(os.environ.get("UNIETAXI_LOG", "INFO"), int(os.environ.get("UNIETAXI_LOG_MAX", "50")))
+    servicio = crear_servicio()
+    await servicio.iniciar()
+    try:
+        yield
+    finally:
+        await servicio.detener()
+        bitacora.detener()
+
+app = FastAPI(lifespan=ciclo_de_vida)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,122 +72,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-sistema = SistemaUnieTaxi()
-SIMULACION_ACTIVA = False
-INTERVALO_GENERACION = 3.0
-
-# --- HILO 1: MOTOR FÍSICO + GESTIÓN COMPLETA ---
-def motor_fisica():
-    while True:
-        try:
-            sistema.tick_tiempo() 
-            
-            # FASE 1: GESTIÓN Y DESPACHO INICIAL
-            sistema.gestionar_abastecimiento() # ¿Contratamos?
-            sistema.procesar_despacho_automatico() # ¿Asignamos?
-
-            # FASE 2: MOVIMIENTO
-            with sistema.mutex_taxis:
-                taxis_activos = [t for t in sistema.taxis if t.estado == "OCUPADO" and t.destino_actual]
-            
-            velocidad = 8.0 if SIMULACION_ACTIVA else 2.0
-
-            for taxi in taxis_activos:
-                dest_x, dest_y = taxi.destino_actual
-                try:
-                    llegado = taxi.actualizar_posicion(dest_x, dest_y, velocidad)
-                    if llegado:
-                        # Finalizar viaje actual
-                        sistema.finalizar_viaje(taxi, random.uniform(10, 50))
-                        
-                        # INTENTO INMEDIATO DE REENGANCHE
-                        with sistema.mutex_taxis:
-                            trabajo_nuevo = sistema.asignar_trabajo_de_cola(taxi)
-                            if not trabajo_nuevo:
-                                taxi.estado = "LIBRE"
-                                taxi.destino_actual = None
-                            # Si hubo trabajo nuevo, el estado sigue siendo OCUPADO y tiene nuevo destino
-                            
-                except Exception as e:
-                    print(f"Error taxi {taxi.id}: {e}")
-
-            # FASE 3: DESPACHO FINAL (Red de seguridad)
-            # Por si acaso algún taxi quedó libre en un momento raro
-            sistema.procesar_despacho_automatico()
-        
-        except Exception as e:
-            print(f"Error motor: {e}")
-        
-        time.sleep(0.05)
-
-hilo_motor = threading.Thread(target=motor_fisica, daemon=True)
-hilo_motor.start()
-
-# --- HILO 2: SIMULADOR CON CURVA DE SATURACIÓN ---
-def simulador_clientes():
-    # CONFIGURACIÓN DE POBLACIÓN
-    POBLACION_IDEAL = 50 # El sistema intentará estabilizarse en torno a este número
-    
-    while True:
-        if SIMULACION_ACTIVA:
-            cliente_id_seleccionado = None
-            
-            # 1. DATOS ACTUALES
-            total_clientes = len(sistema.clientes)
-            clientes_libres = [c for c in sistema.clientes if c.id not in sistema.clientes_viajando]
-            
-            # 2. CÁLCULO DE PROBABILIDAD DINÁMICA
-            # Calculamos qué tan probable es reutilizar a alguien basado en cuántos somos.
-            # - Si somos 0: prob_reuso = 0.0 (0%) -> Todo nuevo
-            # - Si somos 25: prob_reuso = 0.5 (50%) -> Mitad y mitad
-            # - Si somos 50+: prob_reuso = 0.99 (99%) -> Casi siempre reusamos
-            
-            if total_clientes == 0:
-                prob_reuso = 0
-            else:
-                prob_reuso = min(0.99, total_clientes / POBLACION_IDEAL)
-
-            # 3. TOMA DE DECISIÓN
-            usar_existente = False
-
-            if len(clientes_libres) == 0:
-                # CASO A: Saturación total (Nadie libre).
-                # Obligamos a crear nuevo aunque seamos muchos, para no parar el tráfico.
-                usar_existente = False
-                print(f"[AUTO] ⚠️ Saturación ({total_clientes} activos). Creando refuerzo.")
-            
-            elif random.random() < prob_reuso:
-                # CASO B: La probabilidad dice que REUSEMOS (porque ya somos muchos)
-                usar_existente = True
-            
-            else:
-                # CASO C: La probabilidad dice NUEVO (somos pocos o hubo suerte)
-                usar_existente = False
-
-            # 4. EJECUCIÓN
-            if usar_existente:
-                cliente = random.choice(clientes_libres)
-                cliente_id_seleccionado = cliente.id
-                print(f"[AUTO] ♻️ ({int(prob_reuso*100)}% Reuso) Cliente {cliente.id} vuelve a viajar.")
-            else:
-                nuevo = sistema.registrar_cliente(f"Bot_{random.randint(1000,9999)}", "VISA")
-                cliente_id_seleccionado = nuevo.id
-                print(f"[AUTO] ✨ ({int((1-prob_reuso)*100)}% Nuevo) Bienvenido Cliente {nuevo.id}.")
-
-            sistema.procesar_solicitud(
-                cliente_id_seleccionado,
-                random.uniform(0, 100), random.uniform(0, 100),
-                random.uniform(0, 100), random.uniform(0, 100)
-            )
-            
-            time.sleep(INTERVALO_GENERACION) 
-        else:
-            time.sleep(0.1)
-
-hilo_simulacion = threading.Thread(target=simulador_clientes, daemon=True)
-hilo_simulacion.start()
-
-# --- ENDPOINTS (Igual que antes) ---
+# --- ENDPOINTS ---
+# Lecturas: async y solo de la foto publicada en el último tick (las grandes se serializan en
+# el threadpool). Excepciones: /metrics lee los contadores en vivo y /regiones/* la memoria compartida.
+# Escrituras: async, con el trabajo del sistema en un hilo (`servicio.ejecutar`).
 class TaxiRegistro(BaseModel):
     modelo: str
     placa: str
@@ -146,44 +90,47 @@ class SolicitudViaje(BaseModel):
 class ConfigSimulacion(BaseModel):
     activa: Optional[bool] = None
     intervalo: Optional[float] = None
+    politica_despacho: Optional[str] = None # "FIFO" | "OPTIMO"
+    nivel_log: Optional[str] = None # "DEBUG" | "INFO" | "WARNING" | "OFF"
 
 @app.get("/estado")
-def ver_estado():
-    # ... (Cálculo mejor taxi igual) ...
-    mejor_taxi = None
-    if sistema.taxis:
-        mejor_taxi_obj = max(sistema.taxis, key=lambda t: t.ganancias)
-        if mejor_taxi_obj.ganancias > 0:
-            mejor_taxi = {"id": mejor_taxi_obj.id, "modelo": mejor_taxi_obj.modelo, "ganancias": round(mejor_taxi_obj.ganancias, 2)}
-
-    return {
-        "taxis": sistema.taxis,
-        "clientes": sistema.clientes, 
-        # Añadimos info de la cola para depuración si quieres
-        "cola_espera": len(sistema.cola_espera), 
-        "empresa_ganancia": round(sistema.ganancia_empresa, 2),
-        "viajes": sistema.viajes_totales,
-        "mejor_taxi": mejor_taxi,
-        "simulacion_activa": SIMULACION_ACTIVA,
-        "intervalo_generacion": INTERVALO_GENERACION,
-        "tiempo_simulado": sistema.tiempo_actual.strftime("%d/%m/%Y %H:%M")
-    }
+async def ver_estado():
+    return Response(await servicio.estado(), media_type="application/json")
+
+@app.get("/estado/cambios")
+async def ver_cambios(desde: int = 0):
+    # Solo lo que cambió desde la versión que ya tiene el cliente (foto completa la primera vez)
+    return Response(await servicio.cambios(desde), media_type="application/json")
+
+@app.get("/estado/flota")
+async def ver_flota(formato: str = "columnar"):
+    # Flota empaquetada por columnas: JSON columnar o binario (ver modulos/serializador.py)
+    if formato not in ("columnar", "binario"): raise HTTPException(status_code=400, detail="Formato desconocido")
+    tipo = "application/octet-stream" if formato == "binario" else "application/json"
+    return Response(await servicio.flota(formato), media_type=tipo)
+
+@app.get("/estado/clientes")
+async def ver_clientes():
+    return Response(await servicio.clientes(), media_type="application/json")
 
 @app.post("/taxis")
-def crear_taxi(datos: TaxiRegistro):
-    taxi = sistema.registrar_taxi(datos.modelo, datos.placa)
+async def crear_taxi(datos: TaxiRegistro):
+    taxi = await servicio.ejecutar(servicio.sistema.registrar_taxi, datos.modelo, datos.placa)
     if not taxi: raise HTTPException(status_code=400, detail="Rechazado")
-    return taxi
+    return taxi.a_dict()
 
 @app.delete("/taxis/{taxi_id}")
-def borrar_taxi(taxi_id: int):
-    exito, mensaje = sistema.eliminar_taxi(taxi_id)
+async def borrar_taxi(taxi_id: int):
+    exito, mensaje = await servicio.ejecutar(servicio.sistema.eliminar_taxi, taxi_id)
     if not exito: raise HTTPException(status_code=400, detail=mensaje)
     return {"mensaje": mensaje}
 
 @app.post("/solicitar_viaje")
-def solicitar(datos: SolicitudViaje):
-    res = sistema.procesar_solicitud(datos.cliente_id, datos.origen_x, datos.origen_y, datos.destino_x, datos.destino_y)
+async def solicitar(datos: SolicitudViaje):
+    servicio.grabar(datos.cliente_id, datos.origen_x, datos.origen_y, datos.destino_x, datos.destino_y)
+    res = await servicio.ejecutar(
+        servicio.sistema.procesar_solicitud, datos.cliente_id, datos.origen_x, datos.origen_y, datos.destino_x, datos.destino_y
+    )
     
     if res == "ID_INVALIDO": return {"resultado": "Error: ID inválido."}
     if res == "CLIENTE_OCUPADO": return {"resultado": "Cliente ocupado."}
@@ -195,9 +142,82 @@ def solicitar(datos: SolicitudViaje):
     # Si devuelve objeto taxi
     return {"resultado": "Asignado", "taxi_id": res.id}
 
+@app.post("/solicitar_viaje/lote")
+async def solicitar_lote(datos: List[SolicitudViaje]):
+    """Ráfaga de solicitudes: se validan, emparejan y encolan en una sola pasada."""
+    for s in datos: servicio.grabar(s.cliente_id, s.origen_x, s.origen_y, s.destino_x, s.destino_y)
+    resultados = await servicio.ejecutar(
+        servicio.sistema.procesar_solicitudes_lote,
+        [(s.cliente_id, s.origen_x, s.origen_y, s.destino_x, s.destino_y) for s in datos],
+    )
+    salida = []
+    for s, res in zip(datos, resultados):
+        if isinstance(res, str): salida.append({"cliente_id": s.cliente_id, "resultado": res})
+        else: salida.append({"cliente_id": s.cliente_id, "resultado": "ASIGNADO", "taxi_id": res.id})
+    return Response(a_json({"resultados": salida}), media_type="application/json")
+
 @app.post("/simulacion/config")
-def configurar_simulacion(config: ConfigSimulacion):
-    global SIMULACION_ACTIVA, INTERVALO_GENERACION
-    if config.activa is not None: SIMULACION_ACTIVA = config.activa
-    if config.intervalo is not None: INTERVALO_GENERACION = max(0.1, config.intervalo)
-    return {"mensaje": "Configuración actualizada", "activa": SIMULACION_ACTIVA, "intervalo": INTERVALO_GENERACION}
\ No newline at end of file
+async def configurar_simulacion(config: ConfigSimulacion):
+    if config.politica_despacho is not None:
+        if config.politica_despacho not in POLITICAS: raise HTTPException(status_code=400, detail="Política desconocida")
+        servicio.sistema.politica_despacho = config.politica_despacho
+    if config.nivel_log is not None:
+        if config.nivel_log.upper() not in ("DEBUG", "INFO", "WARNING", "ERROR", "OFF"): raise HTTPException(status_code=400, detail="Nivel de log desconocido")
+        # Reconfigurar detiene el hilo del log tras vaciarlo: mejor fuera del bucle
+        await servicio.ejecutar(bitacora.configurar, config.nivel_log, bitacora.filtro.max_por_segundo if bitacora.filtro else 50)
+    if config.activa is not None:
+        servicio.simulacion_activa = config.activa
+        if servicio.coordinador is not None: servicio.coordinador.activar_carga(config.activa)
+    if config.intervalo is not None: servicio.intervalo_generacion = max(0.1, config.intervalo)
+    return {"mensaje": "Configuración actualizada", "activa": servicio.simulacion_activa,
+            "intervalo": servicio.intervalo_generacion, "politica_despacho": servicio.sistema.politica_despacho}
+
+@app.get("/despacho/estadisticas")
+async def estadisticas_despacho():
+    return servicio.despacho()
+
+@app.get("/contabilidad/clasificacion")
+async def ver_clasificacion(n: int = 10):
+    # Podios mantenidos al cobrar cada viaje y publicados en la foto: O(n), sin recorrer la flota
+    return servicio.clasificacion(min(max(n, 0), TAMANO_PODIO))
+
+@app.get("/contabilidad/serie")
+async def ver_serie(franjas: int = 24):
+    return servicio.serie(franjas)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metricas():
+    # Formato de texto de Prometheus. En vivo, no de la foto: cada muestreo quiere el valor de ese
+    # momento, y los histogramas solo toman su lock el rato de copiar los cubos
+    return PlainTextResponse(servicio.sistema.metricas.exportar(), media_type="text/plain; version=0.0.4")
+
+# --- SIMULACIÓN POR REGIONES (demostración aparte, un proceso por región: UNIETAXI_REGIONES) ---
+# Las lecturas por seqlock pueden reintentar hasta ESPERA_MAXIMA_LECTURA: van a un hilo, no al bucle
+@app.get("/regiones/estado")
+async def estado_regiones(taxis: bool = False):
+    if servicio.coordinador is None: raise HTTPException(status_code=404, detail="Simulación por regiones desactivada")
+    try:
+        cuerpo = await servicio.ejecutar(lambda: a_json(servicio.coordinador.estado(incluir_taxis=taxis)))
+    except TimeoutError as error:
+        raise HTTPException(status_code=503, detail=str(error))
+    return Response(cuerpo, media_type="application/json")
+
+@app.post("/regiones/solicitar_viaje")
+async def solicitar_en_region(datos: SolicitudViaje):
+    if servicio.coordinador is None: raise HTTPException(status_code=404, detail="Simulación por regiones desactivada")
+    if datos.cliente_id <= 0: return {"resultado": "Error: ID inválido."}
+    try:
+        region, futuro = await servicio.ejecutar(
+            servicio.coordinador.solicitar, datos.cliente_id, datos.origen_x, datos.origen_y, datos.destino_x, datos.destino_y
+        )
+    except TimeoutError as error:
+        raise HTTPException(status_code=503, detail=str(error))
+    try:
+        resultado, taxi_id = await asyncio.wait_for(asyncio.wrap_future(futuro), ESPERA_REGION)
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail="La región no responde")
+    finally:
+        # Por timeout o desconexión: el coordinador la olvida y descartará la respuesta tardía
+        futuro.cancel()
+    if taxi_id is None: return {"resultado": resultado, "region": region}
+    return {"resultado": resultado, "region": region, "taxi_id": taxi_id}
@@ -0,0 +1,83 @@
+"""Log asíncrono, por niveles y con tope de mensajes por segundo.
+
+Los hilos de la simulación solo encolan el registro (sin formatear ni escribir);
+un hilo aparte (QueueListener) lo formatea y lo saca por stderr. Lo que supera
+el tope se descarta y se cuenta en `filtro.descartados`.
+
+Sin llamar a `configurar` el logger no tiene manejadores: solo los WARNING o más
+llegan a la salida por defecto de `logging`.
+"""
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+log = logging.getLogger("unietaxi")
+
+# Logger apagado para simulaciones headless y procesos-región: ni formatea ni encola
+SILENCIO = logging.getLogger("unietaxi.silencio")
+SILENCIO.disabled = True
+
+_oyente = None
+filtro = None
+
+
+class FiltroFrecuencia(logging.Filter):
+    """Cubo de fichas: deja pasar como mucho `max_por_segundo` mensajes (con ráfagas de ese tamaño)."""
+
+    def __init__(self, max_por_segundo):
+        super().__init__()
+        self.max_por_segundo = max_por_segundo
+        self.fichas = float(max_por_segundo)
+        self.ultimo = time.monotonic()
+        self.descartados = 0
+        self._mutex = threading.Lock()
+
+    def filter(self, record):
+        with self._mutex:
+            ahora = time.monotonic()
+            self.fichas = min(self.max_por_segundo, self.fichas + (ahora - self.ultimo) * self.max_por_segundo)
+            self.ultimo = ahora
+            if self.fichas >= 1:
+                self.fichas -= 1
+                return True
+            self.descartados += 1
+            return False
+
+
+class _ManejadorCola(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Mismo proceso: el formateo se hace en el hilo del oyente, no en el que loguea
+        return record
+
+
+def configurar(nivel="INFO", max_por_segundo=50):
+    """(Re)configura el log. `nivel` "OFF" o None lo apaga del todo."""
+    global _oyente, filtro
+    detener()
+    if nivel is None or str(nivel).upper() == "OFF":
+        log.disabled = True
+        return
+    log.disabled = False
+    log.setLevel(str(nivel).upper())
+    log.propagate = False
+
+    cola = queue.SimpleQueue()
+    filtro = FiltroFrecuencia(max_por_segundo)
+    manejador = _ManejadorCola(cola)
+    manejador.addFilter(filtro)
+    log.handlers = [manejador]
+
+    salida = logging.StreamHandler()
+    salida.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    _oyente = logging.handlers.QueueListener(cola, salida)
+    _oyente.start()
+
+
+def detener():
+    """Vacía lo pendiente y para el hilo del oyente."""
+    global _oyente
+    if _oyente is not None:
+        _oyente.stop()
+        _oyente = None
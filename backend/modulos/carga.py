@@ -0,0 +1,215 @@
+"""Generación de carga: trazas de solicitudes (reales o sintéticas) y su reproducción.
+
+Una traza es un CSV con cabecera `t,cliente_id,ox,oy,dx,dy` (t en segundos desde
+la primera solicitud). Se graba desde /solicitar_viaje (`GrabadorTraza`, con
+UNIETAXI_TRAZA) o se genera con `traza_sintetica` (uniforme, focos u hora punta).
+
+`reproducir` la lanza a `velocidad` veces el tiempo real (0 = sin esperas) contra
+un destino: el servicio en proceso (`destino_local`) o la API por HTTP con un
+cliente asíncrono con pool de conexiones (`destino_http`). Es un bucle abierto:
+cada solicitud sale en su instante aunque las anteriores no hayan respondido, y
+la latencia se mide desde ese instante (si el destino se atasca, la espera cuenta).
+"""
+import asyncio
+import csv
+import math
+import threading
+import time
+import random
+from collections import Counter
+
+CABECERA = ("t", "cliente_id", "ox", "oy", "dx", "dy")
+MODELOS = ("uniforme", "focos", "hora_punta")
+TAMANO_MAPA = 100.0
+
+# Focos de demanda (x, y, peso): estaciones, centro, campus...
+FOCOS = ((25.0, 25.0, 3), (70.0, 30.0, 2), (50.0, 75.0, 4), (85.0, 85.0, 1))
+DISPERSION_FOCO = 6.0
+FONDO = 0.2  # Parte de la demanda que no sale de ningún foco
+CENTRO = (50.0, 50.0)  # Adonde va todo el mundo en hora punta
+PICO_HORA_PUNTA = 3.0  # Tasa en el pico respecto a la de fuera de la campana
+
+
+# --- TRAZAS ---
+class GrabadorTraza:
+    """Apunta en un CSV cada solicitud que llega (con búfer: `cerrar` lo vuelca)."""
+
+    def __init__(self, ruta):
+        self._fichero = open(ruta, "w", newline="", encoding="utf-8")
+        self._escritor = csv.writer(self._fichero)
+        self._escritor.writerow(CABECERA)
+        self._inicio = None
+        self._mutex = threading.Lock()
+        self.grabadas = 0
+
+    def anotar(self, cliente_id, ox, oy, dx, dy):
+        ahora = time.monotonic()
+        with self._mutex:
+            if self._inicio is None: self._inicio = ahora
+            self._escritor.writerow((f"{ahora - self._inicio:.6f}", cliente_id, ox, oy, dx, dy))
+            self.grabadas += 1
+
+    def cerrar(self):
+        with self._mutex:
+            self._fichero.close()
+
+
+def leer_traza(ruta):
+    """Lista de (t, cliente_id, ox, oy, dx, dy) ordenada por t."""
+    with open(ruta, newline="", encoding="utf-8") as f:
+        lector = csv.reader(f)
+        next(lector, None)  # Cabecera
+        traza = [(float(t), int(c), float(ox), float(oy), float(dx), float(dy)) for t, c, ox, oy, dx, dy in lector]
+    traza.sort(key=lambda solicitud: solicitud[0])
+    return traza
+
+
+def guardar_traza(traza, ruta):
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(CABECERA)
+        for t, *resto in traza: escritor.writerow((f"{t:.6f}", *resto))
+
+
+def _recortar(v):
+    return min(max(v, 0.0), TAMANO_MAPA)
+
+
+def _punto_en_focos(rng):
+    if rng.random() < FONDO: return rng.uniform(0, TAMANO_MAPA), rng.uniform(0, TAMANO_MAPA)
+    x, y, _ = rng.choices(FOCOS, weights=[peso for _, _, peso in FOCOS])[0]
+    return _recortar(rng.gauss(x, DISPERSION_FOCO)), _recortar(rng.gauss(y, DISPERSION_FOCO))
+
+
+def traza_sintetica(duracion, tasa, modelo="focos", clientes=1000, semilla=0):
+    """Llegadas de Poisson con `tasa` solicitudes por segundo de media durante `duracion` segundos.
+
+    - uniforme: orígenes y destinos uniformes en el mapa.
+    - focos: orígenes y destinos concentrados en FOCOS, con un FONDO uniforme.
+    - hora_punta: la tasa es una campana centrada a mitad de la traza (PICO_HORA_PUNTA
+      veces la de los extremos); se sale de los focos y se va hacia el CENTRO.
+    Los cliente_id se eligen al azar entre 1 y `clientes`.
+    """
+    if modelo not in MODELOS: raise ValueError(f"Modelo desconocido: {modelo}")
+    rng = random.Random(semilla)
+    mitad, anchura = duracion / 2, duracion / 8
+
+    # Hora punta: base * (1 + (PICO-1) * campana); la media de la campana en la traza es √π/8
+    base = tasa / (1 + (PICO_HORA_PUNTA - 1) * math.sqrt(math.pi) / 8) if modelo == "hora_punta" else tasa
+    tasa_maxima = base * PICO_HORA_PUNTA if modelo == "hora_punta" else tasa
+
+    traza = []
+    t = 0.0
+    while True:
+        t += rng.expovariate(tasa_maxima)
+        if t >= duracion: break
+        if modelo == "hora_punta":
+            # Aclarado: se descartan llegadas en proporción a lo que baja la tasa
+            tasa_t = base * (1 + (PICO_HORA_PUNTA - 1) * math.exp(-((t - mitad) / anchura) ** 2))
+            if rng.random() * tasa_maxima > tasa_t: continue
+
+        if modelo == "uniforme":
+            ox, oy = rng.uniform(0, TAMANO_MAPA), rng.uniform(0, TAMANO_MAPA)
+            dx, dy = rng.uniform(0, TAMANO_MAPA), rng.uniform(0, TAMANO_MAPA)
+        elif modelo == "focos":
+            (ox, oy), (dx, dy) = _punto_en_focos(rng), _punto_en_focos(rng)
+        else:
+            ox, oy = _punto_en_focos(rng)
+            dx, dy = _recortar(rng.gauss(CENTRO[0], DISPERSION_FOCO)), _recortar(rng.gauss(CENTRO[1], DISPERSION_FOCO))
+        traza.append((t, rng.randint(1, clientes), ox, oy, dx, dy))
+    return traza
+
+
+# --- DESTINOS ---
+def destino_local(servicio):
+    """Envía cada solicitud directamente al sistema de `servicio` (sin HTTP).
+
+    Como /solicitar_viaje, la solicitud corre en un hilo (`servicio.ejecutar`): así
+    hay de verdad varias en vuelo y el bucle sigue lanzando las siguientes a su hora.
+    """
+    async def enviar(cliente_id, ox, oy, dx, dy):
+        resultado = await servicio.ejecutar(servicio.sistema.procesar_solicitud, cliente_id, ox, oy, dx, dy)
+        return resultado if isinstance(resultado, str) else "ASIGNADO"
+    return enviar
+
+
+def destino_http(cliente):
+    """POST /solicitar_viaje con `cliente` (httpx.AsyncClient con base_url y pool de conexiones)."""
+    async def enviar(cliente_id, ox, oy, dx, dy):
+        respuesta = await cliente.post("/solicitar_viaje", json={
+            "cliente_id": cliente_id, "origen_x": ox, "origen_y": oy, "destino_x": dx, "destino_y": dy,
+        })
+        respuesta.raise_for_status()
+        datos = respuesta.json()
+        if "taxi_id" in datos: return "ASIGNADO"
+        texto = datos["resultado"].lower()
+        if "cola" in texto: return "EN_COLA"
+        if "ocupado" in texto: return "CLIENTE_OCUPADO"
+        return datos["resultado"]
+    return enviar
+
+
+# --- REPRODUCCIÓN ---
+class Informe:
+    def __init__(self):
+        self.latencias = []
+        self.resultados = Counter()
+        self.errores = 0
+        self.retraso_maximo = 0.0  # Lo más tarde que salió una solicitud respecto a su instante
+        self.duracion = 0.0
+
+    def resumen(self):
+        latencias = sorted(self.latencias)
+        n = len(latencias)
+
+        def percentil(p):
+            return round(latencias[min(n - 1, math.ceil(p / 100 * n) - 1)] * 1000, 3) if n else None
+
+        return {
+            "enviadas": n,
+            "duracion_s": round(self.duracion, 3),
+            "solicitudes_por_segundo": round(n / self.duracion, 1) if self.duracion else None,
+            "latencia_ms": {"p50": percentil(50), "p90": percentil(90), "p99": percentil(99),
+                            "p999": percentil(99.9), "max": percentil(100)},
+            "resultados": dict(self.resultados),
+            "errores": self.errores,
+            "retraso_maximo_ms": round(self.retraso_maximo * 1000, 3),
+        }
+
+
+async def reproducir(traza, enviar, velocidad=1.0, concurrencia=256):
+    """Lanza la traza contra `enviar` a `velocidad` veces el tiempo real (0 = sin esperas).
+
+    Como mucho hay `concurrencia` solicitudes en vuelo; si se llega al tope, las
+    siguientes salen tarde y su latencia incluye ese retraso.
+    """
+    informe = Informe()
+    limite = asyncio.Semaphore(concurrencia)
+    pendientes = set()
+
+    async def una(instante, solicitud):
+        try:
+            informe.resultados[await enviar(*solicitud)] += 1
+        except Exception:
+            informe.errores += 1
+        finally:
+            informe.latencias.append(time.perf_counter() - instante)
+            limite.release()
+
+    inicio = time.perf_counter()
+    for t, *solicitud in traza:
+        if velocidad:
+            instante = inicio + t / velocidad
+            espera = instante - time.perf_counter()
+            if espera > 0: await asyncio.sleep(espera)
+            await limite.acquire()
+        else:
+            await limite.acquire()
+            instante = time.perf_counter()
+        informe.retraso_maximo = max(informe.retraso_maximo, time.perf_counter() - instante)
+        tarea = asyncio.create_task(una(instante, solicitud))
+        pendientes.add(tarea)
+        tarea.add_done_callback(pendientes.discard)
+    await asyncio.gather(*list(pendientes))
+    informe.duracion = time.perf_counter() - inicio
+    return informe
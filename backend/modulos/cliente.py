@@ -1,4 +1,8 @@
 class Cliente:
+    # El simulador crea clientes sin límite: __slots__ evita un __dict__ por cada uno
+    __slots__ = ("id", "nombre", "tarjeta_credito", "viajes", "posicion_x", "posicion_y")
+    CAMPOS = __slots__  # Claves de `a_dict`, en el orden de `a_fila`
+
     def __init__(self, id, nombre, tarjeta_credito):
         self.id = id
         self.nombre = nombre
@@ -9,6 +13,17 @@ class Cliente:
         
     # Nota: No necesitamos mucha lógica aquí, el sistema lo gestiona todo.
 
+    def a_dict(self):
+        """Representación JSON del cliente."""
+        return {
+            "id": self.id, "nombre": self.nombre, "tarjeta_credito": self.tarjeta_credito,
+            "viajes": self.viajes, "posicion_x": self.posicion_x, "posicion_y": self.posicion_y,
+        }
+
+    def a_fila(self):
+        """Los valores de `a_dict` en una tupla, en el orden de CAMPOS."""
+        return (self.id, self.nombre, self.tarjeta_credito, self.viajes, self.posicion_x, self.posicion_y)
+
     def solicitar_viaje(self, origen_x, origen_y, destino_x, destino_y):
         """Registra la intención de viaje del cliente."""
         self.posicion_x = origen_x
@@ -0,0 +1,102 @@
+"""Agregados de contabilidad que se mantienen al cobrar cada viaje.
+
+- `Podio`: los K primeros por un valor que solo crece (ganancias de un taxi,
+  viajes de un cliente), sin recorrer la flota.
+- `SerieTemporal`: viajes e ingresos por franjas de tiempo simulado.
+
+Los escribe `finalizar_viaje` con `mutex_contabilidad` tomado. Los lectores no
+toman ningún lock: el podio publica una tupla inmutable (`foto`) cuando cambia
+su cabeza y la serie guarda tuplas que se sustituyen enteras.
+"""
+from bisect import bisect_left, insort
+from collections import deque
+from datetime import timedelta
+
+TAMANO_PODIO = 100
+FRANJAS_SERIE = 168  # Una semana de franjas de una hora
+
+
+class Podio:
+    """Los `k` primeros por valor, para valores que solo crecen.
+
+    Guarda hasta 2k entradas: las de fuera siempre valen menos que la última de
+    dentro, así que una baja en el podio no obliga a recorrer a todos. Solo si
+    quedan menos de k y alguna vez se expulsó a alguien se reconstruye con
+    `fuente()`, que da pares (clave, valor) de todos.
+    """
+
+    def __init__(self, fuente, k=TAMANO_PODIO):
+        self.k = k
+        self.capacidad = 2 * k
+        self.fuente = fuente
+        self.valores = {}  # clave -> valor, solo de las que están dentro
+        self.orden = []  # (-valor, clave): de mayor a menor
+        self.recortado = False  # Hay claves fuera que podrían merecer estar dentro tras una baja
+        self.foto = ()  # ((clave, valor), ...) de los k primeros
+
+    def actualizar(self, clave, valor):
+        """Nuevo valor (mayor o igual que el anterior) de `clave`."""
+        anterior = self.valores.get(clave)
+        if anterior is None:
+            # Si puede haber claves fuera (lleno o recortado), solo entra quien supera al último de dentro:
+            # las de fuera valen menos que él, pero podrían valer más que el recién llegado
+            if (self.recortado or len(self.orden) >= self.capacidad) and self.orden and (-valor, clave) > self.orden[-1]:
+                self.recortado = True
+                return
+            posicion_antes = len(self.orden)
+        else:
+            posicion_antes = bisect_left(self.orden, (-anterior, clave))
+            del self.orden[posicion_antes]
+        self.valores[clave] = valor
+        insort(self.orden, (-valor, clave))
+        if len(self.orden) > self.capacidad:
+            _, fuera = self.orden.pop()
+            del self.valores[fuera]
+            self.recortado = True
+        if min(posicion_antes, bisect_left(self.orden, (-valor, clave))) < self.k: self._publicar()
+
+    def quitar(self, clave):
+        valor = self.valores.pop(clave, None)
+        if valor is None: return
+        posicion = bisect_left(self.orden, (-valor, clave))
+        del self.orden[posicion]
+        if self.recortado and len(self.orden) < self.k: self.reconstruir()
+        elif posicion < self.k: self._publicar()
+
+    def reconstruir(self):
+        """Rehace el podio desde `fuente()` (alta masiva, restauración o caso raro de bajas)."""
+        self.orden = sorted((-valor, clave) for clave, valor in self.fuente() if valor > 0)
+        self.recortado = len(self.orden) > self.capacidad
+        del self.orden[self.capacidad:]
+        self.valores = {clave: -valor for valor, clave in self.orden}
+        self._publicar()
+
+    def _publicar(self):
+        self.foto = tuple((clave, -valor) for valor, clave in self.orden[:self.k])
+
+    def primeros(self, n):
+        return self.foto[:n]
+
+
+class SerieTemporal:
+    """Viajes, facturación y comisión por franjas de `ancho` de tiempo simulado.
+
+    Solo se guardan las últimas `franjas` con actividad (las vacías no aparecen).
+    """
+
+    def __init__(self, ancho=timedelta(hours=1), franjas=FRANJAS_SERIE):
+        self.ancho = ancho
+        self.franjas = deque(maxlen=franjas)  # (inicio, viajes, facturado, comision)
+
+    def anotar(self, instante, facturado, comision):
+        inicio = instante - (instante - instante.min) % self.ancho
+        if self.franjas and self.franjas[-1][0] == inicio:
+            _, viajes, total, empresa = self.franjas[-1]
+            self.franjas[-1] = (inicio, viajes + 1, total + facturado, empresa + comision)
+        else:
+            self.franjas.append((inicio, 1, facturado, comision))
+
+    def ultimas(self, n):
+        # Copiar un deque de tuplas no suelta el GIL: es una lectura atómica sin lock
+        franjas = tuple(self.franjas)
+        return franjas[-n:] if n > 0 else ()
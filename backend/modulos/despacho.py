@@ -0,0 +1,153 @@
+import math
+
+# Políticas de despacho de la cola de espera
+POLITICA_FIFO = "FIFO"        # Orden de llegada, sin mirar distancias
+POLITICA_OPTIMA = "OPTIMO"    # Minimiza la distancia total de recogida del lote
+POLITICAS = (POLITICA_FIFO, POLITICA_OPTIMA)
+
+# Por encima de este coste (filas² x columnas) el húngaro en Python puro es demasiado lento
+LIMITE_HUNGARO = 2_000_000
+# Candidatos que mira cada solicitud en el modo voraz
+K_VECINOS = 5
+# Solo entran al lote las FACTOR_VENTANA x (taxis libres) solicitudes más antiguas,
+# para que una petición lejana no se quede esperando indefinidamente
+FACTOR_VENTANA = 2
+# Con red viaria: candidatos por cercanía en línea recta que se ordenan por ETA real
+K_CANDIDATOS_RED = 16
+
+
+def distancia_recogida(taxi, solicitud):
+    return math.hypot(taxi.x - float(solicitud["ox"]), taxi.y - float(solicitud["oy"]))
+
+
+def hungaro(costes):
+    """Asignación de coste mínimo (Kuhn-Munkres, O(n²m)) para una matriz n x m con n <= m.
+
+    Devuelve, para cada fila, la columna asignada.
+    """
+    n = len(costes)
+    m = len(costes[0]) if n else 0
+    inf = float('inf')
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)    # p[j] = fila asignada a la columna j (1-indexado, 0 = libre)
+    camino = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        usado = [False] * (m + 1)
+        while True:
+            usado[j0] = True
+            i0 = p[j0]
+            fila = costes[i0 - 1]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not usado[j]:
+                    actual = fila[j - 1] - u[i0] - v[j]
+                    if actual < minv[j]:
+                        minv[j] = actual
+                        camino[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if usado[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0: break
+        # Deshacemos el camino aumentante
+        while j0:
+            j1 = camino[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    asignacion = [-1] * n
+    for j in range(1, m + 1):
+        if p[j]: asignacion[p[j] - 1] = j - 1
+    return asignacion
+
+
+def reclamar_por_red(indice, red, x, y):
+    """Reclama el taxi libre que antes llega a (x, y) por las calles.
+
+    Mira los K_CANDIDATOS_RED más cercanos en línea recta (la red no hace mucho
+    más rápido a uno lejano) y los ordena por ETA. Reintenta si otro hilo se lleva
+    el elegido.
+    """
+    while True:
+        candidatos = indice.k_mas_cercanos(x, y, K_CANDIDATOS_RED)
+        if not candidatos: return None
+        taxi, _ = red.mas_rapido([t for _, t in candidatos], float(x), float(y))
+        if indice.quitar(taxi): return taxi
+
+
+def emparejar_lote(solicitudes, indice):
+    """Empareja un lote de solicitudes nuevas en una sola pasada (voraz global).
+
+    Cada solicitud busca sus K_VECINOS una sola vez; las aristas de todo el lote se
+    ordenan juntas, así un taxi disputado va a la solicitud que tiene más cerca.
+    Como en la cola, solo compiten las FACTOR_VENTANA x (taxis libres) primeras: el
+    resto no tiene taxi seguro y buscarle vecinos recorrería medio mapa.
+    Devuelve pares (taxi, solicitud) con los taxis ya reclamados.
+    """
+    ventana = min(len(solicitudes), FACTOR_VENTANA * len(indice))
+    if not ventana: return []
+    return _emparejar_voraz(solicitudes[:ventana], indice)
+
+
+def emparejar_optimo(taxis, solicitudes, indice):
+    """Empareja un lote de taxis libres con solicitudes minimizando la distancia total de recogida.
+
+    Lotes pequeños se resuelven exactos con el húngaro; los grandes con un voraz global
+    sobre los k vecinos de cada solicitud (podado por el índice espacial).
+    Devuelve una lista de pares (taxi, solicitud); cada taxi devuelto ya ha sido
+    reclamado (sacado de `indice`), así que otro hilo no puede asignarlo a la vez.
+    """
+    if not taxis or not solicitudes: return []
+
+    # El húngaro necesita filas <= columnas: ponemos como filas el lado más corto
+    filas, columnas = (taxis, solicitudes) if len(taxis) <= len(solicitudes) else (solicitudes, taxis)
+    if len(filas) ** 2 * len(columnas) <= LIMITE_HUNGARO:
+        if filas is taxis:
+            costes = [[distancia_recogida(t, s) for s in solicitudes] for t in taxis]
+            pares = [(taxis[i], solicitudes[j]) for i, j in enumerate(hungaro(costes))]
+        else:
+            costes = [[distancia_recogida(t, s) for t in taxis] for s in solicitudes]
+            pares = [(taxis[j], solicitudes[i]) for i, j in enumerate(hungaro(costes))]
+        # Si otro hilo se llevó el taxi entretanto, esa solicitud se queda para el siguiente lote
+        return [(taxi, solicitud) for taxi, solicitud in pares if indice.quitar(taxi)]
+
+    return _emparejar_voraz(solicitudes, indice)
+
+
+def _emparejar_voraz(solicitudes, indice):
+    """Voraz global: ordena todas las aristas (solicitud, k vecinos) por distancia y las va cogiendo.
+
+    Los taxis emparejados se reclaman de `indice`; las solicitudes que se quedan sin
+    candidato libre caen al vecino más cercano que quede, en orden FIFO.
+    """
+    aristas = []
+    for i, solicitud in enumerate(solicitudes):
+        for d, taxi in indice.k_mas_cercanos(solicitud["ox"], solicitud["oy"], K_VECINOS):
+            aristas.append((d, i, taxi))
+    aristas.sort(key=lambda arista: arista[0])
+
+    pares = []
+    atendidas = set()
+    for _, i, taxi in aristas:
+        if i in atendidas or not indice.quitar(taxi): continue
+        atendidas.add(i)
+        pares.append((taxi, solicitudes[i]))
+
+    for i, solicitud in enumerate(solicitudes):
+        if i in atendidas: continue
+        taxi = indice.reclamar_mas_cercano(solicitud["ox"], solicitud["oy"])
+        if taxi is None: break
+        pares.append((taxi, solicitud))
+    return pares
@@ -0,0 +1,370 @@
+import heapq
+import itertools
+import math
+import threading
+from collections import deque
+
+import numpy as np
+
+
+# Arrays por fila (todos se crecen y se compactan juntos)
+COLUMNAS = ("x", "y", "dest_x", "dest_y", "activo", "ids", "factor", "origen_x", "origen_y", "t_salida", "t_llegada")
+
+
+def _interpolar_rectas(origen_x, origen_y, dest_x, dest_y, transcurridos, velocidad):
+    """Posición (arrays x, y) tras `transcurridos` pasos en línea recta del origen al destino."""
+    dx = dest_x - origen_x
+    dy = dest_y - origen_y
+    distancia = np.hypot(dx, dy)
+    fraccion = np.minimum(1.0, transcurridos * velocidad / np.where(distancia > 0, distancia, 1.0))
+    return origen_x + dx * fraccion, origen_y + dy * fraccion
+
+
+def _recorrido(x, y, tramos, velocidad):
+    """(pasos, tramo) de cada tramo de una ruta que sale de (x, y)."""
+    for tramo in tramos:
+        tx, ty, factor = tramo
+        yield max(1, math.ceil(math.hypot(tx - x, ty - y) * factor / velocidad)), tramo
+        x, y = tx, ty
+
+
+def _posicion_en_tramos(x, y, transcurridos, tramos, velocidad):
+    """(x, y, índice del tramo en curso) tras `transcurridos` pasos por los tramos, saliendo de (x, y)."""
+    for j, (pasos, (tx, ty, factor)) in enumerate(_recorrido(x, y, tramos, velocidad)):
+        if transcurridos < pasos:
+            longitud = math.hypot(tx - x, ty - y)
+            fraccion = min(1.0, transcurridos * velocidad / (longitud * factor)) if longitud else 1.0
+            return x + (tx - x) * fraccion, y + (ty - y) * fraccion, j
+        transcurridos -= pasos
+        x, y = tx, ty
+    return x, y, len(tramos)
+
+
+class FlotaVectorizada:
+    """Almacén struct-of-arrays con posición, destino y estado de movimiento de toda la flota.
+
+    Las escrituras van bajo `self.mutex`: `baja` mueve filas de sitio y no puede
+    cruzarse con un paso de física ni con una asignación.
+
+    Con `eventos=True` los taxis en ruta no se mueven paso a paso: al fijar la ruta
+    se calcula en qué paso llega y se mete en un montículo; cada `paso` solo saca
+    las llegadas que tocan. Mientras tanto `x`/`y` guardan una posición desfasada
+    que `materializar()` interpola (desde el origen y el paso de salida) cuando
+    alguien la va a leer para mostrarla.
+
+    Con red viaria una ruta son varios tramos (x, y, factor): el taxi va de punto
+    en punto y `factor` (tiempo por unidad de distancia) lo frena en las calles
+    lentas. `dest_x`/`dest_y` es el punto del tramo actual y `tramos` guarda, por
+    taxi, los que quedan (paso a paso) o la ruta entera (eventos).
+    """
+
+    def __init__(self, capacidad=1024, eventos=False):
+        self.mutex = threading.RLock()
+        self.n = 0
+        self.x = np.zeros(capacidad)
+        self.y = np.zeros(capacidad)
+        self.dest_x = np.zeros(capacidad)
+        self.dest_y = np.zeros(capacidad)
+        self.activo = np.zeros(capacidad, dtype=bool)  # True si el taxi está en ruta
+        self.ids = np.zeros(capacidad, dtype=np.int64)  # id del taxi de cada fila
+        self.factor = np.ones(capacidad)  # Tiempo por unidad de distancia del tramo actual
+        self.taxis = []  # índice -> Taxi
+        self.tramos = {}  # Taxi -> tramos (solo rutas por la red viaria)
+
+        # Modo por eventos
+        self.eventos = eventos
+        self.pasos = 0  # Pasos de física dados (el "reloj" de las rutas)
+        self.velocidad = None  # La del último paso; con ella se planifican las rutas
+        self.origen_x = np.zeros(capacidad)
+        self.origen_y = np.zeros(capacidad)
+        self.t_salida = np.zeros(capacidad, dtype=np.int64)
+        self.t_llegada = np.zeros(capacidad, dtype=np.int64)
+        self.llegadas = []  # Montículo (paso de llegada, secuencia, Taxi)
+        self._secuencia = itertools.count()  # Desempate estable dentro del montículo
+        self._materializado = -1  # Paso al que corresponden x/y de los taxis en ruta
+
+    def __len__(self):
+        return self.n
+
+    def _crecer(self):
+        capacidad = max(1, len(self.x)) * 2
+        for nombre in COLUMNAS:
+            viejo = getattr(self, nombre)
+            nuevo = np.zeros(capacidad, dtype=viejo.dtype)
+            nuevo[:self.n] = viejo[:self.n]
+            setattr(self, nombre, nuevo)
+
+    def alta(self, taxi):
+        """Añade el taxi al almacén; a partir de aquí su posición vive en los arrays."""
+        with self.mutex:
+            if self.n == len(self.x): self._crecer()
+            i = self.n
+            self.x[i] = taxi.x
+            self.y[i] = taxi.y
+            self.activo[i] = False
+            self.ids[i] = taxi.id
+            self.factor[i] = 1.0
+            self.taxis.append(taxi)
+            self.n += 1
+            taxi.flota = self
+            taxi.indice = i
+
+    def baja(self, taxi):
+        """Quita el taxi moviendo el último elemento a su hueco (O(1))."""
+        with self.mutex:
+            i = taxi.indice
+            # Desenganchamos conservando la última posición conocida
+            taxi._x, taxi._y = float(self.x[i]), float(self.y[i])
+            taxi.flota = None
+            taxi.indice = None
+
+            ultimo = self.n - 1
+            if i != ultimo:
+                for nombre in COLUMNAS:
+                    arr = getattr(self, nombre)
+                    arr[i] = arr[ultimo]
+                movido = self.taxis[ultimo]
+                self.taxis[i] = movido
+                movido.indice = i
+            self.taxis.pop()
+            self.activo[ultimo] = False
+            self.n -= 1
+
+    def fijar_ruta(self, taxi, origen_x, origen_y, dest_x, dest_y, tramos=None):
+        """Coloca el taxi en el origen y lo pone en ruta hacia el destino (por `tramos` si los hay)."""
+        with self.mutex:
+            i = taxi.indice
+            self.x[i] = origen_x
+            self.y[i] = origen_y
+            self.dest_x[i] = dest_x
+            self.dest_y[i] = dest_y
+            self.factor[i] = 1.0
+            self.activo[i] = True
+            self.tramos.pop(taxi, None)
+            if tramos:
+                if self.eventos:
+                    self.tramos[taxi] = list(tramos)
+                else:
+                    self.dest_x[i], self.dest_y[i], self.factor[i] = tramos[0]
+                    if len(tramos) > 1: self.tramos[taxi] = deque(tramos[1:])
+            if self.eventos:
+                self.origen_x[i] = origen_x
+                self.origen_y[i] = origen_y
+                self.t_salida[i] = self.pasos
+                if self.velocidad is not None: self._programar(np.array([i]))
+
+    def detener(self, taxi):
+        with self.mutex:
+            self.activo[taxi.indice] = False
+            self.tramos.pop(taxi, None)
+
+    def paso(self, velocidad):
+        """Mueve de una vez todos los taxis en ruta.
+
+        Devuelve (ids de los taxis movidos como array, lista de taxis que han llegado).
+        En modo eventos solo se "mueven" (y se devuelven) los que llegan.
+        """
+        with self.mutex:
+            if self.eventos: return self._paso_eventos(velocidad)
+            self.pasos += 1
+            activos = np.flatnonzero(self.activo[:self.n])
+            return self.ids[activos], self.taxis_en(self._paso(activos, velocidad))
+
+    def _paso(self, activos, velocidad):
+        if activos.size == 0: return activos
+
+        x = self.x[activos]
+        y = self.y[activos]
+        dest_x = self.dest_x[activos]
+        dest_y = self.dest_y[activos]
+        dx = dest_x - x
+        dy = dest_y - y
+        distancia = np.hypot(dx, dy)
+        velocidad = velocidad / self.factor[activos]
+
+        # Llega si está prácticamente encima del destino; si no, frenado exacto al alcanzarlo
+        llegan = (distancia < 0.1) | (distancia <= velocidad)
+        ratio = velocidad / np.where(llegan, 1.0, distancia)
+        self.x[activos] = np.where(llegan, dest_x, x + dx * ratio)
+        self.y[activos] = np.where(llegan, dest_y, y + dy * ratio)
+
+        llegados = activos[llegan]
+        if self.tramos: llegados = self._siguiente_tramo(llegados)
+        self.activo[llegados] = False
+        return llegados
+
+    def _siguiente_tramo(self, llegados):
+        """Los que llegan a un punto intermedio siguen por el tramo siguiente; devuelve los que terminan."""
+        terminan = []
+        for i in llegados.tolist():
+            taxi = self.taxis[i]
+            pendientes = self.tramos.get(taxi)
+            if not pendientes:
+                terminan.append(i)
+                continue
+            self.dest_x[i], self.dest_y[i], self.factor[i] = pendientes.popleft()
+            if not pendientes: del self.tramos[taxi]
+        return np.array(terminan, dtype=np.intp)
+
+    # --- MODO EVENTOS ---
+    def _programar(self, indices):
+        """Calcula el paso de llegada de esas filas (desde su salida) y las mete en el montículo."""
+        distancia = np.hypot(self.dest_x[indices] - self.origen_x[indices], self.dest_y[indices] - self.origen_y[indices])
+        # Igual que el paso a paso: llega en el primer paso en que le queda <= velocidad
+        pasos = np.maximum(1, np.ceil(distancia / self.velocidad)).astype(np.int64)
+        if self.tramos:
+            for k, i in enumerate(indices.tolist()):
+                tramos = self.tramos.get(self.taxis[i])
+                if tramos: pasos[k] = sum(n for n, _ in self._recorrido(i, tramos))
+        self.t_llegada[indices] = self.t_salida[indices] + pasos
+        for i, t in zip(indices.tolist(), self.t_llegada[indices].tolist()):
+            heapq.heappush(self.llegadas, (t, next(self._secuencia), self.taxis[i]))
+
+    def _vigente(self, entrada):
+        # Las entradas de rutas replanificadas o de taxis dados de baja se ignoran al salir
+        t, _, taxi = entrada
+        i = taxi.indice
+        return taxi.flota is self and self.activo[i] and self.t_llegada[i] == t
+
+    def _recorrido(self, i, tramos):
+        """(pasos, tramo) de cada tramo de la ruta de la fila i, saliendo de su origen."""
+        return _recorrido(self.origen_x[i], self.origen_y[i], tramos, self.velocidad)
+
+    def _posicion_en_tramos(self, i, tramos):
+        """(x, y, índice del tramo en curso) de la fila i en el paso actual."""
+        return _posicion_en_tramos(self.origen_x[i], self.origen_y[i], self.pasos - self.t_salida[i], tramos, self.velocidad)
+
+    def _replanificar(self, velocidad):
+        """Cambio de velocidad: las rutas en curso salen de nuevo desde donde van ahora."""
+        self.materializar()
+        if self.velocidad is not None:
+            # Por la red: se conservan solo los tramos que faltan (el actual incluido)
+            for taxi, tramos in list(self.tramos.items()):
+                self.tramos[taxi] = tramos[self._posicion_en_tramos(taxi.indice, tramos)[2]:]
+        self.velocidad = velocidad
+        activos = np.flatnonzero(self.activo[:self.n])
+        self.origen_x[activos] = self.x[activos]
+        self.origen_y[activos] = self.y[activos]
+        self.t_salida[activos] = self.pasos
+        self.llegadas = []
+        self._programar(activos)
+
+    def _paso_eventos(self, velocidad):
+        if velocidad != self.velocidad: self._replanificar(velocidad)
+        self.pasos += 1
+        llegados = []
+        while self.llegadas and self.llegadas[0][0] <= self.pasos:
+            entrada = heapq.heappop(self.llegadas)
+            if not self._vigente(entrada): continue
+            i = entrada[2].indice
+            self.x[i] = self.dest_x[i]
+            self.y[i] = self.dest_y[i]
+            self.activo[i] = False
+            self.tramos.pop(entrada[2], None)
+            llegados.append(i)
+        # En orden de fila, como el paso a paso: misma semilla -> mismo resultado en ambos modos
+        llegados = np.array(sorted(llegados), dtype=np.intp)
+        return self.ids[llegados], self.taxis_en(llegados)
+
+    def proxima_llegada(self):
+        """Paso en el que llega el próximo taxi (None si no hay ninguno en ruta)."""
+        with self.mutex:
+            while self.llegadas and not self._vigente(self.llegadas[0]):
+                heapq.heappop(self.llegadas)
+            return self.llegadas[0][0] if self.llegadas else None
+
+    def saltar(self, pasos):
+        """Adelanta el reloj de rutas sin mover nada (pasos en los que nadie llega)."""
+        with self.mutex:
+            self.pasos += pasos
+
+    def materializar(self):
+        """Interpola en x/y la posición actual de los taxis en ruta (solo modo eventos).
+
+        Se llama al leer posiciones para mostrarlas; el coste es proporcional a los
+        taxis en ruta y se paga una vez por paso como mucho.
+        """
+        with self.mutex:
+            if self._al_dia(): return
+            activos = np.flatnonzero(self.activo[:self.n])
+            self.x[activos], self.y[activos] = _interpolar_rectas(
+                self.origen_x[activos], self.origen_y[activos], self.dest_x[activos], self.dest_y[activos],
+                self.pasos - self.t_salida[activos], self.velocidad,
+            )
+            # Las rutas por la red no van en línea recta: se recorren tramo a tramo
+            for taxi, tramos in self.tramos.items():
+                i = taxi.indice
+                self.x[i], self.y[i], _ = self._posicion_en_tramos(i, tramos)
+            self._materializado = self.pasos
+
+    def _al_dia(self):
+        return not self.eventos or self.velocidad is None or self._materializado == self.pasos
+
+    def copia(self):
+        """CopiaFlota de este paso. No interpola: en modo eventos se guarda con qué hacerlo al leerla."""
+        with self.mutex:
+            n = self.n
+            ruta = None
+            if not self._al_dia():
+                activos = np.flatnonzero(self.activo[:n])
+                ruta = (
+                    activos, self.origen_x[activos], self.origen_y[activos], self.dest_x[activos],
+                    self.dest_y[activos], self.pasos - self.t_salida[activos], self.velocidad,
+                    dict(self.tramos) if self.tramos else None,
+                )
+            return CopiaFlota(self.ids[:n].copy(), self.x[:n].copy(), self.y[:n].copy(), self.activo[:n].copy(), ruta)
+
+    def ids_en_ruta(self):
+        with self.mutex:
+            return self.ids[np.flatnonzero(self.activo[:self.n])]
+
+    def taxis_en(self, indices):
+        return [self.taxis[i] for i in indices.tolist()]
+
+
+class CopiaFlota:
+    """La flota tal como estaba en un paso, para leerla sin su lock ni tocar la flota viva.
+
+    `ids` y `activo` (en ruta) van por fila. En modo eventos las posiciones
+    de los taxis en ruta están sin interpolar: `posiciones()` lo hace la primera vez
+    que alguien las pide, con los orígenes y pasos copiados en `ruta`.
+    """
+    __slots__ = ("ids", "activo", "_x", "_y", "_ruta", "_posiciones", "_filas")
+
+    def __init__(self, ids, x, y, activo, ruta=None):
+        self.ids = ids
+        self.activo = activo
+        self._x, self._y = x, y
+        self._ruta = ruta  # (filas en ruta, origen_x, origen_y, dest_x, dest_y, transcurridos, velocidad, tramos por Taxi)
+        self._posiciones = (x, y) if ruta is None else None
+        self._filas = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def posiciones(self):
+        """(x, y) de cada fila, con los taxis en ruta ya interpolados.
+
+        Sin lock: dos hilos que lo pidan a la vez calculan lo mismo sobre copias.
+        """
+        if self._posiciones is None:
+            activos, origen_x, origen_y, dest_x, dest_y, transcurridos, velocidad, tramos = self._ruta
+            x, y = self._x.copy(), self._y.copy()
+            x[activos], y[activos] = _interpolar_rectas(origen_x, origen_y, dest_x, dest_y, transcurridos, velocidad)
+            if tramos:
+                filas = self.filas()
+                posicion = dict(zip(activos.tolist(), range(len(activos))))
+                for taxi, tramos_taxi in tramos.items():
+                    i = filas[taxi.id]
+                    k = posicion[i]
+                    x[i], y[i], _ = _posicion_en_tramos(origen_x[k], origen_y[k], transcurridos[k], tramos_taxi, velocidad)
+            self._posiciones = (x, y)
+        return self._posiciones
+
+    def filas(self):
+        """id -> fila."""
+        if self._filas is None: self._filas = dict(zip(self.ids.tolist(), range(len(self.ids))))
+        return self._filas
+
+    def ids_en_ruta(self):
+        return self.ids[self.activo]
@@ -0,0 +1,152 @@
+import heapq
+import math
+import threading
+
+
+class IndiceEspacial:
+    """Rejilla uniforme sobre el mapa para localizar el taxi libre más cercano.
+
+    Es seguro entre hilos: cada franja horizontal de la rejilla tiene su propio lock,
+    y sacar un taxi del índice (`quitar`) es la operación que lo "reclama": de varios
+    hilos que intenten quitar el mismo taxi, solo uno recibe True.
+    """
+
+    # Con n taxis repartidos en resolucion² celdas, la búsqueda por anillos visita del orden
+    # de resolucion²/n celdas: por debajo de n ≈ resolucion sale más barato recorrerlos todos
+    UMBRAL_LINEAL = None  # None -> igual a la resolución
+
+    def __init__(self, tamano_mapa=100.0, resolucion=64, franjas=16):
+        self.tamano_mapa = float(tamano_mapa)
+        self.resolucion = resolucion
+        self.tam_celda = self.tamano_mapa / resolucion
+        self.celdas = [set() for _ in range(resolucion * resolucion)]
+        self.celda_de = {}  # taxi -> índice de la celda donde se insertó
+        self.franjas = franjas
+        self.mutex_franjas = [threading.Lock() for _ in range(franjas)]
+        self.umbral_lineal = self.UMBRAL_LINEAL if self.UMBRAL_LINEAL is not None else resolucion
+
+    def __len__(self):
+        return len(self.celda_de)
+
+    def __contains__(self, taxi):
+        return taxi in self.celda_de
+
+    def __iter__(self):
+        return iter(list(self.celda_de))
+
+    def _mutex_celda(self, indice):
+        return self.mutex_franjas[(indice // self.resolucion) * self.franjas // self.resolucion]
+
+    def _coordenada_celda(self, valor):
+        c = int(valor / self.tam_celda)
+        # Recortamos por si alguna posición se sale ligeramente del mapa
+        if c < 0: return 0
+        if c >= self.resolucion: return self.resolucion - 1
+        return c
+
+    def insertar(self, taxi):
+        """Registra un taxi libre en la celda correspondiente a su posición."""
+        self.quitar(taxi)
+        cx = self._coordenada_celda(taxi.x)
+        cy = self._coordenada_celda(taxi.y)
+        indice = cy * self.resolucion + cx
+        with self._mutex_celda(indice):
+            self.celdas[indice].add(taxi)
+            self.celda_de[taxi] = indice
+
+    def quitar(self, taxi):
+        """Saca (reclama) un taxi del índice. Devuelve False si no estaba o ya lo reclamó otro hilo."""
+        indice = self.celda_de.pop(taxi, None)  # dict.pop es atómico: solo un hilo gana
+        if indice is None: return False
+        with self._mutex_celda(indice):
+            self.celdas[indice].discard(taxi)
+        return True
+
+    def reclamar_mas_cercano(self, x, y):
+        """Busca el más cercano y lo saca del índice. Reintenta si otro hilo se lo lleva antes."""
+        while True:
+            taxi = self.mas_cercano(x, y)
+            if taxi is None or self.quitar(taxi): return taxi
+
+    def reclamar_cualquiera(self):
+        """Saca el taxi que lleva más tiempo libre (orden de inserción), o None si no hay."""
+        while True:
+            try:
+                taxi = next(iter(self.celda_de))
+            except StopIteration:
+                return None
+            except RuntimeError:
+                continue  # El dict cambió mientras lo mirábamos
+            if self.quitar(taxi): return taxi
+
+    def mas_cercano(self, x, y):
+        """Devuelve el taxi indexado más cercano a (x, y), o None si no hay ninguno."""
+        if not self.celda_de: return None
+        x, y = float(x), float(y)
+
+        if len(self.celda_de) <= self.umbral_lineal:
+            candidatos = list(self.celda_de)
+            if not candidatos: return None
+            return min(candidatos, key=lambda t: (t.x - x)**2 + (t.y - y)**2)
+
+        cx0 = self._coordenada_celda(x)
+        cy0 = self._coordenada_celda(y)
+        mejor = None
+        mejor_d2 = float('inf')
+
+        # Expandimos anillos de celdas alrededor de la celda de consulta
+        for radio in range(self.resolucion):
+            for celda in self._celdas_anillo(cx0, cy0, radio):
+                for taxi in celda:
+                    d2 = (taxi.x - x)**2 + (taxi.y - y)**2
+                    if d2 < mejor_d2:
+                        mejor_d2 = d2
+                        mejor = taxi
+
+            # Cualquier celda del siguiente anillo está al menos a radio * tam_celda
+            if mejor is not None and math.sqrt(mejor_d2) <= radio * self.tam_celda:
+                break
+
+        return mejor
+
+    def k_mas_cercanos(self, x, y, k):
+        """Devuelve hasta k pares (distancia, taxi) ordenados de más cercano a más lejano."""
+        if not self.celda_de or k <= 0: return []
+        x, y = float(x), float(y)
+
+        if len(self.celda_de) <= max(self.umbral_lineal, k):
+            pares = [(math.hypot(t.x - x, t.y - y), t) for t in list(self.celda_de)]
+            return heapq.nsmallest(k, pares, key=lambda par: par[0])
+
+        cx0 = self._coordenada_celda(x)
+        cy0 = self._coordenada_celda(y)
+        candidatos = []  # Montículo de máximos (distancia negada) con los k mejores
+
+        for radio in range(self.resolucion):
+            for celda in self._celdas_anillo(cx0, cy0, radio):
+                for taxi in celda:
+                    d = math.hypot(taxi.x - x, taxi.y - y)
+                    if len(candidatos) < k:
+                        heapq.heappush(candidatos, (-d, id(taxi), taxi))
+                    elif d < -candidatos[0][0]:
+                        heapq.heapreplace(candidatos, (-d, id(taxi), taxi))
+
+            if len(candidatos) == k and -candidatos[0][0] <= radio * self.tam_celda:
+                break
+
+        return sorted(((-d, taxi) for d, _, taxi in candidatos), key=lambda par: par[0])
+
+    def _celdas_anillo(self, cx0, cy0, radio):
+        """Celdas (dentro del mapa) del anillo cuadrado de radio dado alrededor de (cx0, cy0)."""
+        for cy in range(cy0 - radio, cy0 + radio + 1):
+            if cy < 0 or cy >= self.resolucion: continue
+            borde_vertical = cy == cy0 - radio or cy == cy0 + radio
+            paso = 1 if borde_vertical else 2 * radio
+            for cx in range(cx0 - radio, cx0 + radio + 1, paso):
+                if cx < 0 or cx >= self.resolucion: continue
+                indice = cy * self.resolucion + cx
+                celda = self.celdas[indice]
+                if not celda: continue  # Las vacías (la mayoría) no necesitan lock
+                with self._mutex_celda(indice):
+                    contenido = tuple(celda)
+                yield contenido
@@ -0,0 +1,156 @@
+"""Instrumentación del camino caliente: histogramas, indicadores y locks medidos.
+
+Todo vive en un `RegistroMetricas` por sistema y se exporta en el formato de
+texto de Prometheus (`exportar`). Observar cuesta un bisect y un lock corto; con
+el registro inactivo los histogramas son nulos y los locks no se envuelven.
+"""
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+# Límites de los cubos (incluyentes, como `le` en Prometheus)
+LIMITES_SEGUNDOS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0)
+LIMITES_COLA = (0, 1, 5, 10, 50, 100, 500, 1_000, 5_000, 10_000)
+LIMITES_MINUTOS = (0, 20, 40, 60, 120, 240, 480, 1_440)
+
+
+def _etiquetas(etiquetas, extra=None):
+    pares = {**(etiquetas or {}), **(extra or {})}
+    if not pares: return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pares.items()) + "}"
+
+
+class Histograma:
+    def __init__(self, limites, etiquetas=None):
+        self.limites = tuple(limites)
+        self.etiquetas = etiquetas
+        self.cubos = [0] * (len(self.limites) + 1)  # El último es +Inf
+        self.suma = 0.0
+        self.cuenta = 0
+        self._mutex = threading.Lock()
+
+    def observar(self, valor):
+        i = bisect_left(self.limites, valor)
+        with self._mutex:
+            self.cubos[i] += 1
+            self.suma += valor
+            self.cuenta += 1
+
+    def lineas(self, nombre):
+        with self._mutex:
+            cubos, suma, cuenta = list(self.cubos), self.suma, self.cuenta
+        acumulado = 0
+        for limite, n in zip(self.limites + ("+Inf",), cubos):
+            acumulado += n
+            yield f"{nombre}_bucket{_etiquetas(self.etiquetas, {'le': limite})} {acumulado}"
+        yield f"{nombre}_sum{_etiquetas(self.etiquetas)} {suma}"
+        yield f"{nombre}_count{_etiquetas(self.etiquetas)} {cuenta}"
+
+
+class _HistogramaNulo:
+    def observar(self, valor):
+        pass
+
+
+HISTOGRAMA_NULO = _HistogramaNulo()
+
+
+class Indicador:
+    """Valor instantáneo que se lee (con `funcion`) solo al exportar."""
+
+    def __init__(self, funcion, etiquetas=None):
+        self.funcion = funcion
+        self.etiquetas = etiquetas
+
+    def lineas(self, nombre):
+        yield f"{nombre}{_etiquetas(self.etiquetas)} {self.funcion()}"
+
+
+class Cronometro:
+    """`with cronometro:` observa en el histograma los segundos del bloque."""
+    __slots__ = ("histograma", "_inicio")
+
+    def __init__(self, histograma):
+        self.histograma = histograma
+
+    def __enter__(self):
+        self._inicio = perf_counter()
+
+    def __exit__(self, *exc):
+        self.histograma.observar(perf_counter() - self._inicio)
+
+
+class LockInstrumentado:
+    """Envuelve un Lock/RLock y mide espera (hasta adquirirlo) y retención (hasta soltarlo).
+
+    Con RLock solo cuenta la adquisición exterior: las reentradas no esperan.
+    `_profundidad` y `_desde` solo los toca el hilo que tiene el lock.
+    """
+
+    def __init__(self, lock, espera, retencion):
+        self._lock = lock
+        self.espera = espera
+        self.retencion = retencion
+        self._profundidad = 0
+        self._desde = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        inicio = perf_counter()
+        adquirido = self._lock.acquire(blocking, timeout)
+        if adquirido:
+            self._profundidad += 1
+            if self._profundidad == 1:
+                self._desde = perf_counter()
+                self.espera.observar(self._desde - inicio)
+        return adquirido
+
+    def release(self):
+        self._profundidad -= 1
+        if self._profundidad == 0: self.retencion.observar(perf_counter() - self._desde)
+        self._lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class RegistroMetricas:
+    PREFIJO = "unietaxi_"
+
+    def __init__(self, activo=True):
+        self.activo = activo
+        self._familias = {}  # nombre -> (tipo, ayuda, [métricas])
+
+    def _registrar(self, tipo, nombre, ayuda, metrica):
+        familia = self._familias.setdefault(self.PREFIJO + nombre, (tipo, ayuda, []))
+        familia[2].append(metrica)
+        return metrica
+
+    def histograma(self, nombre, ayuda, limites=LIMITES_SEGUNDOS, etiquetas=None):
+        if not self.activo: return HISTOGRAMA_NULO
+        return self._registrar("histogram", nombre, ayuda, Histograma(limites, etiquetas))
+
+    def indicador(self, nombre, ayuda, funcion, etiquetas=None):
+        return self._registrar("gauge", nombre, ayuda, Indicador(funcion, etiquetas))
+
+    def lock(self, lock, nombre):
+        """Devuelve `lock` envuelto, con sus histogramas de espera y retención etiquetados `lock=nombre`."""
+        if not self.activo: return lock
+        etiquetas = {"lock": nombre}
+        return LockInstrumentado(
+            lock,
+            self.histograma("lock_espera_segundos", "Espera hasta adquirir el lock", etiquetas=etiquetas),
+            self.histograma("lock_retencion_segundos", "Tiempo con el lock tomado", etiquetas=etiquetas),
+        )
+
+    def exportar(self):
+        """Texto en formato de exposición de Prometheus (0.0.4)."""
+        lineas = []
+        for nombre, (tipo, ayuda, metricas) in list(self._familias.items()):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for metrica in metricas:
+                lineas.extend(metrica.lineas(nombre))
+        return "\n".join(lineas) + "\n"
@@ -0,0 +1,181 @@
+import time
+import tracemalloc
+
+from .sistema import SistemaUnieTaxi
+from .metricas import Cronometro
+from .bitacora import SILENCIO
+
+VELOCIDAD_NORMAL = 2.0
+VELOCIDAD_SIMULACION = 8.0
+
+
+class MotorSimulacion:
+    """Un tick completo de física + gestión, sin hilos ni sleeps (los pone quien lo llame)."""
+
+    def __init__(self, sistema):
+        self.sistema = sistema
+        self.ticks = 0
+        self.ultimos_llegados = []  # Taxis que terminaron viaje en el último tick
+
+    def paso(self, velocidad):
+        """Avanza un tick. Devuelve cuántos viajes han terminado."""
+        sistema = self.sistema
+        with Cronometro(sistema.hist_tick):
+            return self._paso(sistema, velocidad)
+
+    def _paso(self, sistema, velocidad):
+        sistema.tick_tiempo()
+        sistema.hist_cola.observar(len(sistema.cola_espera))
+
+        # FASE 1: GESTIÓN Y DESPACHO INICIAL
+        sistema.gestionar_abastecimiento() # ¿Contratamos?
+        sistema.procesar_despacho_automatico() # ¿Asignamos?
+
+        # FASE 2: MOVIMIENTO (un único paso vectorizado para toda la flota)
+        llegados = sistema.avanzar_flota(velocidad)
+        if llegados:
+            # Finalizar viajes + INTENTO INMEDIATO DE REENGANCHE, todo en bloque
+            costos = [sistema.rng.uniform(10, 50) for _ in range(len(llegados))]
+            sistema.procesar_llegadas(llegados, costos)
+        self.ultimos_llegados = llegados
+
+        # FASE 3: DESPACHO FINAL (Red de seguridad)
+        # Por si acaso algún taxi quedó libre en un momento raro
+        sistema.procesar_despacho_automatico()
+
+        self.ticks += 1
+        return len(llegados)
+
+    def saltar_inactivos(self, maximo, velocidad):
+        """Modo eventos: se salta de golpe los ticks en los que no pasaría nada.
+
+        Sin cola ni solicitudes nuevas, un tick solo puede traer llegadas; avanza el
+        reloj hasta justo antes de la próxima (o `maximo` ticks). Devuelve los saltados.
+        """
+        sistema = self.sistema
+        if not sistema.flota.eventos or sistema.cola_espera: return 0
+        # Con otra velocidad las llegadas se replanifican en el próximo paso: no hay nada fiable
+        if velocidad != sistema.flota.velocidad: return 0
+        proxima = sistema.flota.proxima_llegada()
+        saltos = maximo if proxima is None else min(maximo, proxima - sistema.flota.pasos - 1)
+        if saltos <= 0: return 0
+        sistema.flota.saltar(saltos)
+        sistema.tick_tiempo(saltos)
+        self.ticks += saltos
+        return saltos
+
+
+class GeneradorClientes:
+    """Genera solicitudes con la curva de saturación del simulador automático."""
+
+    # CONFIGURACIÓN DE POBLACIÓN
+    POBLACION_IDEAL = 50 # El sistema intentará estabilizarse en torno a este número
+    INTENTOS_REUSO = 32  # Muestreos para encontrar un cliente libre sin recorrer a todos
+
+    def __init__(self, sistema, rango_origen_x=(0, 100)):
+        self.sistema = sistema
+        self.rango_origen_x = rango_origen_x  # Para repartir la demanda por regiones
+
+    def _cliente_libre_al_azar(self):
+        # Los ids de cliente son consecutivos y nunca se borran: muestreamos por id
+        sistema = self.sistema
+        total = len(sistema.clientes)
+        for _ in range(self.INTENTOS_REUSO):
+            cliente = sistema.clientes.get(sistema.rng.randint(1, total))
+            if cliente is not None and cliente.id not in sistema.clientes_viajando:
+                return cliente
+        return None
+
+    def generar(self):
+        """Crea o reutiliza un cliente y lanza una solicitud aleatoria. Devuelve el resultado."""
+        sistema = self.sistema
+        rng = sistema.rng
+
+        # 1. DATOS ACTUALES
+        total_clientes = len(sistema.clientes)
+        hay_libres = total_clientes > len(sistema.clientes_viajando)
+
+        # 2. CÁLCULO DE PROBABILIDAD DINÁMICA
+        # Calculamos qué tan probable es reutilizar a alguien basado en cuántos somos.
+        # - Si somos 0: prob_reuso = 0.0 (0%) -> Todo nuevo
+        # - Si somos 25: prob_reuso = 0.5 (50%) -> Mitad y mitad
+        # - Si somos 50+: prob_reuso = 0.99 (99%) -> Casi siempre reusamos
+        if total_clientes == 0:
+            prob_reuso = 0
+        else:
+            prob_reuso = min(0.99, total_clientes / self.POBLACION_IDEAL)
+
+        # 3. TOMA DE DECISIÓN + 4. EJECUCIÓN
+        cliente = None
+        if not hay_libres:
+            # CASO A: Saturación total (Nadie libre).
+            # Obligamos a crear nuevo aunque seamos muchos, para no parar el tráfico.
+            sistema.log.info("[AUTO] ⚠️ Saturación (%s activos). Creando refuerzo.", total_clientes)
+        elif rng.random() < prob_reuso:
+            # CASO B: La probabilidad dice que REUSEMOS (porque ya somos muchos)
+            cliente = self._cliente_libre_al_azar()
+            if cliente:
+                sistema.log.info("[AUTO] ♻️ (%d%% Reuso) Cliente %s vuelve a viajar.", prob_reuso*100, cliente.id)
+        # CASO C: La probabilidad dice NUEVO (somos pocos o hubo suerte)
+
+        if cliente is None:
+            cliente = sistema.registrar_cliente(f"Bot_{rng.randint(1000,9999)}", "VISA")
+            sistema.log.info("[AUTO] ✨ (%d%% Nuevo) Bienvenido Cliente %s.", (1-prob_reuso)*100, cliente.id)
+
+        return sistema.procesar_solicitud(
+            cliente.id,
+            rng.uniform(*self.rango_origen_x), rng.uniform(0, 100),
+            rng.uniform(0, 100), rng.uniform(0, 100)
+        )
+
+
+def simular(taxis=50, ticks=1000, solicitudes_por_tick=1, semilla=0,
+            velocidad=VELOCIDAD_SIMULACION, politica=None, medir_memoria=False, instrumentar=False,
+            eventos=False, red=None):
+    """Ejecuta la simulación sin servidor web, con reloj simulado y tan rápido como dé la CPU.
+
+    Con la misma semilla y parámetros el resultado es idéntico. Devuelve métricas
+    de la ejecución (con `instrumentar`, también el texto de /metrics en "metricas").
+    Con `eventos` usa la flota por eventos y, sin carga, salta directo a cada llegada.
+    `red` (RedViaria) activa el despacho por ETA y las rutas por calles.
+    """
+    if medir_memoria: tracemalloc.start()
+
+    sistema = SistemaUnieTaxi(semilla=semilla, reloj_simulado=True, instrumentar=instrumentar, eventos=eventos, red=red)
+    sistema.log = SILENCIO
+    sistema.limite_flota = max(sistema.limite_flota, taxis)
+    if politica: sistema.politica_despacho = politica
+    for i in range(taxis):
+        sistema.registrar_taxi("Headless", f"H-{i}")
+
+    motor = MotorSimulacion(sistema)
+    generador = GeneradorClientes(sistema)
+
+    inicio = time.perf_counter()
+    while motor.ticks < ticks:
+        if not solicitudes_por_tick: motor.saltar_inactivos(ticks - motor.ticks - 1, velocidad)
+        for _ in range(solicitudes_por_tick):
+            generador.generar()
+        motor.paso(velocidad)
+    duracion = time.perf_counter() - inicio
+
+    despachadas = sistema.asignaciones_totales()
+    resultado = {
+        "taxis": len(sistema.taxis),
+        "ticks": ticks,
+        "segundos": duracion,
+        "ticks_por_segundo": ticks / duracion if duracion else float("inf"),
+        "despachadas": despachadas,
+        "despachadas_por_segundo": despachadas / duracion if duracion else float("inf"),
+        "viajes": sistema.viajes_totales,
+        "cola_espera": len(sistema.cola_espera),
+        "ganancia_empresa": round(sistema.ganancia_empresa, 2),
+        "tiempo_simulado": sistema.tiempo_actual.isoformat(),
+    }
+    if instrumentar: resultado["metricas"] = sistema.metricas.exportar()
+    if medir_memoria:
+        actual, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultado["memoria_mb"] = actual / 1e6
+        resultado["memoria_pico_mb"] = pico / 1e6
+    return resultado
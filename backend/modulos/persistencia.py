@@ -0,0 +1,452 @@
+"""Persistencia: diario de eventos (write-ahead log) e instantáneas binarias.
+
+Diario
+    Ficheros `diario-<secuencia>.log` con registros binarios `<BI` (tipo, largo)
+    + carga. El sistema solo encola tuplas (`DiarioEventos.anotar`); un hilo
+    escritor las codifica, las escribe en bloque y hace un único fsync por lote
+    (group commit). Una respuesta no espera al disco: si se va la luz se pierde
+    como mucho el último lote. Si el disco falla, el escritor se para, lo deja en
+    `error` y los registros que lleguen después se cuentan en `perdidos`
+    (indicador `diario_perdidos` en /metrics); `rotar` falla en vez de esperar.
+
+    Los registros guardan valores absolutos (ganancias, viajes, totales de la
+    empresa...), no incrementos: aplicar dos veces el mismo registro deja el
+    mismo estado. Por eso una instantánea no necesita congelar el sistema.
+
+Instantánea
+    `instantanea.bin`: cabecera + arrays NumPy (taxis, clientes, cola) + textos.
+    Se carga con mmap y los arrays se leen directamente del fichero.
+    Guarda la secuencia del diario a partir de la cual hay que reaplicar.
+
+Al restaurar, los viajes en curso se reanudan desde el punto de recogida
+(o desde la posición guardada en la instantánea). Las estadísticas por política
+de despacho no se persisten.
+"""
+import itertools
+import mmap
+import os
+import queue
+import struct
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from .taxi import Taxi
+from .cliente import Cliente
+from .bitacora import log
+
+# Tipos de registro
+ALTA_TAXI = 1
+BAJA_TAXI = 2
+ALTA_CLIENTE = 3
+ENCOLADA = 4
+ASIGNACION = 5
+LIQUIDACION = 6
+
+FORMATOS = {
+    ALTA_TAXI: struct.Struct("<qdddqd"),       # id, x, y, calificacion, viajes, ganancias + modelo, placa
+    BAJA_TAXI: struct.Struct("<q"),            # id
+    ALTA_CLIENTE: struct.Struct("<q"),         # id + nombre, tarjeta
+    ENCOLADA: struct.Struct("<qddddd"),        # cliente, ox, oy, dx, dy, t
+    ASIGNACION: struct.Struct("<qqdddd"),      # taxi, cliente, ox, oy, dx, dy
+    LIQUIDACION: struct.Struct("<qqddqqdqdd"), # taxi, cliente, x, y, viajes taxi, viajes cliente,
+                                               # ganancias taxi, viajes_totales, ganancia_empresa, t
+}
+CABECERA_REGISTRO = struct.Struct("<BI")
+LARGO_TEXTO = struct.Struct("<I")  # Los textos de la API no tienen tope de largo
+
+EPOCA = datetime(2000, 1, 1)  # Los instantes se guardan como segundos desde aquí
+
+ARCHIVO_INSTANTANEA = "instantanea.bin"
+CABECERA_INSTANTANEA = struct.Struct("<4sHqdd7q")
+TAMANO_CABECERA = 128  # Cabecera rellenada: los arrays empiezan alineados
+MAGIA = b"UTSN"
+VERSION_FORMATO = 1
+
+DTYPE_TAXIS = np.dtype([
+    ("id", "<i8"), ("x", "<f8"), ("y", "<f8"), ("calificacion", "<f8"), ("ganancias", "<f8"),
+    ("viajes", "<i8"), ("cliente", "<i8"), ("ox", "<f8"), ("oy", "<f8"), ("dx", "<f8"), ("dy", "<f8"),
+])
+DTYPE_CLIENTES = np.dtype([("id", "<i8"), ("viajes", "<i8")])
+DTYPE_COLA = np.dtype([
+    ("cliente", "<i8"), ("ox", "<f8"), ("oy", "<f8"), ("dx", "<f8"), ("dy", "<f8"), ("t", "<f8"),
+])
+
+
+def segundos(instante):
+    return (instante - EPOCA).total_seconds()
+
+
+def instante(segundos):
+    return EPOCA + timedelta(seconds=segundos)
+
+
+def _codificar(registro):
+    tipo, campos, textos = registro
+    partes = [FORMATOS[tipo].pack(*campos)]
+    for texto in textos:
+        datos = str(texto).encode("utf-8")
+        partes.append(LARGO_TEXTO.pack(len(datos)))
+        partes.append(datos)
+    carga = b"".join(partes)
+    return CABECERA_REGISTRO.pack(tipo, len(carga)) + carga
+
+
+def _nombre_segmento(secuencia):
+    return f"diario-{secuencia:012d}.log"
+
+
+def _segmentos(directorio):
+    """(secuencia inicial, ruta) de cada segmento del diario, en orden."""
+    segmentos = []
+    for nombre in os.listdir(directorio):
+        if nombre.startswith("diario-") and nombre.endswith(".log"):
+            segmentos.append((int(nombre[7:-4]), os.path.join(directorio, nombre)))
+    return sorted(segmentos)
+
+
+class DiarioEventos:
+    """Write-ahead log con un hilo escritor que agrupa los fsync."""
+
+    def __init__(self, directorio, secuencia_inicial=0, sincronizar=True):
+        self.directorio = directorio
+        self.sincronizar = sincronizar  # False: sin fsync (benchmarks, discos de prueba)
+        os.makedirs(directorio, exist_ok=True)
+        # Posición global del siguiente registro; solo la toca el escritor, que los
+        # numera en el orden de la cola (el mismo en que se aplicaron los cambios)
+        self.secuencia = secuencia_inicial
+        self.lotes = 0
+        self.escritos = 0
+        self.perdidos = 0  # Registros que no llegarán al disco
+        self.error = None  # Excepción que paró al escritor
+        self._cola = queue.SimpleQueue()
+        self._archivo = open(os.path.join(directorio, _nombre_segmento(secuencia_inicial)), "ab")
+        self._escritor = threading.Thread(target=self._escribir, daemon=True)
+        self._escritor.start()
+
+    def anotar(self, tipo, campos, textos=()):
+        """Encola un registro. Sin locks, sin codificar y sin tocar el disco: eso lo hace el escritor."""
+        if self.error is not None:
+            self.perdidos += 1
+            return
+        self._cola.put((tipo, campos, textos))
+
+    def _escribir(self):
+        lote = []
+        try:
+            while True:
+                lote = [self._cola.get()]  # Bloquea hasta que haya algo
+                while True:
+                    try:
+                        lote.append(self._cola.get_nowait())
+                    except queue.Empty:
+                        break
+                # Lo que llegue mientras escribimos/sincronizamos irá en el siguiente lote
+                pendientes = []
+                for registro in lote:
+                    if isinstance(registro, list):
+                        self._volcar(pendientes)
+                        pendientes = []
+                        if not self._control(registro): return
+                    else:
+                        try:
+                            pendientes.append(_codificar(registro))
+                        except (struct.error, TypeError, ValueError):
+                            # Un registro que no se puede codificar se pierde él solo, no el diario
+                            log.exception("[PERSISTENCIA] Registro del diario no codificable: %r", registro)
+                            self.perdidos += 1
+                            continue
+                        self.secuencia += 1
+                self._volcar(pendientes)
+        except Exception as error:
+            # Disco lleno, fsync fallido...: no se escribe más, pero nadie se queda esperando
+            self.error = error
+            log.exception("[PERSISTENCIA] El escritor del diario se ha parado; se descartan los registros")
+            self._soltar(lote)
+
+    def _soltar(self, lote):
+        """Tras un error: descarta lo encolado y despierta a las órdenes que esperan."""
+        while True:
+            for registro in lote:
+                if isinstance(registro, list): registro[2].set()
+                else: self.perdidos += 1
+            try:
+                lote = [self._cola.get_nowait()]
+            except queue.Empty:
+                return
+
+    def _volcar(self, pendientes):
+        if not pendientes: return
+        self._archivo.write(b"".join(pendientes))
+        self._archivo.flush()
+        if self.sincronizar: os.fsync(self._archivo.fileno())
+        self.lotes += 1
+        self.escritos += len(pendientes)
+
+    def _control(self, registro):
+        # [orden, secuencia (la rellena el escritor), evento de hecho]
+        orden, _, listo = registro
+        registro[1] = self.secuencia
+        if orden == "rotar":
+            self._archivo.close()
+            self._archivo = open(os.path.join(self.directorio, _nombre_segmento(self.secuencia)), "ab")
+        elif orden == "cerrar":
+            self._archivo.close()
+        listo.set()
+        return orden != "cerrar"
+
+    def _orden(self, orden):
+        """Pasa `orden` al escritor y espera a que la cumpla. None si el escritor está parado."""
+        registro = [orden, None, threading.Event()]
+        self._cola.put(registro)
+        # Si el escritor se para después de vaciar la cola, nadie marcará el evento
+        while not registro[2].wait(0.1):
+            if not self._escritor.is_alive(): break
+        return registro[1]
+
+    def rotar(self):
+        """Empieza un segmento nuevo. Devuelve su secuencia inicial (todo lo anterior ya está escrito)."""
+        secuencia = self._orden("rotar")
+        if secuencia is None: raise OSError("El escritor del diario está parado") from self.error
+        return secuencia
+
+    def purgar(self, secuencia):
+        """Borra los segmentos que terminan antes de `secuencia` (ya cubiertos por una instantánea)."""
+        segmentos = _segmentos(self.directorio)
+        for (inicio, ruta), siguiente in zip(segmentos, segmentos[1:]):
+            if siguiente[0] <= secuencia: os.remove(ruta)
+
+    def cerrar(self):
+        """Escribe lo pendiente y cierra el fichero (con el escritor parado, solo lo cierra)."""
+        self._orden("cerrar")
+        self._escritor.join()
+        if self.error is not None: self._archivo.close()
+
+
+# --- INSTANTÁNEAS ---
+def guardar_instantanea(sistema, diario=None):
+    """Escribe la instantánea del sistema en el directorio del diario y compacta el diario.
+
+    Se hace sin parar el sistema: primero se rota el diario (todo lo anterior a la
+    rotación ya está aplicado en memoria) y luego se copia el estado. Lo que cambie
+    durante la copia está también en el segmento nuevo y se reaplica al restaurar.
+    """
+    diario = diario or sistema.diario
+    secuencia = diario.rotar()
+    sistema.flota.materializar()
+
+    taxis = list(sistema.taxis.values())
+    filas = []
+    textos = []
+    for taxi in taxis:
+        x, y = taxi.x, taxi.y
+        destino = taxi.destino_actual or (0.0, 0.0)
+        # Un viaje en curso se guarda saliendo desde donde va ahora
+        filas.append((taxi.id, x, y, taxi.calificacion, taxi.ganancias, taxi.viajes,
+                      taxi.cliente_actual or 0, x, y, destino[0], destino[1]))
+        textos += (taxi.modelo, taxi.placa)
+    filas_taxis = np.array(filas, dtype=DTYPE_TAXIS)
+
+    clientes = list(sistema.clientes.values())
+    filas_clientes = np.array([(c.id, c.viajes) for c in clientes], dtype=DTYPE_CLIENTES)
+    for cliente in clientes: textos += (cliente.nombre, cliente.tarjeta_credito)
+
+    with sistema.mutex_cola:
+        cola = list(sistema.cola_espera)
+    filas_cola = np.array(
+        [(s["cliente_id"], s["ox"], s["oy"], s["dx"], s["dy"], segundos(s["t"])) for s in cola],
+        dtype=DTYPE_COLA,
+    )
+
+    codificados = [str(t).encode("utf-8") for t in textos]
+    finales = np.cumsum([len(t) for t in codificados], dtype=np.int64)
+    blob = b"".join(codificados)
+
+    with sistema.mutex_contabilidad:
+        ganancia, viajes = sistema.ganancia_empresa, sistema.viajes_totales
+    cabecera = CABECERA_INSTANTANEA.pack(
+        MAGIA, VERSION_FORMATO, secuencia, segundos(sistema.tiempo_actual), ganancia, viajes,
+        sistema.max_id_taxi + 1, max((c.id for c in clientes), default=0) + 1,
+        len(taxis), len(clientes), len(cola), len(blob),
+    )
+
+    ruta = os.path.join(diario.directorio, ARCHIVO_INSTANTANEA)
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(cabecera.ljust(TAMANO_CABECERA, b"\0"))
+        for datos in (filas_taxis, filas_clientes, filas_cola, finales):
+            f.write(datos.tobytes())
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)  # Atómico: o la instantánea vieja o la nueva, nunca media
+    diario.purgar(secuencia)
+    return secuencia
+
+
+def _leer_instantanea(ruta, estado):
+    with open(ruta, "rb") as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        (magia, version, secuencia, tiempo, ganancia, viajes, sig_taxi, sig_cliente,
+         n_taxis, n_clientes, n_cola, largo_textos) = CABECERA_INSTANTANEA.unpack_from(mapa, 0)
+        if magia != MAGIA or version != VERSION_FORMATO: raise ValueError(f"Instantánea no válida: {ruta}")
+
+        desplazamiento = TAMANO_CABECERA
+        arrays = []
+        for dtype, n in ((DTYPE_TAXIS, n_taxis), (DTYPE_CLIENTES, n_clientes), (DTYPE_COLA, n_cola),
+                         (np.dtype("<i8"), 2 * (n_taxis + n_clientes))):
+            arrays.append(np.frombuffer(mapa, dtype=dtype, count=n, offset=desplazamiento))
+            desplazamiento += dtype.itemsize * n
+        taxis, clientes, cola, finales = (a.tolist() for a in arrays)
+        del arrays  # Sin vistas vivas el mmap se puede cerrar
+        blob = mapa[desplazamiento:desplazamiento + largo_textos]
+    finally:
+        mapa.close()
+
+    inicios = [0] + finales[:-1]
+    textos = [blob[a:b].decode("utf-8") for a, b in zip(inicios, finales)]
+    for i, (id_taxi, x, y, calificacion, ganancias, viajes_taxi, cliente, ox, oy, dx, dy) in enumerate(taxis):
+        estado["taxis"][id_taxi] = [textos[2 * i], textos[2 * i + 1], x, y, calificacion, ganancias,
+                                    viajes_taxi, cliente, ox, oy, dx, dy]
+    base = 2 * n_taxis
+    for i, (id_cliente, viajes_cliente) in enumerate(clientes):
+        estado["clientes"][id_cliente] = [textos[base + 2 * i], textos[base + 2 * i + 1], viajes_cliente]
+    for cliente, ox, oy, dx, dy, t in cola:
+        estado["cola"][cliente] = (ox, oy, dx, dy, t)
+    estado.update(tiempo=tiempo, ganancia=ganancia, viajes=viajes,
+                  siguiente_taxi=sig_taxi, siguiente_cliente=sig_cliente)
+    return secuencia
+
+
+# --- REPETICIÓN DEL DIARIO ---
+# Estado intermedio: taxis id -> [modelo, placa, x, y, calificacion, ganancias, viajes, cliente, ox, oy, dx, dy]
+def _leer_textos(datos, desplazamiento, n):
+    textos = []
+    for _ in range(n):
+        (largo,) = LARGO_TEXTO.unpack_from(datos, desplazamiento)
+        desplazamiento += LARGO_TEXTO.size
+        textos.append(datos[desplazamiento:desplazamiento + largo].decode("utf-8"))
+        desplazamiento += largo
+    return textos
+
+
+def _aplicar(estado, tipo, campos, datos, desplazamiento):
+    taxis, clientes, cola = estado["taxis"], estado["clientes"], estado["cola"]
+    if tipo == LIQUIDACION:
+        id_taxi, cliente, x, y, viajes_taxi, viajes_cliente, ganancias, viajes, ganancia, t = campos
+        taxi = taxis.get(id_taxi)
+        if taxi is not None:
+            taxi[2], taxi[3], taxi[5], taxi[6], taxi[7] = x, y, ganancias, viajes_taxi, 0
+        if cliente and cliente in clientes: clientes[cliente][2] = viajes_cliente
+        estado.update(viajes=viajes, ganancia=ganancia)
+        estado["tiempo"] = max(estado["tiempo"], t)
+    elif tipo == ASIGNACION:
+        id_taxi, cliente, ox, oy, dx, dy = campos
+        taxi = taxis.get(id_taxi)
+        if taxi is not None:
+            taxi[2], taxi[3], taxi[7], taxi[8], taxi[9], taxi[10], taxi[11] = ox, oy, cliente, ox, oy, dx, dy
+        cola.pop(cliente, None)
+    elif tipo == ENCOLADA:
+        cliente, ox, oy, dx, dy, t = campos
+        if cliente not in cola: cola[cliente] = (ox, oy, dx, dy, t)
+        estado["tiempo"] = max(estado["tiempo"], t)
+    elif tipo == ALTA_CLIENTE:
+        nombre, tarjeta = _leer_textos(datos, desplazamiento, 2)
+        clientes.setdefault(campos[0], [nombre, tarjeta, 0])
+        estado["siguiente_cliente"] = max(estado["siguiente_cliente"], campos[0] + 1)
+    elif tipo == ALTA_TAXI:
+        id_taxi, x, y, calificacion, viajes_taxi, ganancias = campos
+        modelo, placa = _leer_textos(datos, desplazamiento, 2)
+        taxis[id_taxi] = [modelo, placa, x, y, calificacion, ganancias, viajes_taxi, 0, x, y, x, y]
+        estado["siguiente_taxi"] = max(estado["siguiente_taxi"], id_taxi + 1)
+    elif tipo == BAJA_TAXI:
+        taxis.pop(campos[0], None)
+
+
+def _repetir_segmento(ruta, inicio, desde, estado):
+    """Aplica los registros de un segmento con secuencia >= desde.
+
+    Un registro a medias (caída durante la escritura) se corta del fichero para
+    que lo que se añada después siga siendo legible.
+    """
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    secuencia = inicio
+    desplazamiento = 0
+    fin = len(datos)
+    while desplazamiento + CABECERA_REGISTRO.size <= fin:
+        tipo, largo = CABECERA_REGISTRO.unpack_from(datos, desplazamiento)
+        carga = desplazamiento + CABECERA_REGISTRO.size
+        if carga + largo > fin or tipo not in FORMATOS: break  # Cola rota por una caída
+        if secuencia >= desde:
+            formato = FORMATOS[tipo]
+            _aplicar(estado, tipo, formato.unpack_from(datos, carga), datos, carga + formato.size)
+        secuencia += 1
+        desplazamiento = carga + largo
+    if desplazamiento < fin:
+        with open(ruta, "r+b") as f: f.truncate(desplazamiento)
+    return secuencia
+
+
+def restaurar(sistema, directorio):
+    """Carga instantánea + resto del diario en un sistema recién creado.
+
+    Devuelve la secuencia por la que debe seguir el diario (para `DiarioEventos`).
+    """
+    estado = {
+        "taxis": {}, "clientes": {}, "cola": {}, "tiempo": segundos(sistema.tiempo_actual),
+        "ganancia": 0.0, "viajes": 0, "siguiente_taxi": 1, "siguiente_cliente": 1,
+    }
+    if not os.path.isdir(directorio): return 0
+
+    desde = 0
+    ruta = os.path.join(directorio, ARCHIVO_INSTANTANEA)
+    if os.path.exists(ruta): desde = _leer_instantanea(ruta, estado)
+    siguiente = desde
+    for inicio, ruta_segmento in _segmentos(directorio):
+        siguiente = max(siguiente, _repetir_segmento(ruta_segmento, inicio, desde, estado))
+
+    _reconstruir(sistema, estado)
+    return siguiente
+
+
+def _reconstruir(sistema, estado):
+    """Vuelca el estado intermedio en el sistema (antes de arrancar hilos: sin locks)."""
+    for id_taxi, (modelo, placa, x, y, calificacion, ganancias, viajes, cliente, ox, oy, dx, dy) in estado["taxis"].items():
+        taxi = Taxi(id_taxi, modelo, placa, x, y, calificacion)
+        taxi.ganancias = ganancias
+        taxi.viajes = viajes
+        sistema.flota.alta(taxi)
+        sistema.taxis[id_taxi] = taxi
+        if cliente:
+            # Viaje en curso: se reanuda hacia su destino
+            taxi.estado = "OCUPADO"
+            taxi.destino_actual = (dx, dy)
+            taxi.cliente_actual = cliente
+            # Con red viaria, por las mismas calles que al asignarlo
+            tramos = sistema.red.tramos(ox, oy, dx, dy) if sistema.red is not None else None
+            sistema.flota.fijar_ruta(taxi, ox, oy, dx, dy, tramos)
+            sistema.clientes_viajando.add(cliente)
+        else:
+            sistema.indice_libres.insertar(taxi)
+
+    for id_cliente, (nombre, tarjeta, viajes) in estado["clientes"].items():
+        cliente = Cliente(id_cliente, nombre, tarjeta)
+        cliente.viajes = viajes
+        sistema.clientes[id_cliente] = cliente
+
+    for cliente, (ox, oy, dx, dy, t) in estado["cola"].items():
+        sistema.cola_espera.append({"cliente_id": cliente, "ox": ox, "oy": oy, "dx": dx, "dy": dy, "t": instante(t)})
+        sistema.clientes_viajando.add(cliente)
+
+    sistema.ganancia_empresa = estado["ganancia"]
+    sistema.viajes_totales = estado["viajes"]
+    sistema.tiempo_actual = instante(estado["tiempo"])
+    siguiente_taxi = max(estado["siguiente_taxi"], next(sistema._ids_taxi))
+    sistema._ids_taxi = itertools.count(siguiente_taxi)
+    sistema.max_id_taxi = siguiente_taxi - 1
+    sistema._ids_cliente = itertools.count(estado["siguiente_cliente"])
+    sistema.podio_taxis.reconstruir()
+    sistema.podio_clientes.reconstruir()
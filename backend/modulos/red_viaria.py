@@ -0,0 +1,251 @@
+"""Modelo de ciudad como grafo de calles (opcional).
+
+- Nodos con coordenadas en el mapa 100x100 y aristas dirigidas con un peso en
+  "distancia equivalente": longitud x factor de congestión. Un ETA en ticks es
+  peso / velocidad.
+- Rutas: A* guiado por landmarks (ALT) con caché LRU por par de nodos.
+- ETAs para ordenar candidatos: cotas inferiores ALT vectorizadas (una operación
+  NumPy para todos los candidatos) y ruta exacta solo para los que pueden ganar.
+- `nodo_mas_cercano` es O(1): una rejilla precalculada con el nodo más cercano a
+  cada celda.
+
+Se crea con `RedViaria.cuadricula(...)` o `RedViaria.cargar(ruta_json)` con
+{"nodos": [[x, y], ...], "aristas": [[origen, destino, peso], ...]}.
+"""
+import heapq
+import json
+import math
+import random
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+TAMANO_CACHE = 50_000  # Rutas (par de nodos) recordadas
+N_LANDMARKS = 8
+RESOLUCION_SNAP = 128  # Celdas por lado de la rejilla de nodo más cercano
+
+
+class RedViaria:
+    def __init__(self, coordenadas, aristas, tamano_mapa=100.0, n_landmarks=N_LANDMARKS, tamano_cache=TAMANO_CACHE):
+        self.coordenadas = np.asarray(coordenadas, dtype=float)
+        self.n = len(self.coordenadas)
+        self.tamano_mapa = tamano_mapa
+
+        # Adyacencia en listas (directa e inversa): (vecino, peso)
+        self.salientes = [[] for _ in range(self.n)]
+        self.entrantes = [[] for _ in range(self.n)]
+        for a, b, peso in aristas:
+            a, b, peso = int(a), int(b), float(peso)
+            self.salientes[a].append((b, peso))
+            self.entrantes[b].append((a, peso))
+
+        self.tamano_cache = tamano_cache
+        self._cache = OrderedDict()  # (origen, destino) -> (coste, [nodos])
+        self._mutex_cache = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+        self._preparar_snap()
+        self._preparar_landmarks(n_landmarks)
+
+    # --- CONSTRUCCIÓN ---
+    @classmethod
+    def cuadricula(cls, lado=21, tamano_mapa=100.0, congestion=1.0, semilla=0, **kwargs):
+        """Calles en cuadrícula `lado` x `lado`; cada tramo va entre 1 y 1+congestion veces más lento."""
+        rng = random.Random(semilla)
+        paso = tamano_mapa / (lado - 1)
+        coordenadas = [(i * paso, j * paso) for j in range(lado) for i in range(lado)]
+        aristas = []
+        for j in range(lado):
+            for i in range(lado):
+                nodo = j * lado + i
+                for vecino in ((nodo + 1) if i + 1 < lado else None, (nodo + lado) if j + 1 < lado else None):
+                    if vecino is None: continue
+                    peso = paso * (1.0 + congestion * rng.random())
+                    aristas.append((nodo, vecino, peso))
+                    aristas.append((vecino, nodo, peso))
+        return cls(coordenadas, aristas, tamano_mapa, **kwargs)
+
+    @classmethod
+    def cargar(cls, ruta, **kwargs):
+        with open(ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+        return cls(datos["nodos"], datos["aristas"], **kwargs)
+
+    def _preparar_snap(self):
+        """Rejilla RESOLUCION_SNAP² con el nodo más cercano al centro de cada celda."""
+        self.tam_celda_snap = self.tamano_mapa / RESOLUCION_SNAP
+        centros = (np.arange(RESOLUCION_SNAP) + 0.5) * self.tam_celda_snap
+        cx, cy = np.meshgrid(centros, centros, indexing="ij")
+        puntos = np.column_stack((cx.ravel(), cy.ravel()))
+        cercanos = np.empty(len(puntos), dtype=np.int64)
+        for inicio in range(0, len(puntos), 1024):  # Por bloques para no crear una matriz enorme
+            bloque = puntos[inicio:inicio + 1024]
+            d2 = ((bloque[:, None, :] - self.coordenadas[None, :, :]) ** 2).sum(axis=2)
+            cercanos[inicio:inicio + 1024] = d2.argmin(axis=1)
+        self.snap = cercanos.reshape(RESOLUCION_SNAP, RESOLUCION_SNAP)
+
+    def _preparar_landmarks(self, k):
+        """Elige landmarks por el más lejano y guarda distancias desde y hacia cada uno (ALT)."""
+        k = min(k, self.n)
+        landmarks = [0]
+        desde = [self._dijkstra(0, self.salientes)]
+        while len(landmarks) < k:
+            # El siguiente: el nodo alcanzable más lejos de todos los elegidos
+            cercania = np.min(np.array(desde), axis=0)
+            cercania[~np.isfinite(cercania)] = -1
+            landmarks.append(int(cercania.argmax()))
+            desde.append(self._dijkstra(landmarks[-1], self.salientes))
+        self.landmarks = landmarks
+        self.d_desde = np.array(desde)  # d(L -> v)
+        self.d_hacia = np.array([self._dijkstra(l, self.entrantes) for l in landmarks])  # d(v -> L)
+        # Por nodo, (d(L -> v)..., -d(v -> L)...) en tuplas de Python para la heurística de A*
+        self._alt = [tuple(fila) for fila in np.concatenate((self.d_desde, -self.d_hacia)).T.tolist()]
+
+    def _dijkstra(self, origen, adyacencia):
+        distancia = [math.inf] * self.n
+        distancia[origen] = 0.0
+        abiertos = [(0.0, origen)]
+        while abiertos:
+            d, nodo = heapq.heappop(abiertos)
+            if d > distancia[nodo]: continue
+            for vecino, peso in adyacencia[nodo]:
+                nueva = d + peso
+                if nueva < distancia[vecino]:
+                    distancia[vecino] = nueva
+                    heapq.heappush(abiertos, (nueva, vecino))
+        return np.array(distancia)
+
+    # --- CONSULTAS ---
+    def nodo_mas_cercano(self, x, y):
+        i = min(max(int(x / self.tam_celda_snap), 0), RESOLUCION_SNAP - 1)
+        j = min(max(int(y / self.tam_celda_snap), 0), RESOLUCION_SNAP - 1)
+        return int(self.snap[i, j])
+
+    def cota_eta(self, origenes, destino):
+        """Cota inferior ALT del coste origen->destino para un array de nodos origen."""
+        origenes = np.asarray(origenes)
+        cota_desde = self.d_desde[:, destino][:, None] - self.d_desde[:, origenes]
+        cota_hacia = self.d_hacia[:, origenes] - self.d_hacia[:, destino][:, None]
+        cota = np.maximum(cota_desde, cota_hacia).max(axis=0)
+        return np.maximum(np.nan_to_num(cota, nan=0.0, posinf=math.inf, neginf=0.0), 0.0)
+
+    def ruta(self, origen, destino):
+        """(coste, [nodos]) del camino más corto; math.inf y [] si no hay camino. Con caché LRU."""
+        clave = (origen, destino)
+        with self._mutex_cache:
+            encontrada = self._cache.get(clave)
+            if encontrada is not None:
+                self._cache.move_to_end(clave)
+                self.aciertos += 1
+                return encontrada
+            self.fallos += 1
+
+        encontrada = self._a_estrella(origen, destino)
+        with self._mutex_cache:
+            self._cache[clave] = encontrada
+            if len(self._cache) > self.tamano_cache: self._cache.popitem(last=False)
+        return encontrada
+
+    def eta(self, origen, destino):
+        return self.ruta(origen, destino)[0]
+
+    @staticmethod
+    def _cota_alt(alt_destino, alt_nodo):
+        """Cota ALT de un nodo al destino: max(d(L -> t) - d(L -> v), d(v -> L) - d(t -> L), 0).
+
+        Un término inf - inf (nan) no cuenta; uno inf sí: desde ese nodo no se llega.
+        """
+        cota = 0.0
+        for a, b in zip(alt_destino, alt_nodo):
+            if a - b > cota: cota = a - b
+        return cota
+
+    def _a_estrella(self, origen, destino):
+        if origen == destino: return 0.0, [origen]
+        # Heurística ALT (admisible y consistente) solo para los nodos que se alcanzan:
+        # calcularla para toda la red costaba más que la búsqueda
+        alt, alt_destino, cota_alt = self._alt, self._alt[destino], self._cota_alt
+        h = {}
+        coste = {origen: 0.0}
+        previo = {origen: None}
+        abiertos = [(cota_alt(alt_destino, alt[origen]), 0.0, origen)]
+        while abiertos:
+            _, g, nodo = heapq.heappop(abiertos)
+            if nodo == destino: break
+            if g > coste[nodo]: continue
+            for vecino, peso in self.salientes[nodo]:
+                nuevo = g + peso
+                if nuevo < coste.get(vecino, math.inf):
+                    coste[vecino] = nuevo
+                    previo[vecino] = nodo
+                    cota = h.get(vecino)
+                    if cota is None: cota = h[vecino] = cota_alt(alt_destino, alt[vecino])
+                    heapq.heappush(abiertos, (nuevo + cota, nuevo, vecino))
+        if destino not in coste: return math.inf, []
+
+        camino = [destino]
+        while previo[camino[-1]] is not None: camino.append(previo[camino[-1]])
+        camino.reverse()
+        return coste[destino], camino
+
+    # --- INTEGRACIÓN CON EL SISTEMA ---
+    def eta_desde(self, x, y, nodo_destino, destino_x, destino_y):
+        """ETA exacto (en distancia equivalente) de un punto a otro pasando por la red."""
+        nodo = self.nodo_mas_cercano(x, y)
+        ax, ay = self.coordenadas[nodo]
+        bx, by = self.coordenadas[nodo_destino]
+        return (math.hypot(x - ax, y - ay) + self.eta(nodo, nodo_destino)
+                + math.hypot(destino_x - bx, destino_y - by))
+
+    def mas_rapido(self, taxis, x, y):
+        """El taxi con menor ETA por la red hasta (x, y) y ese ETA.
+
+        Ordena por la cota ALT (vectorizada) y solo calcula la ruta exacta mientras
+        la cota del siguiente pueda batir al mejor encontrado.
+        """
+        destino = self.nodo_mas_cercano(x, y)
+        bx, by = self.coordenadas[destino]
+        salida = math.hypot(x - bx, y - by)
+        nodos = np.array([self.nodo_mas_cercano(t.x, t.y) for t in taxis])
+        acceso = np.hypot(
+            np.array([t.x for t in taxis]) - self.coordenadas[nodos, 0],
+            np.array([t.y for t in taxis]) - self.coordenadas[nodos, 1],
+        ) + salida
+        cotas = self.cota_eta(nodos, destino) + acceso
+
+        mejor, mejor_eta = None, math.inf
+        for i in np.argsort(cotas, kind="stable").tolist():
+            if cotas[i] >= mejor_eta: break
+            eta = acceso[i] + self.eta(int(nodos[i]), destino)
+            if eta < mejor_eta: mejor, mejor_eta = taxis[i], eta
+        return (mejor, mejor_eta) if mejor is not None else (taxis[0], math.inf)
+
+    def tramos(self, ox, oy, dx, dy):
+        """Puntos de paso (x, y, factor) de un viaje: acceso a la red, calles y salida al destino.
+
+        `factor` es el tiempo por unidad de distancia del tramo (1 fuera de la red).
+        """
+        origen = self.nodo_mas_cercano(ox, oy)
+        destino = self.nodo_mas_cercano(dx, dy)
+        _, camino = self.ruta(origen, destino)
+        if not camino: return [(dx, dy, 1.0)]  # Sin conexión: en línea recta
+
+        tramos = []
+        x, y = ox, oy
+        anterior = None
+        for nodo in camino:
+            nx, ny = self.coordenadas[nodo].tolist()
+            longitud = math.hypot(nx - x, ny - y)
+            factor = 1.0
+            if anterior is not None and longitud > 0:
+                peso = min(p for v, p in self.salientes[anterior] if v == nodo)
+                factor = peso / longitud
+            if longitud > 1e-9: tramos.append((nx, ny, factor))
+            x, y, anterior = nx, ny, nodo
+        if math.hypot(dx - x, dy - y) > 1e-9 or not tramos: tramos.append((dx, dy, 1.0))
+        return tramos
+
+    def resumen(self):
+        return {"nodos": self.n, "rutas_en_cache": len(self._cache), "aciertos_cache": self.aciertos, "fallos_cache": self.fallos}
@@ -0,0 +1,321 @@
+"""Simulación repartida en varios procesos, uno por región del mapa.
+
+El mapa 100x100 se corta en franjas verticales. Cada franja la lleva un proceso
+con su propio SistemaUnieTaxi (sin GIL compartido). Es un mundo aparte del
+SistemaUnieTaxi del servicio, no un reparto suyo: sus taxis y clientes solo se
+ven por /regiones/* (y bench_regiones), nunca en /estado, /taxis ni /solicitar_viaje.
+Un coordinador, en el proceso principal:
+- reparte las solicitudes a la región del origen (o a la más cercana con taxis libres)
+  y devuelve lo que respondió la región,
+- reenvía a su nueva región los taxis que acaban un viaje fuera de la suya,
+- lee el estado de todas las regiones desde memoria compartida sin bloquear a nadie,
+- enciende o apaga la carga que genera cada región (`activar_carga`).
+
+Memoria compartida: un bloque float64 por región con una cabecera de CAMPOS
+seguida de filas (id, x, y, ocupado). La cabecera empieza por un contador de
+secuencia (seqlock): impar mientras el trabajador escribe, par cuando la foto es
+coherente; el lector reintenta si cambia durante la copia, durante como mucho
+ESPERA_MAXIMA_LECTURA (si un trabajador muere a medio escribir, la secuencia se
+queda impar para siempre).
+"""
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .motor import MotorSimulacion, GeneradorClientes, VELOCIDAD_SIMULACION
+from .sistema import SistemaUnieTaxi
+from .cliente import Cliente
+from .bitacora import SILENCIO
+
+TAMANO_MAPA = 100.0
+CAMPOS = ("secuencia", "ticks", "viajes", "ganancia_empresa", "cola_espera",
+          "taxis", "taxis_libres", "despachadas")
+CABECERA = len(CAMPOS)
+COLUMNAS = 4  # id, x, y, ocupado
+RANGO_IDS = 1_000_000_000  # Cada región da ids de taxi en su propio rango
+# Los clientes de la API van por encima de este id en cada región: no chocan con los del generador
+BASE_CLIENTES_EXTERNOS = 1_000_000_000
+ESPERA_MAXIMA_LECTURA = 1.0  # Segundos reintentando una foto a medio escribir antes de rendirse
+
+
+def region_de(x, n_regiones):
+    i = int(float(x) / TAMANO_MAPA * n_regiones)
+    return min(max(i, 0), n_regiones - 1)
+
+
+def _publicar(bloque, sistema, motor):
+    """Escribe la foto del tick en memoria compartida (protocolo seqlock)."""
+    cabecera = bloque[:CABECERA]
+    cabecera[0] += 1  # Impar: escribiendo
+    flota = sistema.flota
+    with flota.mutex:
+        flota.materializar()
+        n = flota.n
+        filas = bloque[CABECERA:].reshape(-1, COLUMNAS)
+        filas[:n, 0] = flota.ids[:n]
+        filas[:n, 1] = flota.x[:n]
+        filas[:n, 2] = flota.y[:n]
+        filas[:n, 3] = flota.activo[:n]
+    cabecera[1:] = (
+        motor.ticks, sistema.viajes_totales, sistema.ganancia_empresa,
+        len(sistema.cola_espera), n, len(sistema.indice_libres),
+        sistema.asignaciones_totales(),
+    )
+    cabecera[0] += 1  # Par: foto coherente
+
+
+def _atender_externa(sistema, cliente_id, ox, oy, dx, dy):
+    """Solicitud llegada por la API: (resultado, id del taxi o None).
+
+    El cliente se da de alta en la región con su id desplazado, así que el
+    generador local (que numera desde 1) nunca lo ocupa y sus viajes cuentan.
+    """
+    id_local = BASE_CLIENTES_EXTERNOS + cliente_id
+    if id_local not in sistema.clientes:
+        with sistema.mutex_clientes:
+            sistema.clientes.setdefault(id_local, Cliente(id_local, f"API {cliente_id}", ""))
+    resultado = sistema.procesar_solicitud(id_local, ox, oy, dx, dy)
+    if isinstance(resultado, str): return resultado, None
+    return "ASIGNADO", resultado.id
+
+
+def _trabajador(indice, n_regiones, nombre_bloque, entrada, salida, config):
+    """Bucle de un proceso-región: mensajes entrantes, tick, migraciones y publicación."""
+    bloque_shm = shared_memory.SharedMemory(name=nombre_bloque)
+    bloque = np.ndarray((bloque_shm.size // 8,), dtype=np.float64, buffer=bloque_shm.buf)
+    try:
+        ancho = TAMANO_MAPA / n_regiones
+        x0, x1 = indice * ancho, (indice + 1) * ancho
+
+        sistema = SistemaUnieTaxi(
+            semilla=config["semilla"] + indice, reloj_simulado=True,
+            primer_id_taxi=indice * RANGO_IDS + 1, instrumentar=False,
+        )
+        sistema.log = SILENCIO
+        sistema.limite_flota = config["limite_flota"]
+        if config["politica"]: sistema.politica_despacho = config["politica"]
+        for i in range(config["taxis_por_region"]):
+            sistema.registrar_taxi("Region", f"R{indice}-{i}", x=sistema.rng.uniform(x0, x1))
+
+        motor = MotorSimulacion(sistema)
+        generador = GeneradorClientes(sistema, rango_origen_x=(x0, x1))
+        ticks_objetivo = config["ticks"]
+        generando = config["carga_activa"]
+        fin_enviado = False
+
+        while True:
+            # 1. MENSAJES DEL COORDINADOR
+            while True:
+                try:
+                    mensaje = entrada.get_nowait()
+                except queue.Empty:
+                    break
+                tipo = mensaje[0]
+                if tipo == "parar": return
+                if tipo == "carga": generando = mensaje[1]
+                elif tipo == "solicitud": salida.put(("resultado", mensaje[1], _atender_externa(sistema, *mensaje[2:])))
+                elif tipo == "taxi": sistema.recibir_taxi(mensaje[1])
+
+            if ticks_objetivo is not None and motor.ticks >= ticks_objetivo:
+                if not fin_enviado:
+                    salida.put(("fin", indice))
+                    fin_enviado = True
+                # Seguimos absorbiendo taxis que migran hasta que el coordinador nos pare
+                time.sleep(0.005)
+                continue
+
+            # 2. TICK (con la carga local generada en la propia región, si está activa)
+            if generando:
+                for _ in range(config["solicitudes_por_tick"]):
+                    generador.generar()
+            motor.paso(config["velocidad"])
+
+            # 3. MIGRACIONES: taxis libres que han acabado fuera de la región
+            for taxi in motor.ultimos_llegados:
+                if taxi.estado == "LIBRE" and not (x0 <= taxi.x < x1):
+                    datos = {**taxi.a_dict(), "calificacion": taxi.calificacion}
+                    exito, _ = sistema.eliminar_taxi(taxi.id)
+                    if exito: salida.put(("taxi", datos))
+
+            # 4. PUBLICAR
+            _publicar(bloque, sistema, motor)
+            if config["pausa"]: time.sleep(config["pausa"])
+    finally:
+        del bloque
+        bloque_shm.close()
+
+
+class CoordinadorRegiones:
+    """Arranca los procesos-región, enruta solicitudes/taxis y fusiona su estado."""
+
+    def __init__(self, n_regiones, taxis, semilla=0, solicitudes_por_tick=0, ticks=None,
+                 velocidad=VELOCIDAD_SIMULACION, pausa=0.0, politica=None, carga_activa=True):
+        self.n_regiones = n_regiones
+        self.config = {
+            "taxis_por_region": taxis // n_regiones,
+            # Flota fija: si cada región contratase, las migraciones harían crecer el total sin tope
+            "limite_flota": 0,
+            "semilla": semilla,
+            "solicitudes_por_tick": solicitudes_por_tick,
+            "carga_activa": carga_activa,  # Se cambia en marcha con activar_carga
+            "ticks": ticks,
+            "velocidad": velocidad,
+            "pausa": pausa,  # Segundos entre ticks (0 = tan rápido como se pueda)
+            "politica": politica,
+        }
+        # Cabe toda la flota en cualquier región: las migraciones pueden concentrarla
+        self.floats_por_bloque = CABECERA + taxis * COLUMNAS
+        self.bloques_shm = []
+        self.bloques = []
+        self.entradas = []
+        self.procesos = []
+        self.finalizadas = set()
+        self.migraciones = 0
+        self._pendientes = {}  # ficha -> Future de una solicitud enviada a una región
+        self._fichas = itertools.count()
+        self._contexto = multiprocessing.get_context("spawn")
+        self._salida = None
+        self._enrutador = None
+        self._parar = threading.Event()
+
+    def iniciar(self):
+        self._salida = self._contexto.Queue()
+        for i in range(self.n_regiones):
+            shm = shared_memory.SharedMemory(create=True, size=self.floats_por_bloque * 8)
+            bloque = np.ndarray((self.floats_por_bloque,), dtype=np.float64, buffer=shm.buf)
+            bloque[:] = 0
+            entrada = self._contexto.Queue()
+            proceso = self._contexto.Process(
+                target=_trabajador, args=(i, self.n_regiones, shm.name, entrada, self._salida, self.config),
+                daemon=True,
+            )
+            self.bloques_shm.append(shm)
+            self.bloques.append(bloque)
+            self.entradas.append(entrada)
+            self.procesos.append(proceso)
+        for proceso in self.procesos: proceso.start()
+        self._enrutador = threading.Thread(target=self._enrutar, daemon=True)
+        self._enrutador.start()
+        return self
+
+    def _enrutar(self):
+        """Hilo del coordinador: recoge mensajes de las regiones y reenvía los taxis que cruzan."""
+        while not self._parar.is_set():
+            try:
+                mensaje = self._salida.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if mensaje[0] == "taxi":
+                datos = mensaje[1]
+                self.entradas[region_de(datos["x"], self.n_regiones)].put(("taxi", datos))
+                self.migraciones += 1
+            elif mensaje[0] == "resultado":
+                futuro = self._pendientes.pop(mensaje[1], None)
+                # Quien la pidió pudo rendirse (timeout o desconexión) y cancelarla
+                if futuro is not None and futuro.set_running_or_notify_cancel(): futuro.set_result(mensaje[2])
+            elif mensaje[0] == "fin":
+                self.finalizadas.add(mensaje[1])
+
+    def solicitar(self, cliente_id, ox, oy, dx, dy):
+        """Envía la solicitud a la región del origen o, si no tiene taxis libres, a la más cercana que sí.
+
+        Devuelve (región, Future) y el Future acaba con (resultado, id del taxi o None).
+        Lee las cabeceras por seqlock, que puede esperar: no llamar desde el bucle de eventos.
+        Cancelar el Future la olvida; la respuesta de la región, si llega, se descarta.
+        """
+        origen = region_de(ox, self.n_regiones)
+        destino = origen
+        if self._leer_cabecera(origen)["taxis_libres"] == 0:
+            for distancia in range(1, self.n_regiones):
+                vecinas = [r for r in (origen - distancia, origen + distancia) if 0 <= r < self.n_regiones]
+                con_libres = [r for r in vecinas if self._leer_cabecera(r)["taxis_libres"] > 0]
+                if con_libres:
+                    destino = con_libres[0]
+                    break
+        ficha = next(self._fichas)
+        futuro = Future()
+        self._pendientes[ficha] = futuro
+        futuro.add_done_callback(lambda _: self._pendientes.pop(ficha, None))
+        self.entradas[destino].put(("solicitud", ficha, cliente_id, ox, oy, dx, dy))
+        return destino, futuro
+
+    def activar_carga(self, activa):
+        """Enciende o apaga la carga que cada región genera en su tick."""
+        for entrada in self.entradas: entrada.put(("carga", bool(activa)))
+
+    def _leer(self, region, incluir_taxis):
+        """Copia coherente del bloque de una región sin bloquear al trabajador (seqlock)."""
+        bloque = self.bloques[region]
+        limite = time.monotonic() + ESPERA_MAXIMA_LECTURA
+        while True:
+            secuencia = bloque[0]
+            if secuencia % 2:
+                if time.monotonic() > limite:
+                    raise TimeoutError(f"La región {region} no termina de publicar (¿proceso caído?)")
+                time.sleep(0)
+                continue
+            cabecera = bloque[:CABECERA].copy()
+            filas = None
+            if incluir_taxis:
+                n = int(cabecera[CAMPOS.index("taxis")])
+                filas = bloque[CABECERA:CABECERA + n * COLUMNAS].reshape(-1, COLUMNAS).copy()
+            if bloque[0] == secuencia: return cabecera, filas
+            if time.monotonic() > limite: raise TimeoutError(f"La región {region} no deja leer una foto coherente")
+
+    def _leer_cabecera(self, region):
+        cabecera, _ = self._leer(region, False)
+        return dict(zip(CAMPOS, cabecera.tolist()))
+
+    def estado(self, incluir_taxis=False):
+        """Estado fusionado de todas las regiones (totales + detalle por región)."""
+        regiones = []
+        columnas = []
+        for i in range(self.n_regiones):
+            cabecera, filas = self._leer(i, incluir_taxis)
+            datos = dict(zip(CAMPOS, cabecera.tolist()))
+            del datos["secuencia"]
+            regiones.append({"region": i, **{k: (round(v, 2) if k == "ganancia_empresa" else int(v)) for k, v in datos.items()}})
+            if incluir_taxis: columnas.append(filas)
+
+        totales = {
+            campo: sum(r[campo] for r in regiones)
+            for campo in ("viajes", "cola_espera", "taxis", "taxis_libres", "despachadas")
+        }
+        totales["ganancia_empresa"] = round(sum(r["ganancia_empresa"] for r in regiones), 2)
+        estado = {"regiones": regiones, "totales": totales, "migraciones": self.migraciones}
+        if incluir_taxis:
+            todas = np.concatenate(columnas) if columnas else np.zeros((0, COLUMNAS))
+            estado["taxis"] = {
+                "id": todas[:, 0].astype(np.int64).tolist(),
+                "x": todas[:, 1].tolist(),
+                "y": todas[:, 2].tolist(),
+                "ocupado": todas[:, 3].astype(bool).tolist(),
+            }
+        return estado
+
+    def esperar(self, timeout=None):
+        """Espera a que todas las regiones completen los ticks pedidos (modo benchmark)."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while len(self.finalizadas) < self.n_regiones:
+            if limite is not None and time.monotonic() > limite: return False
+            time.sleep(0.01)
+        return True
+
+    def detener(self):
+        for entrada in self.entradas: entrada.put(("parar",))
+        for proceso in self.procesos: proceso.join(timeout=5)
+        self._parar.set()
+        if self._enrutador: self._enrutador.join(timeout=1)
+        for futuro in list(self._pendientes.values()): futuro.cancel()  # Cada una se quita al cancelarse
+        self._pendientes.clear()
+        self.bloques.clear()
+        for shm in self.bloques_shm:
+            shm.close()
+            shm.unlink()
+        self.bloques_shm.clear()
@@ -0,0 +1,104 @@
+import json
+import struct
+
+import numpy as np
+
+from .taxi import Taxi
+from .cliente import Cliente
+
+# Cabecera del formato binario de flota: magia, versión del formato, nº de taxis
+CABECERA_BINARIA = struct.Struct("<4sHI")
+MAGIA = b"UTAX"
+VERSION_FORMATO = 1
+
+TROZO_JSON = 4096  # Elementos por llamada a json.dumps en a_json_troceado
+
+# Posición de cada campo en las filas de las fotos (Taxi.a_fila, Cliente.a_fila)
+CAMPO_TAXI = {campo: i for i, campo in enumerate(Taxi.CAMPOS)}
+CAMPO_CLIENTE = {campo: i for i, campo in enumerate(Cliente.CAMPOS)}
+
+
+def a_json(datos):
+    """Serializa directamente con json.dumps (sin la introspección de jsonable_encoder)."""
+    return json.dumps(datos, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def a_json_troceado(datos):
+    """Como `a_json` para un dict, pero sus listas largas se codifican trozo a trozo.
+
+    json.dumps no suelta el GIL hasta acabar: desde un hilo, una lista de un millón
+    de clientes pararía el bucle de eventos todo ese rato. Entre trozos sí puede correr.
+    """
+    partes = []
+    for clave, valor in datos.items():
+        if isinstance(valor, list) and len(valor) > TROZO_JSON:
+            trozos = (a_json(valor[i:i + TROZO_JSON])[1:-1] for i in range(0, len(valor), TROZO_JSON))
+            valor = b"[" + b",".join(trozos) + b"]"
+        else:
+            valor = a_json(valor)
+        partes.append(a_json(clave) + b":" + valor)
+    return b"{" + b",".join(partes) + b"}"
+
+
+def _filas_flota(copia, taxis):
+    """(ids, x, y, filas) de las filas de `copia` (flota.CopiaFlota) cuyo id tiene fila en `taxis`.
+
+    `taxis` da la fila `Taxi.a_fila()` de cada id (`Foto.taxis`, o {id: a_fila()});
+    se saltan los taxis dados de alta después de apuntar las filas, que saldrán en la siguiente.
+    """
+    x, y = copia.posiciones()
+    ids = copia.ids
+    filas = [taxis.get(i) for i in ids.tolist()]
+    presentes = np.fromiter((fila is not None for fila in filas), dtype=bool, count=len(filas))
+    if not presentes.all():
+        ids, x, y = ids[presentes], x[presentes], y[presentes]
+        filas = [fila for fila in filas if fila is not None]
+    return ids, x, y, filas
+
+
+def flota_columnar(copia, taxis):
+    """Toda la flota como columnas paralelas (un array por campo) en lugar de un dict por taxi.
+
+    Posiciones de `copia` (flota.CopiaFlota) y el resto de las filas de `taxis`: ni
+    toca la flota viva ni lee los objetos Taxi.
+    """
+    ids, x, y, filas = _filas_flota(copia, taxis)
+    columnas = {"n": len(filas), "id": ids.tolist(), "x": x.tolist(), "y": y.tolist()}
+    for campo in ("estado", "ganancias", "viajes", "calificacion", "modelo", "placa"):
+        i = CAMPO_TAXI[campo]
+        columnas[campo] = [t[i] for t in filas]
+    return columnas
+
+
+def flota_binaria(copia, taxis):
+    """Flota empaquetada en binario little-endian (los textos fijos van en la foto completa).
+
+    Formato: cabecera `<4sHI` (b"UTAX", versión, n) seguida de n valores de cada
+    columna, una tras otra: id int32, x float32, y float32, ocupado uint8,
+    ganancias float32, viajes uint32.
+    """
+    ids, x, y, filas = _filas_flota(copia, taxis)
+    n = len(filas)
+    estado, ganancias, viajes = CAMPO_TAXI["estado"], CAMPO_TAXI["ganancias"], CAMPO_TAXI["viajes"]
+    ocupado = np.fromiter((t[estado] == "OCUPADO" for t in filas), dtype=np.uint8, count=n)
+    ganancias = np.fromiter((t[ganancias] for t in filas), dtype="<f4", count=n)
+    viajes = np.fromiter((t[viajes] for t in filas), dtype="<u4", count=n)
+    return b"".join((
+        CABECERA_BINARIA.pack(MAGIA, VERSION_FORMATO, n),
+        ids.astype("<i4").tobytes(),
+        x.astype("<f4").tobytes(),
+        y.astype("<f4").tobytes(),
+        ocupado.tobytes(),
+        ganancias.tobytes(),
+        viajes.tobytes(),
+    ))
+
+
+def clientes_columnar(clientes):
+    """Clientes (sus filas `Cliente.a_fila()`, como las de `Foto.clientes`) en columnas."""
+    clientes = list(clientes)
+    columnas = {"n": len(clientes)}
+    for campo in ("id", "nombre", "viajes"):
+        i = CAMPO_CLIENTE[campo]
+        columnas[campo] = [c[i] for c in clientes]
+    return columnas
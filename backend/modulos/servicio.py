@@ -0,0 +1,355 @@
+"""Servicio HTTP en marcha: tick físico, generador de carga e instantáneas como tareas asyncio.
+
+Importar no arranca nada: `iniciar()` se llama desde el lifespan de la app y
+`detener()` al apagarla.
+- El tick y el generador trabajan en un único hilo propio: el bucle nunca se
+  para por CPU ni por locks del sistema, y tick y generador no se solapan.
+- Tras cada tick se publica una `Foto` inmutable (entidades, agregados, copia de
+  la flota y los cambios desde la anterior). Las posiciones salen de la copia de
+  la flota: moverse no es un cambio que haya que recopiar, y en modo eventos los
+  taxis en ruta se interpolan solo si alguien las lee. Las entidades se guardan
+  como tuplas (`a_fila`), no como dicts. Los endpoints de lectura solo leen la
+  última foto, sin locks (salvo /metrics, que es en vivo): las serializaciones
+  grandes se construyen en el threadpool (nunca en el bucle) y se guardan en la
+  foto, así que mil sondeos de la misma foto cuestan una serialización.
+- Las escrituras (solicitudes, altas, bajas) van a `ejecutar`, que las corre en
+  un hilo.
+- Con `ruta_traza`, las solicitudes que llegan se graban en una traza que
+  `generador_carga.py` puede reproducir.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .motor import MotorSimulacion, GeneradorClientes, VELOCIDAD_NORMAL, VELOCIDAD_SIMULACION
+from .serializador import a_json_troceado, flota_columnar, flota_binaria, clientes_columnar, CAMPO_TAXI, CAMPO_CLIENTE
+from .contabilidad import FRANJAS_SERIE
+from .taxi import Taxi
+from .cliente import Cliente
+from .bitacora import log
+from .carga import GrabadorTraza
+from . import persistencia
+
+PAUSA_TICK = 0.05  # Segundos entre ticks
+MAX_DELTAS = 400  # Cambios de los últimos ticks (~20 s); un cliente más atrasado recibe la foto completa
+
+
+TAM_CUBO = 256  # Entidades por cubo de una Tabla
+
+
+class Tabla:
+    """id -> fila (tupla de `a_fila`) repartido en cubos de ids consecutivos. No cambia nunca.
+
+    Cada cubo es una lista de TAM_CUBO huecos (None si falta el id): una entidad
+    cuesta su tupla y un puntero. `con_cambios` devuelve otra tabla que comparte con
+    esta los cubos no tocados: publicar un tick cuesta lo que cambió en él, no lo
+    que ocupa la población.
+    """
+    __slots__ = ("cubos", "n")
+
+    def __init__(self, cubos=None, n=0):
+        self.cubos = cubos if cubos is not None else {}  # id // TAM_CUBO -> [fila o None] * TAM_CUBO
+        self.n = n
+
+    @classmethod
+    def desde(cls, filas):
+        """Tabla con los pares (id, fila) de `filas` (ids sin repetir)."""
+        cubos = {}
+        n = 0
+        for i, fila in filas:
+            cubo = cubos.get(i // TAM_CUBO)
+            if cubo is None: cubo = cubos[i // TAM_CUBO] = [None] * TAM_CUBO
+            cubo[i % TAM_CUBO] = fila
+            n += 1
+        return cls(cubos, n)
+
+    def con_cambios(self, nuevas, quitadas=()):
+        """Otra tabla con `nuevas` ({id: fila}) puestas y los ids de `quitadas` fuera (esta misma si no hay nada)."""
+        if not nuevas and not quitadas: return self
+        cubos = dict(self.cubos)
+        copiados = set()
+        n = self.n
+
+        def cubo_de(i):
+            clave = i // TAM_CUBO
+            if clave not in copiados:
+                cubo = cubos.get(clave)
+                cubos[clave] = list(cubo) if cubo is not None else [None] * TAM_CUBO
+                copiados.add(clave)
+            return cubos[clave]
+
+        for i in quitadas:
+            cubo = cubo_de(i)
+            if cubo[i % TAM_CUBO] is not None:
+                cubo[i % TAM_CUBO] = None
+                n -= 1
+        for i, fila in nuevas.items():
+            cubo = cubo_de(i)
+            if cubo[i % TAM_CUBO] is None: n += 1
+            cubo[i % TAM_CUBO] = fila
+        return Tabla(cubos, n)
+
+    def get(self, i):
+        cubo = self.cubos.get(i // TAM_CUBO)
+        return cubo[i % TAM_CUBO] if cubo is not None else None
+
+    def __len__(self):
+        return self.n
+
+    def values(self):
+        for cubo in self.cubos.values():
+            for fila in cubo:
+                if fila is not None: yield fila
+
+
+class Foto:
+    """Estado publicado tras un tick. No cambia; `cache` solo guarda serializaciones de ella."""
+    __slots__ = ("version", "taxis", "clientes", "agregados", "flota", "deltas",
+                 "despacho", "podio_taxis", "podio_clientes", "serie", "cache")
+
+    def __init__(self, version, taxis, clientes, agregados, flota, deltas, despacho, podio_taxis, podio_clientes, serie):
+        self.version = version
+        self.taxis = taxis  # Tabla id -> Taxi.a_fila()
+        self.clientes = clientes  # Tabla id -> Cliente.a_fila()
+        self.agregados = agregados
+        self.flota = flota  # flota.CopiaFlota: posiciones y quién va en ruta
+        self.deltas = deltas  # ((desde, hasta, ids_taxis, ids_clientes, bajas), ...) hasta esta foto
+        self.despacho = despacho  # sistema.resumen_despacho()
+        self.podio_taxis = podio_taxis  # ((taxi_id, ganancias), ...) de contabilidad.Podio
+        self.podio_clientes = podio_clientes  # ((cliente_id, viajes), ...)
+        self.serie = serie  # (ancho, ((inicio, viajes, facturado, comision), ...))
+        self.cache = {}  # clave -> Future con la serialización
+
+
+class ServicioUnieTaxi:
+    def __init__(self, sistema, coordinador=None, directorio_datos=None, intervalo_instantanea=60.0, ruta_traza=None):
+        self.sistema = sistema
+        self.motor = MotorSimulacion(sistema)
+        self.generador = GeneradorClientes(sistema)
+        self.coordinador = coordinador  # CoordinadorRegiones sin iniciar, o None
+        self.directorio_datos = directorio_datos  # Diario e instantáneas; None = solo en memoria
+        self.intervalo_instantanea = intervalo_instantanea
+        self.ruta_traza = ruta_traza
+        self.grabador = None  # GrabadorTraza mientras el servicio está en marcha
+
+        self.simulacion_activa = False
+        self.intervalo_generacion = 3.0
+
+        self.foto = None
+        self._deltas = deque(maxlen=MAX_DELTAS)  # Solo lo toca el hilo del motor
+        self._ejecutor = None
+        self._tareas = []
+
+    # --- CICLO DE VIDA ---
+    async def iniciar(self):
+        bucle = asyncio.get_running_loop()
+        self._ejecutor = ThreadPoolExecutor(1, thread_name_prefix="unietaxi-motor")
+        if self.directorio_datos:
+            # Antes de las tareas: se restaura el estado y el diario sigue por donde iba
+            await bucle.run_in_executor(self._ejecutor, self._restaurar)
+        if self.coordinador is not None: await bucle.run_in_executor(None, self.coordinador.iniciar)
+        await bucle.run_in_executor(self._ejecutor, self._publicar)
+        if self.ruta_traza: self.grabador = GrabadorTraza(self.ruta_traza)
+
+        self._tareas = [asyncio.create_task(self._bucle_motor()), asyncio.create_task(self._bucle_generador())]
+        if self.directorio_datos: self._tareas.append(asyncio.create_task(self._bucle_instantaneas()))
+
+    async def detener(self):
+        for tarea in self._tareas: tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+        # El tick que estuviera en curso termina antes de cerrar el diario
+        await asyncio.to_thread(self._ejecutor.shutdown)
+        if self.sistema.diario is not None:
+            self.sistema.diario.cerrar()
+            self.sistema.diario = None
+        if self.coordinador is not None: await asyncio.to_thread(self.coordinador.detener)
+        if self.grabador is not None:
+            self.grabador.cerrar()
+            log.info("[CARGA] Traza grabada: %s solicitudes en %s.", self.grabador.grabadas, self.ruta_traza)
+            self.grabador = None
+
+    def _restaurar(self):
+        sistema = self.sistema
+        sistema.diario = persistencia.DiarioEventos(self.directorio_datos, persistencia.restaurar(sistema, self.directorio_datos))
+        log.info("[PERSISTENCIA] Restaurados %s taxis, %s clientes, %s viajes.",
+                 len(sistema.taxis), len(sistema.clientes), sistema.viajes_totales)
+
+    # --- TAREAS ---
+    async def _bucle_motor(self):
+        bucle = asyncio.get_running_loop()
+        while True:
+            await bucle.run_in_executor(self._ejecutor, self._tick)
+            await asyncio.sleep(PAUSA_TICK)
+
+    def _tick(self):
+        try:
+            self.motor.paso(VELOCIDAD_SIMULACION if self.simulacion_activa else VELOCIDAD_NORMAL)
+            self._publicar()
+        except Exception:
+            log.exception("Error motor")
+
+    async def _bucle_generador(self):
+        bucle = asyncio.get_running_loop()
+        while True:
+            if not self.simulacion_activa:
+                await asyncio.sleep(0.1)
+                continue
+            try:
+                await bucle.run_in_executor(self._ejecutor, self.generador.generar)
+            except Exception:
+                log.exception("Error generador")
+            await asyncio.sleep(self.intervalo_generacion)
+
+    async def _bucle_instantaneas(self):
+        while True:
+            await asyncio.sleep(self.intervalo_instantanea)
+            try:
+                await asyncio.to_thread(persistencia.guardar_instantanea, self.sistema)
+            except Exception:
+                log.exception("Error guardando instantánea")
+
+    def grabar(self, cliente_id, ox, oy, dx, dy):
+        if self.grabador is not None: self.grabador.anotar(cliente_id, ox, oy, dx, dy)
+
+    async def ejecutar(self, funcion, *args):
+        """Corre una operación que toma locks del sistema en un hilo, sin parar el bucle."""
+        return await asyncio.get_running_loop().run_in_executor(None, funcion, *args)
+
+    # --- PUBLICACIÓN (hilo del motor) ---
+    def _publicar(self):
+        """Publica la foto del tick: solo se recopian las entidades que cambiaron desde la anterior."""
+        sistema = self.sistema
+        anterior = self.foto
+        version, ids_taxis, ids_clientes, bajas = sistema.recoger_cambios(anterior.version if anterior else 0)
+        if anterior is not None and version == anterior.version: return
+
+        if ids_taxis is None:
+            taxis = Tabla.desde((t.id, t.a_fila()) for t in list(sistema.taxis.values()))
+            clientes = Tabla.desde((c.id, c.a_fila()) for c in list(sistema.clientes.values()))
+            self._deltas.clear()
+        else:
+            # Solo se recopia lo cambiado; lo demás (y la tabla entera si no hubo cambios) se comparte
+            taxis = anterior.taxis.con_cambios(self._filas(sistema.taxis, ids_taxis), bajas)
+            clientes = anterior.clientes.con_cambios(self._filas(sistema.clientes, ids_clientes))
+            self._deltas.append((anterior.version, version, frozenset(ids_taxis), frozenset(ids_clientes), frozenset(bajas)))
+        serie = (sistema.serie_ingresos.ancho, sistema.serie_ingresos.ultimas(FRANJAS_SERIE))
+        self.foto = Foto(version, taxis, clientes, sistema.agregados(), sistema.flota.copia(), tuple(self._deltas),
+                         sistema.resumen_despacho(), sistema.podio_taxis.foto, sistema.podio_clientes.foto, serie)
+
+    def _filas(self, entidades, ids):
+        filas = {}
+        for i in ids:
+            entidad = entidades.get(i)
+            if entidad is not None: filas[i] = entidad.a_fila()
+        return filas
+
+    # --- LECTURA (desde el bucle, solo la foto publicada) ---
+    def _configuracion(self):
+        return {"simulacion_activa": self.simulacion_activa, "intervalo_generacion": self.intervalo_generacion}
+
+    async def _en_cache(self, foto, clave, construir):
+        """Serialización de `foto` bajo `clave`, construida una sola vez en el threadpool.
+
+        Los que la piden mientras se construye esperan al mismo Future; `shield` evita
+        que un cliente que se desconecta la cancele para los demás.
+        """
+        futuro = foto.cache.get(clave)
+        if futuro is None:
+            futuro = asyncio.get_running_loop().run_in_executor(None, construir)
+            foto.cache[clave] = futuro
+        return await asyncio.shield(futuro)
+
+    def _colocados(self, foto, filas):
+        """Dicts de los taxis con la posición de la copia de la flota (la de la fila es de cuando se apuntó)."""
+        x, y = foto.flota.posiciones()
+        fila_de = foto.flota.filas()
+        colocados = []
+        for fila in filas:
+            taxi = dict(zip(Taxi.CAMPOS, fila))
+            i = fila_de.get(taxi["id"])
+            if i is not None: taxi["x"], taxi["y"] = float(x[i]), float(y[i])
+            colocados.append(taxi)
+        return colocados
+
+    def _clientes(self, filas):
+        return [dict(zip(Cliente.CAMPOS, fila)) for fila in filas]
+
+    def _completo(self, foto):
+        return {"version": foto.version, "taxis": self._colocados(foto, foto.taxis.values()),
+                "clientes": self._clientes(foto.clientes.values()), **foto.agregados}
+
+    async def estado(self):
+        foto = self.foto
+        configuracion = self._configuracion()
+        return await self._en_cache(foto, ("estado", *configuracion.values()),
+                                    lambda: a_json_troceado({**self._completo(foto), **configuracion}))
+
+    async def cambios(self, desde):
+        """Lo cambiado después de la versión `desde` (una foto anterior), juntando los cambios de cada tick."""
+        foto = self.foto
+        configuracion = self._configuracion()
+        return await self._en_cache(foto, ("cambios", desde, *configuracion.values()),
+                                    lambda: a_json_troceado({**self._cambios(foto, desde), **configuracion}))
+
+    def _cambios(self, foto, desde):
+        ids_taxis, ids_clientes, bajas = set(), set(), set()
+        encontrado = desde == foto.version
+        for inicio, _, taxis, clientes, eliminados in reversed(foto.deltas):
+            if encontrado or inicio < desde: break
+            ids_taxis |= taxis
+            ids_clientes |= clientes
+            bajas |= eliminados
+            encontrado = inicio == desde
+        if not encontrado:
+            return {**self._completo(foto), "completo": True, "taxis_eliminados": []}
+        # Los que van en ruta se han movido aunque no aparezcan en los cambios
+        if desde != foto.version: ids_taxis.update(foto.flota.ids_en_ruta().tolist())
+        taxis = [fila for fila in map(foto.taxis.get, ids_taxis - bajas) if fila is not None]
+        return {
+            "version": foto.version,
+            "completo": False,
+            "taxis": self._colocados(foto, taxis),
+            "clientes": self._clientes(fila for fila in map(foto.clientes.get, ids_clientes) if fila is not None),
+            "taxis_eliminados": sorted(bajas),
+            **foto.agregados,
+        }
+
+    async def flota(self, formato):
+        foto = self.foto
+        if formato == "binario": return await self._en_cache(foto, "flota_binaria", lambda: flota_binaria(foto.flota, foto.taxis))
+        return await self._en_cache(foto, "flota", lambda: a_json_troceado(flota_columnar(foto.flota, foto.taxis)))
+
+    async def clientes(self):
+        foto = self.foto
+        return await self._en_cache(foto, "clientes", lambda: a_json_troceado(clientes_columnar(foto.clientes.values())))
+
+    # Pequeños (O(n) en lo pedido): se arman en el bucle, pero también solo con la foto
+    def despacho(self):
+        return self.foto.despacho
+
+    def clasificacion(self, n=10):
+        foto = self.foto
+        taxis = []
+        for taxi_id, ganancias in foto.podio_taxis[:n]:
+            taxi = foto.taxis.get(taxi_id)
+            if taxi is None: continue  # Dado de baja
+            taxis.append({"id": taxi_id, "modelo": taxi[CAMPO_TAXI["modelo"]], "placa": taxi[CAMPO_TAXI["placa"]],
+                          "ganancias": round(ganancias, 2), "viajes": taxi[CAMPO_TAXI["viajes"]]})
+        clientes = []
+        for cliente_id, viajes in foto.podio_clientes[:n]:
+            cliente = foto.clientes.get(cliente_id)
+            clientes.append({"id": cliente_id, "nombre": cliente[CAMPO_CLIENTE["nombre"]] if cliente else None, "viajes": viajes})
+        return {"taxis": taxis, "clientes": clientes}
+
+    def serie(self, franjas=24):
+        """Últimas `franjas` con viajes: inicio (tiempo simulado), viajes, facturado y ganancia de la empresa."""
+        ancho, todas = self.foto.serie
+        return {
+            "ancho_minutos": int(ancho.total_seconds() // 60),
+            "franjas": [
+                {"inicio": inicio.isoformat(), "viajes": viajes, "facturado": round(facturado, 2),
+                 "ganancia_empresa": round(comision, 2)}
+                for inicio, viajes, facturado, comision in (todas[-franjas:] if franjas > 0 else ())
+            ],
+        }
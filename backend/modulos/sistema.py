@@ -1,157 +1,493 @@
 import threading
+import itertools
+from collections import deque
 import math
 import random
 from datetime import datetime, timedelta
+from time import perf_counter
 from .taxi import Taxi
 from .cliente import Cliente
+from .indice_espacial import IndiceEspacial
+from .flota import FlotaVectorizada
+from .despacho import POLITICA_FIFO, POLITICA_OPTIMA, POLITICAS, FACTOR_VENTANA, emparejar_optimo, emparejar_lote, reclamar_por_red
+from .metricas import RegistroMetricas, LIMITES_COLA, LIMITES_MINUTOS
+from .contabilidad import Podio, SerieTemporal
+from .bitacora import log
+from .persistencia import ALTA_TAXI, BAJA_TAXI, ALTA_CLIENTE, ENCOLADA, ASIGNACION, LIQUIDACION, segundos
+
+# Tipos de entrada del registro de cambios
+CAMBIO_TAXI = "taxi"
+CAMBIO_CLIENTE = "cliente"
+CAMBIO_BAJA_TAXI = "baja_taxi"
+CAMBIO_AGREGADOS = "agregados"  # Solo cambian contadores/reloj, ninguna entidad
 
 class SistemaUnieTaxi:
-    def __init__(self):
-        self.taxis = []     
-        self.clientes = []  
-        self.cola_espera = []
-        
+    """Estado central de la flota.
+
+    Concurrencia (de grano fino, sin un lock global):
+    - Un taxi LIBRE pertenece al índice espacial; quien lo saca (`quitar`/`reclamar_*`)
+      pasa a ser su único dueño, así que nunca se asigna dos veces.
+    - Cada estructura compartida tiene su propio lock corto: registro de taxis,
+      clientes, cola de espera y contabilidad. Índice y flota llevan los suyos.
+    - Los ids salen de contadores atómicos.
+    - Los lectores (endpoints) no leen el sistema: leen la foto que publica
+      servicio.ServicioUnieTaxi tras cada tick.
+
+    Cada mutación incrementa `self.version` y añade los ids que tocó a los
+    conjuntos de cambios; el servicio se los lleva con `recoger_cambios` en cada
+    publicación y recopia solo lo cambiado, sin tope por muchos cambios que haya.
+
+    Con `instrumentar` se miden tick, búsqueda de taxi, locks, cola y esperas en
+    `self.metricas` (ver /metrics); sin él las observaciones no hacen nada.
+
+    Con `eventos` la flota no mueve los taxis en ruta tick a tick: cada tick solo
+    procesa las llegadas que tocan y las posiciones se interpolan al leerlas.
+
+    Con `red` (red_viaria.RedViaria) el taxi de una solicitud se elige por ETA por
+    las calles y los viajes siguen la ruta de la red en vez de la línea recta.
+    """
+
+    def __init__(self, semilla=None, reloj_simulado=False, primer_id_taxi=1, instrumentar=True, eventos=False,
+                 red=None):
+        # Toda la aleatoriedad del sistema sale de aquí: misma semilla -> misma ejecución
+        self.rng = random.Random(semilla)
+        # Reloj para los plazos de contratación: real (servidor) o el simulado (headless)
+        self.reloj = (lambda: self.tiempo_actual) if reloj_simulado else datetime.now
+        self.log = log  # El modo headless lo cambia por bitacora.SILENCIO
+        self.limite_flota = 50  # <--- SUBIDO A 50
+
+        self.taxis = {}     # id -> Taxi
+        self.clientes = {}  # id -> Cliente
+        self.cola_espera = deque()
+
         self.ganancia_empresa = 0.0
         self.viajes_totales = 0
-        self.contador_id_taxi = 0 
-        self.contador_id_cliente = 0
-        self.clientes_viajando = set() 
+        # next() es atómico: sin carreras al dar ids. primer_id_taxi permite rangos disjuntos
+        # cuando varios sistemas (regiones) comparten flota y se pasan taxis
+        self._ids_taxi = itertools.count(primer_id_taxi)
+        self._ids_cliente = itertools.count(1)
+        self.clientes_viajando = set()
+        self.indice_libres = IndiceEspacial() # Solo taxis LIBRES
+        self.flota = FlotaVectorizada(eventos=eventos) # Posiciones y destinos en arrays NumPy
+        self.red = red # Red viaria opcional (None = línea recta)
+
+        self.politica_despacho = POLITICA_FIFO
+        # Solo lo que sale de la cola cuenta para la política; lo asignado al pedir
+        # (taxi libre más cercano, sin esperar) va aparte
+        self.estadisticas_despacho = {
+            p: {"asignaciones": 0, "distancia_recogida": 0.0, "espera_minutos": 0.0} for p in POLITICAS
+        }
+        self.estadisticas_directas = {"asignaciones": 0, "distancia_recogida": 0.0, "espera_minutos": 0.0}
 
         self.ultimo_refuerzo = datetime.min
-        self.tiempo_actual = datetime(2025, 12, 12, 6, 0, 0) 
+        self.tiempo_actual = datetime(2025, 12, 12, 6, 0, 0)
+
+        # Métricas (los locks más disputados se envuelven para medir espera y retención)
+        self.metricas = RegistroMetricas(activo=instrumentar)
+        m = self.metricas
+        self.hist_tick = m.histograma("tick_segundos", "Duración de un tick completo del motor")
+        self.hist_busqueda = m.histograma("busqueda_taxi_segundos", "Buscar y reclamar el taxi libre más cercano")
+        self.hist_cola = m.histograma("cola_espera_longitud", "Longitud de la cola, muestreada en cada tick", LIMITES_COLA)
+        self.hist_espera = m.histograma("espera_recogida_minutos", "Minutos simulados de la solicitud a la recogida", LIMITES_MINUTOS)
+        m.indicador("cola_espera", "Solicitudes esperando taxi", lambda: len(self.cola_espera))
+        m.indicador("taxis", "Taxis registrados", lambda: len(self.taxis))
+        m.indicador("taxis_libres", "Taxis libres en el índice", lambda: len(self.indice_libres))
+        m.indicador("viajes_totales", "Viajes terminados", lambda: self.viajes_totales)
+        m.indicador("version", "Versión del registro de cambios", lambda: self.version)
+        m.indicador("diario_perdidos", "Registros del diario que no llegarán al disco",
+                    lambda: self.diario.perdidos if self.diario is not None else 0)
+
+        self.mutex_taxis = m.lock(threading.RLock(), "taxis")  # Registro de taxis (altas/bajas) y contrataciones
+        self.mutex_clientes = threading.Lock()      # clientes + clientes_viajando
+        self.mutex_cola = threading.RLock()         # cola_espera
+        self.mutex_contabilidad = m.lock(threading.RLock(), "contabilidad")
+
+        # Registro de cambios versionado
+        self.version = 0
+        self._cambiados = (set(), set(), set())  # Ids de taxis, clientes y bajas desde la última recogida
+        self._version_recogida = 0  # Versión de la última recogida (0 = nadie ha recogido)
+        self.mutex_cambios = threading.Lock()
+        # Clasificaciones y serie de ingresos: se mantienen al cobrar cada viaje y se leen sin lock
+        self.podio_taxis = Podio(lambda: [(t.id, t.ganancias) for t in list(self.taxis.values())])
+        self.podio_clientes = Podio(lambda: [(c.id, c.viajes) for c in list(self.clientes.values())])
+        self.serie_ingresos = SerieTemporal()
+
+        # Diario de eventos (persistencia.DiarioEventos); None = solo en memoria
+        self.diario = None
+        self.max_id_taxi = 0  # Para no reutilizar ids de taxis borrados al restaurar
 
-        self.mutex_taxis = threading.RLock() 
-        self.mutex_contabilidad = threading.RLock()
+    def tick_tiempo(self, ticks=1):
+        self.tiempo_actual += timedelta(minutes=20 * ticks)
+        self._marcar(CAMBIO_AGREGADOS)
 
-    def tick_tiempo(self):
-        self.tiempo_actual += timedelta(minutes=20)
+    # --- REGISTRO DE CAMBIOS ---
+    def _marcar(self, tipo, ids=()):
+        """Apunta una mutación. Se llama DESPUÉS de aplicar el cambio."""
+        with self.mutex_cambios:
+            self.version += 1
+            if tipo == CAMBIO_TAXI: self._cambiados[0].update(ids)
+            elif tipo == CAMBIO_CLIENTE: self._cambiados[1].update(ids)
+            elif tipo == CAMBIO_BAJA_TAXI: self._cambiados[2].update(ids)
+
+    def agregados(self):
+        mejor_taxi = None
+        podio = self.podio_taxis.foto
+        mejor = self.taxis.get(podio[0][0]) if podio else None
+        if mejor is not None and mejor.ganancias > 0:
+            mejor_taxi = {"id": mejor.id, "modelo": mejor.modelo, "ganancias": round(mejor.ganancias, 2)}
+        return {
+            "cola_espera": len(self.cola_espera),
+            "empresa_ganancia": round(self.ganancia_empresa, 2),
+            "viajes": self.viajes_totales,
+            "mejor_taxi": mejor_taxi,
+            "tiempo_simulado": self.tiempo_actual.strftime("%d/%m/%Y %H:%M"),
+        }
+
+    def recoger_cambios(self, desde):
+        """(version, ids de taxis, ids de clientes, bajas) cambiados desde la recogida anterior, y los vacía.
+
+        Hay un solo consumidor (el publicador del servicio), que pasa en `desde` la
+        versión que le dio la recogida anterior. Los conjuntos son None si no coincide
+        (0, u otro consumidor se los llevó): hace falta la foto completa. Moverse no
+        cuenta como cambio: la posición de los taxis en ruta se lee de la flota
+        (FlotaVectorizada.copia).
+        """
+        with self.mutex_cambios:
+            # Se cambian los conjuntos por otros vacíos: el lock no dura lo que ocupen
+            version, recogida = self.version, self._version_recogida
+            ids_taxis, ids_clientes, bajas = self._cambiados
+            self._cambiados = (set(), set(), set())
+            self._version_recogida = version
+        if desde <= 0 or desde != recogida: return version, None, None, None
+        return version, ids_taxis - bajas, ids_clientes, bajas
 
     # --- DESPACHADOR CENTRAL ---
     def procesar_despacho_automatico(self):
         """Asigna taxis libres a clientes en espera."""
-        with self.mutex_taxis:
-            # Si no hay nadie esperando o no hay taxis, salimos rápido
-            if not self.cola_espera: return
-
-            # Buscamos LIBRES
-            taxis_libres = [t for t in self.taxis if t.estado == "LIBRE"]
-            
-            # Asignamos en bucle hasta que se acaben los taxis o la cola
-            while taxis_libres and self.cola_espera:
-                taxi = taxis_libres.pop(0)
+        # Si no hay nadie esperando, salimos rápido (sin lock)
+        if not self.cola_espera: return
+
+        with self.mutex_cola:
+            if self.politica_despacho == POLITICA_OPTIMA:
+                self._despachar_lote_optimo()
+                return
+
+            # Asignamos en bucle hasta que se acaben los taxis libres o la cola
+            while self.cola_espera:
+                taxi = self.indice_libres.reclamar_cualquiera()
+                if taxi is None: break
                 exito = self.asignar_trabajo_de_cola(taxi)
                 if exito:
-                    print(f"[DESPACHO] 🔗 Taxi {taxi.id} emparejado con cola.")
+                    self.log.debug("[DESPACHO] 🔗 Taxi %s emparejado con cola.", taxi.id)
+                else:
+                    self.indice_libres.insertar(taxi)
+
+    def _despachar_lote_optimo(self):
+        """Empareja todos los LIBRES con las solicitudes más antiguas minimizando la distancia total."""
+        # Se llama con mutex_cola tomado
+        taxis_libres = list(self.indice_libres)
+        if not taxis_libres: return
+
+        ventana = min(len(self.cola_espera), FACTOR_VENTANA * len(taxis_libres))
+        lote = [self.cola_espera.popleft() for _ in range(ventana)]
+
+        atendidas = set()
+        for taxi, solicitud in emparejar_optimo(taxis_libres, lote, self.indice_libres):
+            self._asignar_viaje(
+                taxi, solicitud["cliente_id"],
+                solicitud["ox"], solicitud["oy"],
+                solicitud["dx"], solicitud["dy"],
+                solicitud["t"]
+            )
+            atendidas.add(id(solicitud))
+            self.log.debug("[DESPACHO] 🎯 Taxi %s emparejado (lote óptimo).", taxi.id)
+
+        # Las que no entraron vuelven a la cabeza de la cola, en su orden
+        self.cola_espera.extendleft(reversed([s for s in lote if id(s) not in atendidas]))
+
+    def asignaciones_totales(self):
+        """Viajes asignados por cualquier vía: directos y desde la cola."""
+        return self.estadisticas_directas["asignaciones"] + sum(s["asignaciones"] for s in self.estadisticas_despacho.values())
+
+    def resumen_despacho(self):
+        """Distancia media de recogida y espera media en cola (minutos simulados) por política.
+
+        Las asignaciones directas (había taxi libre al pedir) se resumen aparte en "directo".
+        """
+        # Sin mutex_contabilidad: copiar cada dict es atómico y, como mucho, la media
+        # mezcla una asignación a medio anotar
+        def medias(datos):
+            datos = dict(datos)
+            n = datos["asignaciones"]
+            return {
+                "asignaciones": n,
+                "distancia_recogida_media": round(datos["distancia_recogida"] / n, 2) if n else None,
+                "espera_media_minutos": round(datos["espera_minutos"] / n, 2) if n else None,
+            }
+
+        resumen = {politica: medias(datos) for politica, datos in self.estadisticas_despacho.items()}
+        resultado = {"politica_activa": self.politica_despacho, "politicas": resumen,
+                     "directo": medias(self.estadisticas_directas)}
+        if self.red is not None: resultado["red"] = self.red.resumen()
+        return resultado
 
     # --- GERENTE (CON DIAGNÓSTICO) ---
     def gestionar_abastecimiento(self):
-        LIMITE_FLOTA = 50  # <--- SUBIDO A 50
-        TIEMPO_ENTRE_CONTRATACIONES = 0.5 
-        ahora_real = datetime.now() 
+        TIEMPO_ENTRE_CONTRATACIONES = 0.5
+        ahora_real = self.reloj()
 
-        with self.mutex_taxis:
-            cola_len = len(self.cola_espera)
-            
-            # Solo actuamos si hay "presión" (cola >= 5)
-            if cola_len < 5: return
+        cola_len = len(self.cola_espera)
+        # Solo actuamos si hay "presión" (cola >= 5)
+        if cola_len < 5: return
 
+        # El lock solo serializa la decisión de contratar (no bloquea despacho ni física)
+        with self.mutex_taxis:
             # 1. CHECK LÍMITE
-            if len(self.taxis) >= LIMITE_FLOTA:
-                # Opcional: Descomenta para ver si llegaste al tope
-                # print(f"[GERENCIA] ⛔ No se contrata: Límite de flota alcanzado ({len(self.taxis)}/{LIMITE_FLOTA})")
-                return 
+            if len(self.taxis) >= self.limite_flota:
+                self.log.debug("[GERENCIA] ⛔ No se contrata: Límite de flota alcanzado (%s/%s)", len(self.taxis), self.limite_flota)
+                return
 
             # 2. CHECK TIEMPO
             segundos_pasados = (ahora_real - self.ultimo_refuerzo).total_seconds()
             if segundos_pasados < TIEMPO_ENTRE_CONTRATACIONES:
-                return 
+                return
 
             # 3. CONTRATACIÓN
-            print(f"[GERENCIA] ⚡ Contratando refuerzo por cola de {cola_len} pax.")
-            self.registrar_taxi("Refuerzo-Flash", f"R-{random.randint(100,999)}")
+            self.log.info("[GERENCIA] ⚡ Contratando refuerzo por cola de %s pax.", cola_len)
+            self.registrar_taxi("Refuerzo-Flash", f"R-{self.rng.randint(100,999)}")
             self.ultimo_refuerzo = ahora_real
 
-    def registrar_taxi(self, modelo, placa):
-        self.contador_id_taxi += 1
-        nuevo_taxi = Taxi(self.contador_id_taxi, modelo, placa, float(random.uniform(0, 100)), float(random.uniform(0, 100)))
+    def registrar_taxi(self, modelo, placa, x=None, y=None):
+        nuevo_taxi = Taxi(
+            next(self._ids_taxi), modelo, placa,
+            self.rng.uniform(0, 100) if x is None else x,
+            self.rng.uniform(0, 100) if y is None else y,
+            round(self.rng.uniform(3.5, 5.0), 2)
+        )
+        return self._alta_taxi(nuevo_taxi)
+
+    def recibir_taxi(self, datos):
+        """Da de alta un taxi que viene de otro sistema (otra región), conservando id e historial."""
+        taxi = Taxi(datos["id"], datos["modelo"], datos["placa"], datos["x"], datos["y"], datos["calificacion"])
+        taxi.ganancias = datos["ganancias"]
+        taxi.viajes = datos["viajes"]
+        if taxi.ganancias > 0:
+            with self.mutex_contabilidad:
+                self.podio_taxis.actualizar(taxi.id, taxi.ganancias)
+        return self._alta_taxi(taxi)
+
+    def _alta_taxi(self, nuevo_taxi):
+        self.flota.alta(nuevo_taxi)
         with self.mutex_taxis:
-            self.taxis.append(nuevo_taxi)
-            # Intenta coger trabajo nada más nacer
-            self.asignar_trabajo_de_cola(nuevo_taxi)
+            self.taxis[nuevo_taxi.id] = nuevo_taxi
+            self.max_id_taxi = max(self.max_id_taxi, nuevo_taxi.id)
+        if self.diario is not None:
+            self.diario.anotar(ALTA_TAXI, (
+                nuevo_taxi.id, nuevo_taxi.x, nuevo_taxi.y, nuevo_taxi.calificacion, nuevo_taxi.viajes, nuevo_taxi.ganancias,
+            ), (nuevo_taxi.modelo, nuevo_taxi.placa))
+        # Intenta coger trabajo nada más nacer; si no, queda LIBRE (reclamable)
+        if not self.asignar_trabajo_de_cola(nuevo_taxi):
+            self.indice_libres.insertar(nuevo_taxi)
+        self._marcar(CAMBIO_TAXI, (nuevo_taxi.id,))
         return nuevo_taxi
 
     def registrar_cliente(self, nombre, tarjeta):
-        self.contador_id_cliente += 1
-        nuevo_cliente = Cliente(self.contador_id_cliente, nombre, tarjeta)
-        self.clientes.append(nuevo_cliente)
+        nuevo_cliente = Cliente(next(self._ids_cliente), nombre, tarjeta)
+        with self.mutex_clientes:
+            self.clientes[nuevo_cliente.id] = nuevo_cliente
+        if self.diario is not None:
+            self.diario.anotar(ALTA_CLIENTE, (nuevo_cliente.id,), (nombre, tarjeta))
+        self._marcar(CAMBIO_CLIENTE, (nuevo_cliente.id,))
         return nuevo_cliente
 
     def procesar_solicitud(self, cliente_id, ox, oy, dx, dy):
         if cliente_id <= 0: return "ID_INVALIDO"
-        if cliente_id in self.clientes_viajando: return "CLIENTE_OCUPADO" 
 
-        mejor_taxi = None
-        distancia_minima = float('inf')
+        # Comprobar y reservar al cliente es una única operación atómica
+        with self.mutex_clientes:
+            if cliente_id in self.clientes_viajando: return "CLIENTE_OCUPADO"
+            self.clientes_viajando.add(cliente_id)
 
-        with self.mutex_taxis:
-            # Prioridad: Atender cola primero si existe (para mantener orden FIFO)
-            # Pero para simplificar, buscamos libre directo.
-            for taxi in self.taxis:
-                if taxi.estado == "LIBRE":
-                    dist = math.sqrt((taxi.x - float(ox))**2 + (taxi.y - float(oy))**2)
-                    if dist < distancia_minima:
-                        distancia_minima = dist
-                        mejor_taxi = taxi
-            
-            if mejor_taxi:
-                self._asignar_viaje(mejor_taxi, cliente_id, ox, oy, dx, dy)
-                return mejor_taxi
+        # Prioridad: Atender cola primero si existe (para mantener orden FIFO)
+        # Pero para simplificar, buscamos libre directo (índice espacial).
+        inicio = perf_counter()
+        if self.red is None: mejor_taxi = self.indice_libres.reclamar_mas_cercano(ox, oy)
+        else: mejor_taxi = reclamar_por_red(self.indice_libres, self.red, ox, oy)
+        self.hist_busqueda.observar(perf_counter() - inicio)
+
+        if mejor_taxi:
+            self._asignar_viaje(mejor_taxi, cliente_id, ox, oy, dx, dy)
+            return mejor_taxi
+        else:
+            solicitud = {"cliente_id": cliente_id, "ox": ox, "oy": oy, "dx": dx, "dy": dy, "t": self.tiempo_actual}
+            with self.mutex_cola:
+                self.cola_espera.append(solicitud)
+                # Dentro del lock: el registro va antes que el de su asignación
+                if self.diario is not None:
+                    self.diario.anotar(ENCOLADA, (cliente_id, float(ox), float(oy), float(dx), float(dy), segundos(solicitud["t"])))
+            self._marcar(CAMBIO_AGREGADOS)
+            return "EN_COLA"
+
+    def procesar_solicitudes_lote(self, solicitudes):
+        """Versión en bloque de `procesar_solicitud` para ráfagas de solicitudes.
+
+        `solicitudes` es una lista de (cliente_id, ox, oy, dx, dy). Se validan todas de
+        una vez contra `clientes_viajando` (un id repetido en el lote cuenta como
+        ocupado), se emparejan en una sola pasada y las que no consiguen taxi se
+        encolan juntas. Devuelve, en el mismo orden, el taxi asignado o
+        "EN_COLA" / "CLIENTE_OCUPADO" / "ID_INVALIDO".
+        """
+        resultados = [None] * len(solicitudes)
+        validas = []
+        with self.mutex_clientes:
+            for i, (cliente_id, ox, oy, dx, dy) in enumerate(solicitudes):
+                if cliente_id <= 0: resultados[i] = "ID_INVALIDO"
+                elif cliente_id in self.clientes_viajando: resultados[i] = "CLIENTE_OCUPADO"
+                else:
+                    self.clientes_viajando.add(cliente_id)
+                    validas.append((i, {"cliente_id": cliente_id, "ox": ox, "oy": oy, "dx": dx, "dy": dy, "t": self.tiempo_actual}))
+        if not validas: return resultados
+
+        # Un solo paso por la cola: el lote entero se empareja y encola sin que se cuele el despacho
+        with self.mutex_cola:
+            lote = [solicitud for _, solicitud in validas]
+            inicio = perf_counter()
+            if self.red is None: pares = emparejar_lote(lote, self.indice_libres)
             else:
-                solicitud = {"cliente_id": cliente_id, "ox": ox, "oy": oy, "dx": dx, "dy": dy}
+                pares = []
+                for solicitud in lote:
+                    taxi = reclamar_por_red(self.indice_libres, self.red, solicitud["ox"], solicitud["oy"])
+                    if taxi is None: break
+                    pares.append((taxi, solicitud))
+            self.hist_busqueda.observar(perf_counter() - inicio)
+
+            asignado = {}
+            for taxi, solicitud in pares:
+                self._asignar_viaje(taxi, solicitud["cliente_id"], solicitud["ox"], solicitud["oy"], solicitud["dx"], solicitud["dy"])
+                asignado[id(solicitud)] = taxi
+
+            encoladas = 0
+            for i, solicitud in validas:
+                taxi = asignado.get(id(solicitud))
+                if taxi is not None:
+                    resultados[i] = taxi
+                    continue
                 self.cola_espera.append(solicitud)
-                self.clientes_viajando.add(cliente_id)
-                return "EN_COLA"
+                if self.diario is not None:
+                    self.diario.anotar(ENCOLADA, (solicitud["cliente_id"], float(solicitud["ox"]), float(solicitud["oy"]),
+                                                  float(solicitud["dx"]), float(solicitud["dy"]), segundos(solicitud["t"])))
+                resultados[i] = "EN_COLA"
+                encoladas += 1
+        if encoladas: self._marcar(CAMBIO_AGREGADOS)
+        return resultados
+
+    def _asignar_viaje(self, taxi, cliente_id, ox, oy, dx, dy, t_solicitud=None):
+        # El taxi ya ha sido reclamado por quien llama: nadie más puede tocarlo
+
+        # Estadísticas (antes de teletransportar el taxi al origen): t_solicitud solo lo
+        # traen las que salen de la cola, que son las que decide la política activa
+        with self.mutex_contabilidad:
+            if t_solicitud is None:
+                stats = self.estadisticas_directas
+                espera = 0.0
+            else:
+                stats = self.estadisticas_despacho[self.politica_despacho]
+                espera = (self.tiempo_actual - t_solicitud).total_seconds() / 60
+            stats["asignaciones"] += 1
+            stats["distancia_recogida"] += math.hypot(taxi.x - float(ox), taxi.y - float(oy))
+            stats["espera_minutos"] += espera
+        self.hist_espera.observar(espera)
 
-    def _asignar_viaje(self, taxi, cliente_id, ox, oy, dx, dy):
         taxi.estado = "OCUPADO"
         taxi.destino_actual = (float(dx), float(dy))
-        taxi.x = float(ox) 
-        taxi.y = float(oy)
-        taxi.cliente_actual = cliente_id 
-        self.clientes_viajando.add(cliente_id)
+        taxi.cliente_actual = cliente_id
+        tramos = self.red.tramos(float(ox), float(oy), float(dx), float(dy)) if self.red is not None else None
+        self.flota.fijar_ruta(taxi, float(ox), float(oy), float(dx), float(dy), tramos)
+        with self.mutex_clientes:
+            self.clientes_viajando.add(cliente_id)
+        if self.diario is not None:
+            self.diario.anotar(ASIGNACION, (taxi.id, cliente_id, float(ox), float(oy), float(dx), float(dy)))
+        self._marcar(CAMBIO_TAXI, (taxi.id,))
 
     def asignar_trabajo_de_cola(self, taxi):
-        # Esta función asume que ya estamos dentro de un lock (with self.mutex_taxis)
-        if self.cola_espera:
-            siguiente = self.cola_espera.pop(0) 
-            self._asignar_viaje(
-                taxi, siguiente["cliente_id"], 
-                siguiente["ox"], siguiente["oy"], 
-                siguiente["dx"], siguiente["dy"]
-            )
-            return True
-        return False
+        # El taxi debe pertenecer a quien llama (recién creado, reclamado o terminando viaje)
+        with self.mutex_cola:
+            if not self.cola_espera: return False
+            siguiente = self.cola_espera.popleft()
+        self._asignar_viaje(
+            taxi, siguiente["cliente_id"],
+            siguiente["ox"], siguiente["oy"],
+            siguiente["dx"], siguiente["dy"],
+            siguiente["t"]
+        )
+        return True
+
+    # --- FÍSICA VECTORIZADA ---
+    def avanzar_flota(self, velocidad):
+        """Un paso de física para todos los taxis en ruta. Devuelve los taxis que llegaron."""
+        # Sin apuntar a los movidos: quien publica lee las posiciones de la flota, y las llegadas
+        # se apuntan al liquidar el viaje
+        _, llegados = self.flota.paso(velocidad)
+        return llegados
+
+    def procesar_llegadas(self, taxis, costos):
+        """Cierra en bloque los viajes terminados y reengancha cada taxi con la cola si puede."""
+        for taxi, costo in zip(taxis, costos):
+            self.finalizar_viaje(taxi, costo)
+            # En modo óptimo el taxi se libera y entra al lote del siguiente despacho
+            if self.politica_despacho == POLITICA_OPTIMA or not self.asignar_trabajo_de_cola(taxi):
+                self.liberar_taxi(taxi)
+
+    def liberar_taxi(self, taxi):
+        """Marca el taxi como LIBRE y lo vuelve a indexar en su posición actual."""
+        taxi.estado = "LIBRE"
+        taxi.destino_actual = None
+        self.flota.detener(taxi)
+        # Meterlo en el índice es lo último: a partir de aquí otros hilos pueden reclamarlo
+        self.indice_libres.insertar(taxi)
+        self._marcar(CAMBIO_TAXI, (taxi.id,))
 
     def finalizar_viaje(self, taxi, costo):
+        cliente_id, viajes_cliente = 0, 0
         if taxi.cliente_actual:
-            cliente_obj = next((c for c in self.clientes if c.id == taxi.cliente_actual), None)
-            if cliente_obj: cliente_obj.viajes += 1 
-            if taxi.cliente_actual in self.clientes_viajando:
-                self.clientes_viajando.remove(taxi.cliente_actual)
-            taxi.cliente_actual = None
+            # Soltamos al cliente del taxi antes de que pueda volver a pedir otro
+            cliente_id, taxi.cliente_actual = taxi.cliente_actual, None
+            with self.mutex_clientes:
+                cliente_obj = self.clientes.get(cliente_id)
+                if cliente_obj:
+                    cliente_obj.viajes += 1
+                    viajes_cliente = cliente_obj.viajes
+                self.clientes_viajando.discard(cliente_id)
+            self._marcar(CAMBIO_CLIENTE, (cliente_id,))
 
         with self.mutex_contabilidad:
             comision = costo * 0.20
             pago_taxi = costo - comision
             taxi.ganancias += pago_taxi
-            taxi.viajes += 1 
+            taxi.viajes += 1
             self.ganancia_empresa += comision
             self.viajes_totales += 1
+            self.podio_taxis.actualizar(taxi.id, taxi.ganancias)
+            if viajes_cliente: self.podio_clientes.actualizar(cliente_id, viajes_cliente)
+            self.serie_ingresos.anotar(self.tiempo_actual, costo, comision)
+            # Con valores absolutos y dentro del lock: el último registro lleva los totales buenos
+            if self.diario is not None:
+                self.diario.anotar(LIQUIDACION, (
+                    taxi.id, cliente_id, taxi.x, taxi.y, taxi.viajes, viajes_cliente, taxi.ganancias,
+                    self.viajes_totales, self.ganancia_empresa, segundos(self.tiempo_actual),
+                ))
+        self._marcar(CAMBIO_TAXI, (taxi.id,))
 
     def eliminar_taxi(self, taxi_id):
         with self.mutex_taxis:
-            taxi_a_borrar = next((t for t in self.taxis if t.id == taxi_id), None)
+            taxi_a_borrar = self.taxis.get(taxi_id)
             if not taxi_a_borrar: return False, "Taxi no encontrado"
-            if taxi_a_borrar.estado == "OCUPADO": return False, "No se puede eliminar: Ocupado."
-            self.taxis.remove(taxi_a_borrar)
-            return True, "Taxi eliminado."
\ No newline at end of file
+            # Solo se puede borrar un taxi LIBRE, y para ello hay que reclamarlo del índice
+            if not self.indice_libres.quitar(taxi_a_borrar): return False, "No se puede eliminar: Ocupado."
+            del self.taxis[taxi_id]
+            self.flota.baja(taxi_a_borrar)
+            with self.mutex_contabilidad:
+                self.podio_taxis.quitar(taxi_id)
+            if self.diario is not None: self.diario.anotar(BAJA_TAXI, (taxi_id,))
+            self._marcar(CAMBIO_BAJA_TAXI, (taxi_id,))
+            return True, "Taxi eliminado."
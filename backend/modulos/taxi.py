@@ -1,47 +1,76 @@
-import math
 import random
 
 class Taxi:
-    def __init__(self, id, modelo, placa, x, y):
+    # Sin __dict__ por instancia: bastante menos memoria por taxi
+    __slots__ = (
+        "id", "modelo", "placa", "flota", "indice", "_x", "_y", "estado",
+        "calificacion", "ganancias", "viajes", "destino_actual", "cliente_actual",
+    )
+    # Campos de `a_dict`, en el orden de `a_fila` (las fotos publicadas guardan tuplas)
+    CAMPOS = ("id", "modelo", "placa", "x", "y", "estado", "calificacion", "ganancias",
+              "viajes", "destino_actual", "cliente_actual")
+
+    def __init__(self, id, modelo, placa, x, y, calificacion=None):
         self.id = id
         self.modelo = modelo
         self.placa = placa
-        self.x = float(x)
-        self.y = float(y)
+        # La posición vive en la FlotaVectorizada una vez dado de alta en el sistema
+        self.flota = None
+        self.indice = None
+        self._x = float(x)
+        self._y = float(y)
         self.estado = "LIBRE"
-        self.calificacion = round(random.uniform(3.5, 5.0), 2)
+        self.calificacion = calificacion if calificacion is not None else round(random.uniform(3.5, 5.0), 2)
         self.ganancias = 0.0
         self.viajes = 0  # <--- NUEVO CONTADOR
         self.destino_actual = None
         self.cliente_actual = None
 
-    def actualizar_posicion(self, destino_x, destino_y, velocidad):
-        # 1. Calculamos la distancia total al objetivo
-        dx = float(destino_x) - self.x
-        dy = float(destino_y) - self.y
-        distancia = math.sqrt(dx**2 + dy**2)
-        
-        # 2. Si ya estamos prácticamente encima, retornamos True
-        if distancia < 0.1:
-            self.x = destino_x
-            self.y = destino_y
-            return True
-
-        # "Si la velocidad es mayor a la distancia, 
-        # cambiamos la velocidad a la necesaria para recorrer esa distancia"
-        velocidad_turno = velocidad
-        
-        if velocidad > distancia:
-            velocidad_turno = distancia # Frenado exacto
-
-        # 3. Aplicamos el movimiento con la nueva velocidad ajustada
-        if distancia > 0:
-            ratio = velocidad_turno / distancia
-            self.x += dx * ratio
-            self.y += dy * ratio
-
-        # 4. Comprobamos si hemos terminado
-        if distancia <= velocidad:
-            return True
-            
-        return False
\ No newline at end of file
+    # Sin lock: `FlotaVectorizada.baja` guarda _x/_y y luego suelta flota e índice,
+    # así que con una sola lectura de cada uno basta para no ver un estado a medias
+    @property
+    def x(self):
+        flota, i = self.flota, self.indice
+        if flota is None or i is None: return self._x
+        return float(flota.x[i])
+
+    @x.setter
+    def x(self, valor):
+        self._mover(valor, None)
+
+    @property
+    def y(self):
+        flota, i = self.flota, self.indice
+        if flota is None or i is None: return self._y
+        return float(flota.y[i])
+
+    @y.setter
+    def y(self, valor):
+        self._mover(None, valor)
+
+    def _mover(self, x, y):
+        """Recoloca el taxi; dentro de la flota, con su mutex (el paso físico escribe las mismas columnas)."""
+        flota = self.flota
+        if flota is not None:
+            with flota.mutex:
+                if self.flota is flota:
+                    if x is not None: flota.x[self.indice] = x
+                    if y is not None: flota.y[self.indice] = y
+                    return
+        if x is not None: self._x = float(x)
+        if y is not None: self._y = float(y)
+
+    def a_dict(self):
+        """Representación JSON del taxi (las propiedades no salen en vars())."""
+        return {
+            "id": self.id, "modelo": self.modelo, "placa": self.placa,
+            "x": self.x, "y": self.y, "estado": self.estado,
+            "calificacion": self.calificacion, "ganancias": self.ganancias,
+            "viajes": self.viajes, "destino_actual": self.destino_actual,
+            "cliente_actual": self.cliente_actual,
+        }
+
+    def a_fila(self):
+        """Los valores de `a_dict` en una tupla, en el orden de CAMPOS."""
+        return (self.id, self.modelo, self.placa, self.x, self.y, self.estado, self.calificacion,
+                self.ganancias, self.viajes, self.destino_actual, self.cliente_actual)
@@ -0,0 +1,38 @@
+"""Reproducción de trazas contra el servicio en proceso."""
+import asyncio
+import threading
+import time
+
+from modulos import carga
+from modulos.bitacora import SILENCIO
+from modulos.servicio import ServicioUnieTaxi
+from modulos.sistema import SistemaUnieTaxi
+
+
+def test_destino_local_no_bloquea_el_bucle():
+    sistema = SistemaUnieTaxi(semilla=1, reloj_simulado=True, instrumentar=False)
+    sistema.log = SILENCIO
+    for i in range(10): sistema.registrar_taxi("T", f"P{i}")
+    servicio = ServicioUnieTaxi(sistema)
+
+    procesar = sistema.procesar_solicitud
+    en_vuelo = maximo = 0
+    mutex = threading.Lock()
+
+    def lenta(*solicitud):
+        # Una solicitud que tarda (locks disputados, red viaria...): con el bucle libre se solapan
+        nonlocal en_vuelo, maximo
+        with mutex:
+            en_vuelo += 1
+            maximo = max(maximo, en_vuelo)
+        time.sleep(0.05)
+        with mutex: en_vuelo -= 1
+        return procesar(*solicitud)
+
+    sistema.procesar_solicitud = lenta
+    traza = [(0.0, i, 10.0 * i, 10.0, 50.0, 50.0) for i in range(1, 9)]
+    informe = asyncio.run(carga.reproducir(traza, carga.destino_local(servicio), velocidad=0, concurrencia=4))
+    resumen = informe.resumen()
+    assert resumen["resultados"] == {"ASIGNADO": 8} and resumen["errores"] == 0
+    assert maximo == 4  # La concurrencia pedida, ni más ni menos
+    assert informe.duracion < 8 * 0.05
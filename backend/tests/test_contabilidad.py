@@ -0,0 +1,56 @@
+"""Podio frente a ordenar a todos (fuerza bruta) con secuencias aleatorias de altas, subidas y bajas."""
+import random
+
+import pytest
+
+from modulos.contabilidad import Podio
+
+
+def primeros_por_fuerza_bruta(valores, k):
+    return tuple((clave, -valor) for valor, clave in sorted((-v, c) for c, v in valores.items() if v > 0)[:k])
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 5, 10])
+@pytest.mark.parametrize("semilla", range(40))
+def test_podio_igual_que_fuerza_bruta(k, semilla):
+    rng = random.Random(semilla)
+    valores = {}
+    podio = Podio(lambda: list(valores.items()), k=k)
+    claves = range(1, 8 * k + 10)
+
+    for _ in range(600):
+        clave = rng.choice(claves)
+        if valores and rng.random() < 0.25:
+            # Baja (eliminar_taxi, migración a otra región)
+            clave = rng.choice(list(valores))
+            del valores[clave]
+            podio.quitar(clave)
+        else:
+            # Los valores solo crecen; enteros pequeños para que haya empates
+            valores[clave] = valores.get(clave, 0) + rng.choice((0.5, 1, 1, 2, 3))
+            podio.actualizar(clave, valores[clave])
+        assert podio.foto == primeros_por_fuerza_bruta(valores, k)
+
+
+def test_caso_revisado():
+    """Con huecos tras unas bajas, un recién llegado no puede colarse por delante de uno de fuera."""
+    valores = {}
+    podio = Podio(lambda: list(valores.items()), k=1)
+
+    def subir(clave, valor):
+        valores[clave] = valor
+        podio.actualizar(clave, valor)
+
+    def bajar(clave):
+        del valores[clave]
+        podio.quitar(clave)
+
+    subir(11, 20)
+    subir(21, 15)
+    subir(22, 13.5)  # Con k=1 caben 2: queda fuera
+    bajar(11)
+    subir(29, 14.5)
+    bajar(21)
+    subir(19, 8)
+    bajar(29)
+    assert podio.foto == ((22, 13.5),)
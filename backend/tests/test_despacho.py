@@ -0,0 +1,76 @@
+"""Húngaro y lote óptimo frente a probar todas las asignaciones; estadísticas por política."""
+import itertools
+import random
+
+import pytest
+
+from modulos.bitacora import SILENCIO
+from modulos.despacho import POLITICA_FIFO, POLITICA_OPTIMA, distancia_recogida, emparejar_optimo, hungaro
+from modulos.indice_espacial import IndiceEspacial
+from modulos.sistema import SistemaUnieTaxi
+from modulos.taxi import Taxi
+
+
+def coste_minimo_por_fuerza_bruta(costes):
+    """Filas <= columnas: cada fila a una columna distinta, probando todas."""
+    filas = range(len(costes))
+    return min(sum(costes[i][j] for i, j in zip(filas, columnas))
+               for columnas in itertools.permutations(range(len(costes[0])), len(costes)))
+
+
+@pytest.mark.parametrize("forma", [(1, 1), (3, 3), (5, 5), (2, 5), (4, 6), (1, 6)])
+@pytest.mark.parametrize("semilla", range(15))
+def test_hungaro_igual_que_fuerza_bruta(forma, semilla):
+    rng = random.Random(semilla)
+    n, m = forma
+    # Enteros pequeños para que haya empates
+    costes = [[rng.choice((rng.randint(0, 9), rng.uniform(0, 100))) for _ in range(m)] for _ in range(n)]
+    asignacion = hungaro(costes)
+    assert len(set(asignacion)) == n and all(0 <= j < m for j in asignacion)
+    assert sum(costes[i][j] for i, j in enumerate(asignacion)) == pytest.approx(coste_minimo_por_fuerza_bruta(costes))
+
+
+@pytest.mark.parametrize("taxis, solicitudes", [(3, 3), (2, 6), (6, 2), (4, 5), (5, 4)])
+@pytest.mark.parametrize("semilla", range(15))
+def test_lote_optimo_igual_que_fuerza_bruta(taxis, solicitudes, semilla):
+    # Las dos orientaciones: más solicitudes que taxis y al revés (húngaro sobre la traspuesta)
+    rng = random.Random(semilla)
+    indice = IndiceEspacial()
+    libres = [Taxi(i, "T", f"P{i}", rng.uniform(0, 100), rng.uniform(0, 100)) for i in range(taxis)]
+    for taxi in libres: indice.insertar(taxi)
+    lote = [{"cliente_id": i, "ox": rng.uniform(0, 100), "oy": rng.uniform(0, 100)} for i in range(solicitudes)]
+
+    pares = emparejar_optimo(libres, lote, indice)
+    assert len(pares) == min(taxis, solicitudes)
+    assert len({id(t) for t, _ in pares}) == len({id(s) for _, s in pares}) == len(pares)
+    assert len(indice) == taxis - len(pares)  # Los emparejados quedan reclamados
+
+    costes = [[distancia_recogida(t, s) for s in lote] for t in libres]
+    if taxis > solicitudes: costes = [list(columna) for columna in zip(*costes)]
+    total = sum(distancia_recogida(t, s) for t, s in pares)
+    assert total == pytest.approx(coste_minimo_por_fuerza_bruta(costes))
+
+
+@pytest.mark.parametrize("politica", [POLITICA_FIFO, POLITICA_OPTIMA])
+def test_asignaciones_directas_no_cuentan_para_la_politica(politica):
+    sistema = SistemaUnieTaxi(semilla=1, reloj_simulado=True, instrumentar=False)
+    sistema.log = SILENCIO
+    sistema.limite_flota = 2
+    sistema.politica_despacho = politica
+    for i in range(2): sistema.registrar_taxi("T", f"P{i}")
+    solicitudes = [(i, 10 * i, 10, 50, 50) for i in range(1, 5)]
+    sistema.procesar_solicitud(*solicitudes[0])
+    sistema.procesar_solicitudes_lote(solicitudes[1:])
+
+    resumen = sistema.resumen_despacho()
+    assert resumen["directo"]["asignaciones"] == 2 and resumen["directo"]["espera_media_minutos"] == 0
+    assert all(datos["asignaciones"] == 0 for datos in resumen["politicas"].values())
+
+    # Lo que espera en cola sí es de la política activa, con su espera
+    sistema.tick_tiempo()
+    for taxi in list(sistema.taxis.values()): sistema.liberar_taxi(taxi)
+    sistema.procesar_despacho_automatico()
+    resumen = sistema.resumen_despacho()
+    assert resumen["politicas"][politica]["asignaciones"] == 2
+    assert resumen["politicas"][politica]["espera_media_minutos"] > 0
+    assert sistema.asignaciones_totales() == 4
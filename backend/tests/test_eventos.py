@@ -0,0 +1,47 @@
+"""Flota por eventos frente a flota por ticks: mismos resultados y mismas posiciones."""
+import numpy as np
+import pytest
+
+from modulos.bitacora import SILENCIO
+from modulos.despacho import POLITICA_FIFO, POLITICA_OPTIMA
+from modulos.motor import MotorSimulacion, GeneradorClientes, VELOCIDAD_SIMULACION, simular
+from modulos.red_viaria import RedViaria
+from modulos.sistema import SistemaUnieTaxi
+
+DE_RELOJ = ("segundos", "ticks_por_segundo", "despachadas_por_segundo")
+
+
+@pytest.mark.parametrize("politica", [POLITICA_FIFO, POLITICA_OPTIMA])
+@pytest.mark.parametrize("red", [False, True], ids=["recta", "red"])
+def test_eventos_igual_que_ticks(politica, red):
+    # Pocos taxis y 3 solicitudes por tick: hay cola, refuerzos y la política decide
+    resultados = []
+    for eventos in (False, True):
+        resultado = simular(taxis=10, ticks=300, solicitudes_por_tick=3, semilla=4, politica=politica,
+                            eventos=eventos, red=RedViaria.cuadricula() if red else None)
+        for clave in DE_RELOJ: del resultado[clave]
+        resultados.append(resultado)
+    por_ticks, por_eventos = resultados
+    assert por_ticks["viajes"] > 0 and por_ticks["taxis"] > 10
+    assert por_eventos == por_ticks
+
+
+@pytest.mark.parametrize("red", [False, True], ids=["recta", "red"])
+def test_copia_interpola_igual_que_materializar(red):
+    sistema = SistemaUnieTaxi(semilla=2, reloj_simulado=True, instrumentar=False, eventos=True,
+                              red=RedViaria.cuadricula() if red else None)
+    sistema.log = SILENCIO
+    for i in range(30): sistema.registrar_taxi("T", f"P{i}")
+    motor, generador = MotorSimulacion(sistema), GeneradorClientes(sistema)
+    flota = sistema.flota
+    for tick in range(60):
+        for _ in range(2): generador.generar()
+        motor.paso(VELOCIDAD_SIMULACION)
+        if tick % 6: continue
+
+        copia = flota.copia()
+        x, y = copia.posiciones()
+        assert copia.activo.any()
+        flota.materializar()
+        assert np.array_equal(copia.ids, flota.ids[:flota.n])
+        assert np.array_equal(x, flota.x[:flota.n]) and np.array_equal(y, flota.y[:flota.n])
@@ -0,0 +1,48 @@
+"""Índice espacial frente a recorrer todos los taxis (fuerza bruta), con y sin búsqueda por anillos."""
+import math
+import random
+
+import pytest
+
+from modulos.indice_espacial import IndiceEspacial
+from modulos.taxi import Taxi
+
+ESQUINAS = [(0, 0), (100, 0), (0, 100), (100, 100)]
+FUERA = [(-30, 50), (50, 130), (150, -20), (-0.001, 100.001), (250, 250), (-1e3, -1e3)]
+
+
+def consultas(rng):
+    return ESQUINAS + FUERA + [(rng.uniform(0, 100), rng.uniform(0, 100)) for _ in range(20)]
+
+
+# Por debajo, en y por encima de umbral_lineal (64 con la resolución por defecto)
+@pytest.mark.parametrize("taxis", [1, 7, 64, 65, 300, 2000])
+@pytest.mark.parametrize("semilla", range(5))
+def test_igual_que_fuerza_bruta(taxis, semilla):
+    rng = random.Random(semilla)
+    indice = IndiceEspacial()
+    flota = [Taxi(i, "T", f"P{i}", rng.uniform(0, 100), rng.uniform(0, 100)) for i in range(taxis + taxis // 4)]
+    # Algunos en los bordes: caen en la última celda
+    for taxi in flota[:3]: taxi.x, taxi.y = rng.choice(ESQUINAS)
+    for taxi in flota: indice.insertar(taxi)
+    # Los que sobran se reclaman: no deben aparecer
+    for taxi in flota[taxis:]: assert indice.quitar(taxi)
+    libres = flota[:taxis]
+    assert len(indice) == taxis
+
+    for x, y in consultas(rng):
+        distancias = sorted(math.hypot(t.x - x, t.y - y) for t in libres)
+        cercano = indice.mas_cercano(x, y)
+        assert cercano in libres
+        assert math.hypot(cercano.x - x, cercano.y - y) == pytest.approx(distancias[0])
+
+        for k in (1, 3, 10, taxis + 5):
+            pares = indice.k_mas_cercanos(x, y, k)
+            assert [d for d, _ in pares] == pytest.approx(distancias[:k])
+            assert all(t in libres and d == pytest.approx(math.hypot(t.x - x, t.y - y)) for d, t in pares)
+            assert len({t.id for _, t in pares}) == len(pares)
+
+
+def test_vacio():
+    indice = IndiceEspacial()
+    assert indice.mas_cercano(50, 50) is None and indice.k_mas_cercanos(-10, 200, 3) == []
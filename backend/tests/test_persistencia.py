@@ -0,0 +1,164 @@
+"""Diario de eventos e instantáneas: escritor, restauración y cola rota."""
+import os
+
+import pytest
+
+from modulos import persistencia
+from modulos.bitacora import SILENCIO
+from modulos.motor import MotorSimulacion, GeneradorClientes, VELOCIDAD_SIMULACION
+from modulos.persistencia import DiarioEventos
+from modulos.sistema import SistemaUnieTaxi
+
+
+def nuevo_sistema():
+    sistema = SistemaUnieTaxi(semilla=1, reloj_simulado=True, instrumentar=False)
+    sistema.log = SILENCIO
+    return sistema
+
+
+def test_textos_largos(tmp_path):
+    sistema = nuevo_sistema()
+    sistema.diario = DiarioEventos(tmp_path, sincronizar=False)
+    modelo = "M" * 70_000 + "ñ"
+    taxi = sistema.registrar_taxi(modelo, "P" * 66_000)
+    sistema.diario.cerrar()
+    assert sistema.diario.error is None and sistema.diario.perdidos == 0
+
+    restaurado = nuevo_sistema()
+    persistencia.restaurar(restaurado, tmp_path)
+    assert restaurado.taxis[taxi.id].modelo == modelo
+    assert restaurado.taxis[taxi.id].placa == "P" * 66_000
+
+
+def test_escritor_caido_no_deja_a_nadie_esperando(tmp_path, monkeypatch):
+    diario = DiarioEventos(tmp_path)
+    diario.anotar(persistencia.BAJA_TAXI, (1,))
+    diario.rotar()
+    assert diario.escritos == 1
+
+    def fsync_roto(_):
+        raise OSError(28, "No queda espacio en el dispositivo")
+
+    monkeypatch.setattr(persistencia.os, "fsync", fsync_roto)
+    diario.anotar(persistencia.BAJA_TAXI, (2,))
+    with pytest.raises(OSError):
+        diario.rotar()
+    assert isinstance(diario.error, OSError)
+
+    # Lo que llega después se cuenta como perdido en vez de encolarse sin más
+    diario.anotar(persistencia.BAJA_TAXI, (3,))
+    assert diario.perdidos >= 1
+    with pytest.raises(OSError):
+        diario.rotar()
+    diario.cerrar()
+    assert diario._archivo.closed
+
+
+def test_registro_no_codificable_se_pierde_solo(tmp_path):
+    diario = DiarioEventos(tmp_path, sincronizar=False)
+    diario.anotar(persistencia.BAJA_TAXI, ("no es un id",))
+    diario.anotar(persistencia.BAJA_TAXI, (2,))
+    assert diario.rotar() == 1
+    diario.cerrar()
+    assert diario.error is None
+    assert (diario.escritos, diario.perdidos) == (1, 1)
+
+
+# --- RESTAURAR = ESTADO EN VIVO ---
+def foto_comparable(sistema):
+    """Lo que debe sobrevivir a un reinicio. Los taxis en viaje se reanudan desde la
+    recogida o la instantánea, así que de ellos solo cuenta a dónde van y con quién."""
+    taxis = {}
+    for taxi in sistema.taxis.values():
+        fila = (taxi.modelo, taxi.placa, taxi.calificacion, taxi.ganancias, taxi.viajes,
+                taxi.estado, taxi.cliente_actual, taxi.destino_actual)
+        if taxi.estado == "LIBRE": fila += (taxi.x, taxi.y)
+        taxis[taxi.id] = fila
+    return {
+        "taxis": taxis,
+        "clientes": {c.id: (c.nombre, c.tarjeta_credito, c.viajes) for c in sistema.clientes.values()},
+        "cola": [(s["cliente_id"], s["ox"], s["oy"], s["dx"], s["dy"], s["t"]) for s in sistema.cola_espera],
+        "viajando": set(sistema.clientes_viajando),
+        "totales": (sistema.viajes_totales, sistema.ganancia_empresa),
+        "podios": (sistema.podio_taxis.foto, sistema.podio_clientes.foto),
+    }
+
+
+def simular_ticks(sistema, ticks, solicitudes_por_tick):
+    motor, generador = MotorSimulacion(sistema), GeneradorClientes(sistema)
+    for _ in range(ticks):
+        for _ in range(solicitudes_por_tick): generador.generar()
+        motor.paso(VELOCIDAD_SIMULACION)
+
+
+@pytest.mark.parametrize("semilla", range(4))
+def test_restaurar_igual_que_en_vivo(tmp_path, semilla):
+    sistema = nuevo_sistema()
+    sistema.rng.seed(semilla)
+    sistema.limite_flota = 15  # Sin refuerzos: se forma cola
+    sistema.diario = DiarioEventos(tmp_path, sincronizar=False)
+    for i in range(15): sistema.registrar_taxi("T", f"P{i}")
+    simular_ticks(sistema, 100, 3)
+    assert sistema.cola_espera
+    persistencia.guardar_instantanea(sistema)  # A media carrera: con cola y taxis en viaje
+    simular_ticks(sistema, 150, 0)  # Se vacía la cola
+    exito, _ = sistema.eliminar_taxi(next(iter(sistema.taxis)))
+    assert exito
+    sistema.registrar_taxi("T", "Tras la instantánea")
+    simular_ticks(sistema, 20, 5)
+    sistema.diario.cerrar()
+
+    vivo = foto_comparable(sistema)
+    assert vivo["cola"] and any(t[5] == "OCUPADO" for t in vivo["taxis"].values())  # Hay de todo que restaurar
+    restaurado = nuevo_sistema()
+    persistencia.restaurar(restaurado, tmp_path)
+    assert foto_comparable(restaurado) == vivo
+
+
+def test_cola_rota_se_corta_y_el_diario_sigue(tmp_path):
+    sistema = nuevo_sistema()
+    sistema.diario = DiarioEventos(tmp_path, sincronizar=False)
+    for i in range(3): sistema.registrar_taxi("T", f"P{i}")
+    sistema.diario.cerrar()
+    (inicio, ruta), = persistencia._segmentos(tmp_path)
+    largo = os.path.getsize(ruta)
+    with open(ruta, "rb") as f: registro = f.read(30)
+    with open(ruta, "ab") as f: f.write(registro)  # Caída a mitad de un registro
+
+    restaurado = nuevo_sistema()
+    secuencia = persistencia.restaurar(restaurado, tmp_path)
+    assert secuencia == 3 and len(restaurado.taxis) == 3
+    assert os.path.getsize(ruta) == largo
+
+    # Lo que se añade tras el corte se lee al siguiente arranque
+    restaurado.diario = DiarioEventos(tmp_path, secuencia, sincronizar=False)
+    taxi = restaurado.registrar_taxi("T", "Nuevo")
+    restaurado.diario.cerrar()
+    otra_vez = nuevo_sistema()
+    assert persistencia.restaurar(otra_vez, tmp_path) == 4
+    assert otra_vez.taxis[taxi.id].placa == "Nuevo"
+
+
+def test_reinicio_sigue_la_numeracion(tmp_path):
+    sistema = nuevo_sistema()
+    sistema.diario = DiarioEventos(tmp_path, sincronizar=False)
+    for i in range(5): sistema.registrar_taxi("T", f"P{i}")
+    assert persistencia.guardar_instantanea(sistema) == 5
+    sistema.registrar_cliente("C", "VISA")
+    sistema.diario.cerrar()
+
+    segundo = nuevo_sistema()
+    secuencia = persistencia.restaurar(segundo, tmp_path)
+    assert secuencia == 6
+    segundo.diario = DiarioEventos(tmp_path, secuencia, sincronizar=False)
+    taxi = segundo.registrar_taxi("T", "Tras reinicio")
+    cliente = segundo.registrar_cliente("C2", "VISA")
+    assert segundo.diario.rotar() == 8
+    assert [inicio for inicio, _ in persistencia._segmentos(tmp_path)] == [5, 6, 8]
+    segundo.diario.cerrar()
+    # Los ids siguen también: nada pisa lo de antes del reinicio
+    assert taxi.id == 6 and cliente.id == 2
+
+    tercero = nuevo_sistema()
+    assert persistencia.restaurar(tercero, tmp_path) == 8
+    assert foto_comparable(tercero) == foto_comparable(segundo)
@@ -0,0 +1,34 @@
+"""A* con heurística ALT perezosa frente a Dijkstra y a la cota vectorizada."""
+import random
+
+import numpy as np
+import pytest
+
+from modulos.red_viaria import RedViaria
+
+
+@pytest.mark.parametrize("semilla", range(6))
+def test_a_estrella_igual_que_dijkstra(semilla):
+    # Grafo dirigido al azar: con nodos a los que no se llega y landmarks que no ven a todos
+    rng = random.Random(semilla)
+    n = 60
+    aristas = [(rng.randrange(n), rng.randrange(n), rng.uniform(1, 5)) for _ in range(2 * n)]
+    red = RedViaria([(rng.uniform(0, 100), rng.uniform(0, 100)) for _ in range(n)], aristas, n_landmarks=4)
+    assert not np.isfinite(red.d_desde).all()
+
+    for origen in range(n):
+        distancias = red._dijkstra(origen, red.salientes)
+        for destino in range(n):
+            coste, camino = red._a_estrella(origen, destino)
+            assert coste == pytest.approx(distancias[destino])
+            if camino:
+                assert camino[0] == origen and camino[-1] == destino
+                pesos = [min(p for v, p in red.salientes[a] if v == b) for a, b in zip(camino, camino[1:])]
+                assert sum(pesos) == pytest.approx(coste)
+
+
+def test_cota_perezosa_igual_que_vectorizada():
+    red = RedViaria.cuadricula(15, congestion=2.0, semilla=4)
+    for destino in range(0, red.n, 11):
+        cotas = red.cota_eta(np.arange(red.n), destino).tolist()
+        assert [red._cota_alt(red._alt[destino], red._alt[nodo]) for nodo in range(red.n)] == cotas
@@ -0,0 +1,47 @@
+"""Coordinador de regiones con procesos de verdad (2 regiones pequeñas)."""
+import time
+
+import pytest
+
+from modulos.regiones import CoordinadorRegiones
+
+
+@pytest.fixture
+def coordinador():
+    coordinador = CoordinadorRegiones(2, taxis=20, semilla=1, solicitudes_por_tick=1, pausa=0.01, carga_activa=False).iniciar()
+    try:
+        # Hasta que todas han publicado, las que no cuentan como sin taxis libres
+        limite = time.monotonic() + 10
+        while any(region["ticks"] == 0 for region in coordinador.estado()["regiones"]):
+            assert time.monotonic() < limite
+            time.sleep(0.01)
+        yield coordinador
+    finally:
+        coordinador.detener()
+
+
+def test_solicitud_cancelada_no_tumba_el_enrutador(coordinador):
+    # Quien pidió se rinde antes de que la región conteste (timeout o cliente desconectado)
+    _, abandonada = coordinador.solicitar(1, 10, 10, 90, 90)
+    abandonada.cancel()
+    assert not coordinador._pendientes
+
+    # La respuesta tardía se descarta y las siguientes siguen llegando
+    for cliente_id in (2, 3):
+        region, futuro = coordinador.solicitar(cliente_id, 80, 50, 20, 50)
+        resultado, taxi_id = futuro.result(timeout=10)
+        assert region == 1
+        assert resultado == "ASIGNADO" and taxi_id is not None
+    assert coordinador._enrutador.is_alive()
+    assert not coordinador._pendientes
+
+
+def test_activar_carga(coordinador):
+    # Sin carga activa las regiones solo atienden lo que se les pide
+    time.sleep(0.3)
+    assert coordinador.estado()["totales"]["despachadas"] == 0
+    coordinador.activar_carga(True)
+    limite = time.monotonic() + 10
+    while coordinador.estado()["totales"]["despachadas"] == 0:
+        assert time.monotonic() < limite
+        time.sleep(0.05)
@@ -0,0 +1,102 @@
+"""Fotos publicadas por el servicio y su feed de cambios."""
+import asyncio
+import json
+import random
+
+import pytest
+
+from modulos.bitacora import SILENCIO
+from modulos.motor import VELOCIDAD_SIMULACION
+from modulos.red_viaria import RedViaria
+from modulos.servicio import ServicioUnieTaxi, MAX_DELTAS
+from modulos.sistema import SistemaUnieTaxi
+
+
+def nuevo_servicio(**opciones):
+    sistema = SistemaUnieTaxi(semilla=1, reloj_simulado=True, instrumentar=False, **opciones)
+    sistema.log = SILENCIO
+    return ServicioUnieTaxi(sistema)
+
+
+def test_muchos_cambios_en_un_tick_siguen_siendo_incrementales():
+    servicio = nuevo_servicio()
+    sistema = servicio.sistema
+    for i in range(10): sistema.registrar_taxi("T", f"P{i}")
+    servicio._publicar()
+    anterior = servicio.foto
+
+    for _ in range(30_000): sistema.registrar_cliente("C", "VISA")
+    sistema.registrar_taxi("T", "Nuevo")
+    servicio._publicar()
+    foto = servicio.foto
+    assert foto.deltas and foto.deltas[-1][0] == anterior.version  # Sin foto completa
+    assert len(foto.deltas[-1][3]) == 30_000
+    assert len(foto.clientes) == 30_000 and len(foto.taxis) == 11
+    assert foto.taxis.cubos[0] is not anterior.taxis.cubos[0]
+
+    # Sin cambios no se publica nada nuevo
+    servicio._publicar()
+    assert servicio.foto is foto
+
+
+async def repetir_cambios(servicio, rng):
+    """Sigue /estado/cambios como un cliente con sondeos irregulares y lo compara con /estado."""
+    sistema = servicio.sistema
+    taxis, clientes, version = {}, {}, 0
+    bajas = completas = 0
+    for ronda in range(120):
+        for _ in range(rng.randint(0, 4)):
+            cliente = sistema.registrar_cliente("C", "VISA")
+            sistema.procesar_solicitud(cliente.id, *(rng.uniform(0, 100) for _ in range(4)))
+        if ronda % 15 == 7:
+            libre = next((t for t in sistema.taxis.values() if t.estado == "LIBRE"), None)
+            if libre is not None:
+                sistema.eliminar_taxi(libre.id)
+                bajas += 1
+            sistema.registrar_taxi("T", f"R{ronda}")
+        servicio.motor.paso(VELOCIDAD_SIMULACION)
+        servicio._publicar()
+        if rng.random() < 0.4: continue  # Este cliente se salta sondeos: le llegan varios ticks juntos
+
+        cambios = json.loads(await servicio.cambios(version))
+        if cambios["completo"]:
+            taxis, clientes = {}, {}
+            completas += 1
+        taxis.update((t["id"], t) for t in cambios["taxis"])
+        clientes.update((c["id"], c) for c in cambios["clientes"])
+        for i in cambios["taxis_eliminados"]: taxis.pop(i, None)
+        version = cambios["version"]
+
+        estado = json.loads(await servicio.estado())
+        assert estado["version"] == version
+        assert {t["id"]: t for t in estado["taxis"]} == taxis, ronda
+        assert {c["id"]: c for c in estado["clientes"]} == clientes, ronda
+    return bajas, completas
+
+
+@pytest.mark.parametrize("eventos", [False, True], ids=["ticks", "eventos"])
+@pytest.mark.parametrize("red", [False, True], ids=["recta", "red"])
+def test_repetir_cambios_reconstruye_el_estado(eventos, red):
+    servicio = nuevo_servicio(eventos=eventos, red=RedViaria.cuadricula() if red else None)
+    servicio.sistema.limite_flota = 25
+    for i in range(20): servicio.sistema.registrar_taxi("T", f"P{i}")
+    servicio._publicar()
+    bajas, completas = asyncio.run(repetir_cambios(servicio, random.Random(7)))
+    assert bajas > 0 and completas == 1  # Solo la primera, sin versión
+
+
+def test_version_olvidada_recibe_la_foto_completa():
+    servicio = nuevo_servicio()
+    servicio.sistema.registrar_taxi("T", "P")
+    servicio._publicar()
+    antigua = servicio.foto.version
+    for _ in range(MAX_DELTAS + 1):
+        servicio.sistema.registrar_cliente("C", "VISA")
+        servicio._publicar()
+
+    async def leer():
+        return json.loads(await servicio.cambios(antigua)), json.loads(await servicio.cambios(antigua + 1))
+
+    olvidada, reciente = asyncio.run(leer())
+    assert olvidada["completo"] and len(olvidada["clientes"]) == MAX_DELTAS + 1
+    assert not reciente["completo"] and len(reciente["clientes"]) == MAX_DELTAS
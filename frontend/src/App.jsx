@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import axios from 'axios'
 
 const API_URL = "http://127.0.0.1:8000"
@@ -168,19 +168,36 @@ export default function App() {
   // ESTADO NUEVO: TAXI SELECCIONADO EN MAPA
   const [taxiSeleccionado, setTaxiSeleccionado] = useState(null)
 
+  // FEED INCREMENTAL: guardamos la última versión y solo pedimos lo que cambió desde ella
+  const versionRef = useRef(0)
+  const taxisRef = useRef(new Map())
+  const clientesRef = useRef(new Map())
+
   useEffect(() => {
-    const intervaloId = setInterval(async () => {
+    let activo = true
+    let timeoutId = null
+    // Encadenamos peticiones (no setInterval) para que las versiones lleguen en orden
+    const sondear = async () => {
       try {
-        const res = await axios.get(`${API_URL}/estado`)
-        setTaxis(res.data.taxis)
-        setClientes(res.data.clientes || []) 
-        setInfoEmpresa({ ganancia: res.data.empresa_ganancia, viajes: res.data.viajes })
-        setMejorTaxi(res.data.mejor_taxi)
-        setSimulacionActiva(res.data.simulacion_activa)
-        setTiempoSimulado(res.data.tiempo_simulado)
+        const res = await axios.get(`${API_URL}/estado/cambios`, { params: { desde: versionRef.current } })
+        const datos = res.data
+        if (datos.completo) { taxisRef.current = new Map(); clientesRef.current = new Map() }
+        datos.taxis.forEach(t => taxisRef.current.set(t.id, t))
+        datos.taxis_eliminados.forEach(id => taxisRef.current.delete(id))
+        datos.clientes.forEach(c => clientesRef.current.set(c.id, c))
+        versionRef.current = datos.version
+
+        if (datos.completo || datos.taxis.length || datos.taxis_eliminados.length) setTaxis(Array.from(taxisRef.current.values()))
+        if (datos.completo || datos.clientes.length) setClientes(Array.from(clientesRef.current.values()))
+        setInfoEmpresa({ ganancia: datos.empresa_ganancia, viajes: datos.viajes })
+        setMejorTaxi(datos.mejor_taxi)
+        setSimulacionActiva(datos.simulacion_activa)
+        setTiempoSimulado(datos.tiempo_simulado)
       } catch (e) { console.error("Conectando...") }
-    }, 50) 
-    return () => clearInterval(intervaloId)
+      if (activo) timeoutId = setTimeout(sondear, 50)
+    }
+    sondear()
+    return () => { activo = false; clearTimeout(timeoutId) }
   }, [])
 
   const registrarTaxi = async () => { try { await axios.post(`${API_URL}/taxis`, { modelo: "Toyota", placa: `ABC-${Math.floor(Math.random() * 999)}` }); setMensaje("Admin: Taxi creado.") } catch (e) { setMensaje("Error al crear taxi.") } }